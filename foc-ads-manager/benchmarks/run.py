@@ -0,0 +1,245 @@
+"""
+Benchmark Suite
+Runs the heavy analyzers and the weekly report against synthetic accounts
+(see synthetic.py) at multiples of the current account size, and records
+wall time, peak memory and API calls per skill so regressions between
+versions show up.
+
+Usage:
+    python -m benchmarks.run                          # scales 1, 10, 100
+    python -m benchmarks.run --scale 1000 --only seed_matches bid_recommendations
+    python -m benchmarks.run --fail-on-regression     # exit 1 if anything got slower
+
+Results are appended to BENCH_RESULTS (default benchmarks/results.jsonl),
+one JSON line per skill and scale, and each run is compared with the last
+one on the same machine, seed and scale.
+"""
+
+from __future__ import annotations
+import sys, os
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# No credentials or network: every query is answered by the synthetic service,
+# and nothing is read from or written to the real snapshots or warehouse
+os.environ["GOOGLE_ADS_TRANSPORT"] = "replay"
+os.environ["USE_SNAPSHOTS"] = "false"
+os.environ["USE_METRICS_WAREHOUSE"] = "false"
+os.environ.setdefault("GOOGLE_ADS_CUSTOMER_ID", "0000000000")
+
+from tabulate import tabulate
+
+import db
+from google_ads_client import get_client, use_service, invalidate_query_cache, get_env_float
+from benchmarks.synthetic import SyntheticGoogleAdsService
+from skills.data_gathering.search_terms import (
+    find_negative_candidates, find_expansion_candidates, find_seed_matches, get_search_terms_table,
+)
+from skills.data_gathering.planner import datasets_for, fetch_datasets
+from skills.actions.bid_optimizer import get_recommendations as get_bid_recommendations
+from skills.reporting import weekly_deep_dive
+from skills.reporting.ad_grants_audit import audit_account
+
+
+DEFAULT_RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results.jsonl")
+DEFAULT_SCALES = [1, 10, 100]
+
+
+def _weekly_report():
+    data = fetch_datasets(datasets_for([weekly_deep_dive]), use_snapshots=False)
+    return weekly_deep_dive.generate_weekly_report(data)
+
+
+# Benchmark name → zero-argument run
+BENCHMARKS = {
+    "negative_candidates": lambda: find_negative_candidates(),
+    "negative_candidates_table": lambda: find_negative_candidates(get_search_terms_table()),
+    "seed_matches": lambda: find_seed_matches(),
+    "expansion_candidates": lambda: find_expansion_candidates(),
+    "bid_recommendations": lambda: get_bid_recommendations(),
+    "weekly_report": _weekly_report,
+    "ad_grants_audit": lambda: audit_account(),
+}
+
+
+# ─── Measurement ─────────────────────────────────────────────
+
+def _run_once(fn, service: SyntheticGoogleAdsService) -> float:
+    invalidate_query_cache()
+    service.reset_stats()
+    # Reports print progress; keep the benchmark table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+
+def measure(name: str, service: SyntheticGoogleAdsService, memory: bool = True) -> dict:
+    """
+    Run one benchmark against `service`.
+
+    The timed run and the tracemalloc run are separate, since tracing slows
+    allocation-heavy code down several times.
+
+    Returns:
+        {benchmark, wall_seconds, service_seconds, skill_seconds, api_calls, rows, peak_mb}
+    """
+    fn = BENCHMARKS[name]
+    wall = _run_once(fn, service)
+    stats = service.stats()
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            _run_once(fn, service)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1_048_576
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "benchmark": name,
+        "wall_seconds": round(wall, 4),
+        # Time the stand-in spent building responses, which the real API would spend remotely
+        "service_seconds": round(stats["seconds"], 4),
+        "skill_seconds": round(max(wall - stats["seconds"], 0.0), 4),
+        "api_calls": stats["calls"],
+        "rows": stats["rows"],
+        "peak_mb": round(peak_mb, 1) if peak_mb is not None else None,
+    }
+
+
+def run_suite(scales: list[float], seed: int = 7, names: list[str] | None = None, memory: bool = True) -> list[dict]:
+    """Run the named benchmarks (default all) at each scale; returns one result per benchmark and scale."""
+    names = names or list(BENCHMARKS)
+    client = get_client()
+    results = []
+    for scale in scales:
+        service = SyntheticGoogleAdsService(seed=seed, scale=scale)
+        start = time.perf_counter()
+        size = service.size()
+        print(f"\n═══ SCALE {scale:g}× — {size['campaign']:,} campaigns, {size['keyword_view']:,} keywords, "
+              f"{size['search_term_view']:,} search terms (generated in {time.perf_counter() - start:.1f}s) ═══")
+        use_service(client, "GoogleAdsService", service)
+        for name in names:
+            result = {"scale": scale, "seed": seed, **measure(name, service, memory)}
+            print(f"  ⏱️ {name}: {result['wall_seconds']:.2f}s, {result['api_calls']} API calls, "
+                  f"{result['rows']:,} rows" + (f", peak {result['peak_mb']:.1f} MB" if memory else ""))
+            results.append(result)
+    return results
+
+
+# ─── Results ─────────────────────────────────────────────────
+
+def _version() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(__file__), timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def load_results(path: str) -> list[dict]:
+    """Every stored result, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_results(results: list[dict], path: str):
+    """Append results with the run's version, time and machine."""
+    stamp = {
+        "version": _version(),
+        "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        for r in results:
+            f.write(json.dumps({**stamp, **r}) + "\n")
+
+
+def compare(results: list[dict], history: list[dict], threshold_pct: float) -> tuple[list[dict], int]:
+    """
+    Compare each result with the latest stored one for the same benchmark,
+    scale and seed on this machine.
+
+    Returns:
+        (table rows for display, number of regressions)
+    """
+    machine = platform.node()
+    latest = {}
+    for h in history:
+        if h.get("machine") == machine:
+            latest[(h["benchmark"], h["scale"], h["seed"])] = h
+
+    rows, regressions = [], 0
+    for r in results:
+        prev = latest.get((r["benchmark"], r["scale"], r["seed"]))
+        change = flag = ""
+        if prev and prev["wall_seconds"] > 0:
+            pct = (r["wall_seconds"] / prev["wall_seconds"] - 1) * 100
+            change = f"{pct:+.0f}% vs {prev['version']}"
+            # Sub-50ms runs are too noisy to call
+            if pct > threshold_pct and r["wall_seconds"] - prev["wall_seconds"] > 0.05:
+                flag = "⚠️"
+                regressions += 1
+        rows.append({
+            "benchmark": r["benchmark"],
+            "scale": f"{r['scale']:g}×",
+            "wall s": r["wall_seconds"],
+            "skill s": r["skill_seconds"],
+            "API calls": r["api_calls"],
+            "rows": r["rows"],
+            "peak MB": r["peak_mb"] if r["peak_mb"] is not None else "",
+            "change": change,
+            "": flag,
+        })
+    return rows, regressions
+
+
+# ─── CLI ─────────────────────────────────────────────────────
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ads agent against synthetic accounts")
+    parser.add_argument("--scale", type=float, nargs="+", default=DEFAULT_SCALES, help="Account size multiples")
+    parser.add_argument("--seed", type=int, default=7, help="Synthetic account seed")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the results")
+    parser.add_argument("--threshold", type=float, default=get_env_float("BENCH_REGRESSION_PCT", 20.0),
+                        help="Percent slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any benchmark regressed")
+    args = parser.parse_args(argv)
+
+    path = os.getenv("BENCH_RESULTS", DEFAULT_RESULTS_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Reports log themselves; keep that out of the real action log
+        db.DB_PATH = os.path.join(tmp, "action_log.db")
+        results = run_suite(args.scale, args.seed, args.only, memory=not args.no_memory)
+
+    rows, regressions = compare(results, load_results(path), args.threshold)
+    print("\n═══ BENCHMARK RESULTS ═══")
+    print(tabulate(rows, headers="keys", floatfmt=".3f"))
+    if not args.no_save:
+        save_results(results, path)
+        print(f"\n  💾 Saved {len(results)} results to {path}")
+    if regressions:
+        print(f"\n  ⚠️ {regressions} benchmark(s) more than {args.threshold:.0f}% slower than the last run")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,596 @@
+"""
+Synthetic Account
+A deterministic, in-process stand-in for GoogleAdsService. It generates an
+account from a seed and a scale (scale 1 is roughly today's account) and
+answers the GAQL the skills send, so analyzers and reports can be run at
+10×–1000× the real size with no network:
+
+    service = SyntheticGoogleAdsService(seed=7, scale=100)
+    use_service(get_client(), "GoogleAdsService", service)
+
+Entities (campaigns, ad groups, keywords, ads, search terms, negatives, geo
+targets, conversion actions) are built once per service. Metrics are drawn per query from each entity's base
+rates, seeded by the date window, so the same query always returns the same
+rows. Keywords carry the traffic: ad group, campaign and customer metrics
+are their exact sums. Search terms are drawn separately, from the same
+vocabulary, so they overlap the keywords and the negative seed list.
+
+Supported GAQL: SELECT of any field of the resource and its parents, WHERE
+with =, !=, <, <=, >, >=, IN, NOT IN, DURING and date BETWEEN, ORDER BY one
+field and LIMIT. segments.date splits rows per day (with segments.day_of_week
+alongside it) and segments.hour per hour of a fixed daily traffic curve.
+Querying a resource the account does not model, filtering or ordering on
+a field it does not model, or selecting any other segment, raises
+ValueError rather than answering wrongly; other
+unmodeled attributes read as their defaults and are listed in unknown_fields.
+"""
+
+from __future__ import annotations
+import sys, os
+import re
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from google_ads_client import get_client, normalize_query
+from skills.data_gathering.aggregate import group_sum
+from foc_config.negative_seed import get_all_negatives
+
+
+# Entities per unit of scale (scale 1 ≈ the current account)
+CAMPAIGNS_PER_SCALE = 5
+AD_GROUPS_PER_CAMPAIGN = 4
+KEYWORDS_PER_AD_GROUP = 20
+ADS_PER_AD_GROUP = 3
+SEARCH_TERMS_PER_AD_GROUP = 100
+NEGATIVES_PER_CAMPAIGN = 5
+NEGATIVES_PER_AD_GROUP = 1
+SHARED_NEGATIVES = 20
+
+# Rows per streamed response (the API sends up to 10,000)
+BATCH_SIZE = 10_000
+
+DOMAIN_WORDS = [
+    "volunteer", "volunteering", "community", "service", "hours", "near", "me", "court", "ordered",
+    "opportunities", "nonprofit", "charity", "donate", "food", "bank", "youth", "mentor", "program",
+    "help", "local", "weekend", "students", "high", "school", "college", "requirements", "online",
+    "sign", "up", "how", "to", "get", "free", "organization", "projects", "teens", "summer", "ideas",
+    "family", "seniors", "animal", "shelter", "clothing", "drive", "tutoring", "cleanup", "park",
+]
+
+DURING_DAYS = {"TODAY": 1, "YESTERDAY": 1, "LAST_7_DAYS": 7, "LAST_14_DAYS": 14, "LAST_30_DAYS": 30,
+               "LAST_MONTH": 30, "LAST_BUSINESS_WEEK": 5, "LAST_WEEK_SUN_SAT": 7, "LAST_WEEK_MON_SUN": 7}
+
+_QUERY = re.compile(
+    r"SELECT (?P<fields>.+?) FROM (?P<resource>\w+)(?: WHERE (?P<where>.+?))?"
+    r"(?: ORDER BY (?P<order>.+?))?(?: LIMIT (?P<limit>\d+))?$", re.IGNORECASE)
+_BETWEEN = re.compile(r"segments\.date BETWEEN '([\d-]+)' AND '([\d-]+)'", re.IGNORECASE)
+_CONDITION = re.compile(r"^([\w.]+) (NOT IN|IN|DURING|>=|<=|!=|=|>|<) (.+)$", re.IGNORECASE)
+
+SEGMENTS = ("segments.date", "segments.day_of_week", "segments.hour")
+
+# Share of a day's traffic in each hour: quiet nights, an early-afternoon peak
+HOUR_SHARE = 0.15 + np.exp(-(((np.arange(24) - 13) / 4.5) ** 2))
+HOUR_SHARE /= HOUR_SHARE.sum()
+
+
+class SyntheticGoogleAdsService:
+    """
+    Answers search_stream() from a generated account.
+
+    Args:
+        seed: Seed for the account and every metric draw
+        scale: Multiple of the current account size
+        today: Date the account is "run" on (default today)
+    """
+
+    def __init__(self, seed: int = 0, scale: float = 1.0, today: date | None = None):
+        self.seed = seed
+        self.scale = scale
+        self.today = today or date.today()
+        client = get_client()
+        self._response_type = type(client.get_type("SearchGoogleAdsStreamResponse"))
+        self._row_descriptor = type(client.get_type("GoogleAdsRow")).pb().DESCRIPTOR
+        self._lock = threading.Lock()
+        self._entities: dict | None = None
+        self.calls: list[dict] = []
+        self.unknown_fields: set[str] = set()
+
+    # ─── API surface ─────────────────────────────────────────
+
+    def search_stream(self, customer_id: str, query: str, **kwargs):
+        start = time.perf_counter()
+        table, fields = self._run(normalize_query(query))
+        seconds = time.perf_counter() - start
+        call = {"resource": table["resource"], "rows": table["n"], "seconds": 0.0}
+        with self._lock:
+            self.calls.append(call)
+        return self._stream(table, fields, call, seconds)
+
+    def stats(self) -> dict:
+        """{"calls", "rows", "seconds": time spent generating responses}"""
+        with self._lock:
+            return {
+                "calls": len(self.calls),
+                "rows": sum(c["rows"] for c in self.calls),
+                "seconds": sum(c["seconds"] for c in self.calls),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls.clear()
+
+    def size(self) -> dict:
+        """Entity counts of the generated account."""
+        e = self._account()
+        return {name: e[name]["n"] for name in ("campaign", "ad_group", "keyword_view", "ad_group_ad", "search_term_view")}
+
+    # ─── Query evaluation ────────────────────────────────────
+
+    def _run(self, query: str) -> tuple[dict, list[str]]:
+        m = _QUERY.match(query)
+        if m is None:
+            raise ValueError(f"Unsupported GAQL: {query}")
+        fields = [f.strip() for f in m["fields"].split(",")]
+        base = self._account().get(m["resource"])
+        if base is None:
+            raise ValueError(f"Synthetic account does not model {m['resource']}")
+        unmodeled = [f for f in fields if f.startswith("segments.") and f not in SEGMENTS]
+        if unmodeled:
+            raise ValueError(f"Synthetic account does not generate {', '.join(unmodeled)}")
+        if "segments.day_of_week" in fields and "segments.date" not in fields:
+            raise ValueError("Synthetic account only generates segments.day_of_week alongside segments.date")
+
+        where = m["where"] or ""
+        window = None
+        between = _BETWEEN.search(where)
+        if between:
+            window = (date.fromisoformat(between[1]), date.fromisoformat(between[2]))
+            where = _BETWEEN.sub("", where)
+        conditions = []
+        for part in re.split(r" AND ", where, flags=re.IGNORECASE):
+            part = part.strip()
+            if not part:
+                continue
+            c = _CONDITION.match(part)
+            if c is None:
+                raise ValueError(f"Unsupported condition: {part}")
+            if c[1] == "segments.date" and c[2].upper() == "DURING":
+                window = self._during(c[3].strip())
+            else:
+                conditions.append((c[1], c[2].upper(), _parse_literal(c[3].strip())))
+
+        table = self._with_metrics(base, window, "segments.date" in fields, "segments.hour" in fields)
+        mask = np.ones(table["n"], dtype=bool)
+        for path, op, value in conditions:
+            mask &= _compare(self._required_column(table, path, "WHERE"), op, self._literal_for(path, value))
+        table = _take(table, np.flatnonzero(mask))
+
+        if m["order"]:
+            path, _, direction = m["order"].strip().partition(" ")
+            order = np.argsort(self._required_column(table, path, "ORDER BY"), kind="stable")
+            table = _take(table, order[::-1] if direction.upper() == "DESC" else order)
+        if m["limit"]:
+            table = _take(table, np.arange(min(int(m["limit"]), table["n"])))
+        return table, fields
+
+    def _during(self, literal: str) -> tuple[date, date]:
+        literal = literal.upper()
+        if literal == "TODAY":
+            return self.today, self.today
+        if literal == "THIS_MONTH":
+            return self.today.replace(day=1), self.today
+        days = DURING_DAYS.get(literal, 30)
+        return self.today - timedelta(days=days), self.today - timedelta(days=1)
+
+    def _column(self, table: dict, path: str):
+        """Column for a GAQL field, from the row's own, parent, metric or segment columns."""
+        if path in table["columns"]:
+            return table["columns"][path]
+        prefix = path.split(".", 1)[0]
+        if prefix in ("campaign", "campaign_budget") and table["campaign"] is not None:
+            source = self._account()["campaign"]["columns"].get(path)
+            return source[table["campaign"]] if source is not None else None
+        if prefix == "ad_group" and table["ad_group"] is not None:
+            source = self._account()["ad_group"]["columns"].get(path)
+            return source[table["ad_group"]] if source is not None else None
+        return None
+
+    def _required_column(self, table: dict, path: str, clause: str):
+        column = self._column(table, path)
+        if column is None:
+            raise ValueError(f"Synthetic {table['resource']} does not model {path} (used in {clause})")
+        return column
+
+    def _literal_for(self, path: str, value):
+        """Enum literals compared by name are translated to their numbers."""
+        names = self._enum_numbers(path)
+        if not names:
+            return value
+        if isinstance(value, list):
+            return [names.get(v, -1) for v in value]
+        return names.get(value, -1) if isinstance(value, str) else value
+
+    # ─── Metrics ─────────────────────────────────────────────
+
+    def _with_metrics(self, base: dict, window: tuple[date, date] | None, by_day: bool, by_hour: bool) -> dict:
+        traffic = base.get("traffic")
+        if traffic is None:
+            return base
+        if window is None:
+            window = self._during("LAST_30_DAYS")
+        start, end = window
+
+        if not by_day and not by_hour:
+            return {**base, "columns": {**base["columns"], **self._metrics(base, traffic, start, end)}}
+
+        # One slot per day and/or hour; each is a full copy of the base rows
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)] if by_day else [None]
+        hours = range(24) if by_hour else [None]
+        slots = [(d, h) for d in days for h in hours]
+        parts = [
+            self._metrics(base, traffic, d or start, d or end, hour=h) for d, h in slots
+        ]
+        idx = np.tile(np.arange(base["n"]), len(slots))
+        table = _take(base, idx)
+        table["columns"].update({k: np.concatenate([p[k] for p in parts]) for k in parts[0]})
+        if by_day:
+            table["columns"]["segments.date"] = np.repeat(
+                np.array([d.isoformat() for d, _ in slots], dtype=object), base["n"])
+            table["columns"]["segments.day_of_week"] = np.repeat(
+                self._enum("segments.day_of_week", [d.strftime("%A").upper() for d, _ in slots]), base["n"])
+        if by_hour:
+            table["columns"]["segments.hour"] = np.repeat(np.array([h for _, h in slots], dtype=np.int64), base["n"])
+        return table
+
+    def _metrics(self, base: dict, traffic: str, start: date, end: date, hour: int | None = None) -> dict:
+        """
+        Metric columns for a window (or one hour of each of its days): drawn
+        for traffic units, summed up to this resource.
+        """
+        units = self._account()[traffic]
+        days = (end - start).days + 1
+        slot = f"{traffic}|{start}|{end}" + (f"|{hour}" if hour is not None else "")
+        rng = np.random.default_rng([self.seed, zlib.crc32(slot.encode())])
+        rates = units["rates"]
+        share = HOUR_SHARE[hour] if hour is not None else 1.0
+
+        impressions = rng.poisson(rates["impressions"] * days * share).astype(np.int64)
+        clicks = rng.binomial(impressions, rates["ctr"]).astype(np.int64)
+        conversions = rng.binomial(clicks, rates["cvr"]).astype(np.float64)
+        cost_micros = np.round(clicks * rates["cpc_micros"] * rng.lognormal(0, 0.1, units["n"])).astype(np.int64)
+        value = conversions * rates["value"]
+
+        group = base.get("group")
+        if group is not None:
+            # Parents get the exact sums of their keywords
+            keys, size = units[group], base["n"]
+            impressions, clicks, cost_micros = (group_sum(keys, v, size) for v in (impressions, clicks, cost_micros))
+            conversions, value = (group_sum(keys, v, size) for v in (conversions, value))
+
+        def ratio(num, den, scale=1.0):
+            out = np.zeros(len(num), dtype=np.float64)
+            np.divide(num, den, out=out, where=den != 0)
+            return out * scale
+
+        return {
+            "metrics.impressions": impressions,
+            "metrics.clicks": clicks,
+            "metrics.conversions": conversions,
+            "metrics.cost_micros": cost_micros,
+            "metrics.all_conversions_value": value,
+            "metrics.conversions_value": value,
+            "metrics.ctr": ratio(clicks, impressions),
+            "metrics.average_cpc": ratio(cost_micros, clicks),
+            "metrics.cost_per_conversion": ratio(cost_micros, conversions),
+            "metrics.conversions_from_interactions_rate": ratio(conversions, clicks),
+        }
+
+    # ─── Streaming ───────────────────────────────────────────
+
+    def _stream(self, table: dict, fields: list[str], call: dict, seconds: float):
+        start = time.perf_counter()
+        setters = []
+        for path in fields:
+            column = self._column(table, path)
+            if column is None:
+                self.unknown_fields.add(path)
+                continue
+            parents, last = self._pb_path(path)
+            setters.append((parents, last, column.tolist()))
+
+        response_pb = self._response_type.pb()
+        for batch_start in range(0, max(table["n"], 1), BATCH_SIZE):
+            response = response_pb()
+            add = response.results.add
+            for i in range(batch_start, min(batch_start + BATCH_SIZE, table["n"])):
+                row = add()
+                for parents, last, values in setters:
+                    obj = row
+                    for part in parents:
+                        obj = getattr(obj, part)
+                    value = values[i]
+                    if isinstance(value, list):
+                        repeated = getattr(obj, last)
+                        for item in value:
+                            repeated.add(**item)
+                    else:
+                        setattr(obj, last, value)
+            seconds += time.perf_counter() - start
+            call["seconds"] = seconds
+            yield self._response_type.wrap(response)
+            start = time.perf_counter()
+
+    def _pb_path(self, path: str) -> tuple[list[str], str]:
+        """GAQL field path → raw protobuf attribute names (reserved words carry a trailing _)."""
+        names = []
+        descriptor = self._row_descriptor
+        for part in path.split("."):
+            if part not in descriptor.fields_by_name:
+                part += "_"
+            field = descriptor.fields_by_name[part]
+            names.append(part)
+            descriptor = field.message_type
+        return names[:-1], names[-1]
+
+    def _enum_numbers(self, path: str) -> dict[str, int]:
+        descriptor = self._row_descriptor
+        field = None
+        for part in path.split("."):
+            if descriptor is None:
+                return {}
+            field = descriptor.fields_by_name.get(part) or descriptor.fields_by_name.get(part + "_")
+            if field is None:
+                return {}
+            descriptor = field.message_type
+        if field is None or field.enum_type is None:
+            return {}
+        return {v.name: v.number for v in field.enum_type.values}
+
+    def _enum(self, path: str, names) -> np.ndarray:
+        numbers = self._enum_numbers(path)
+        return np.array([numbers[n] for n in names], dtype=np.int64)
+
+    # ─── Account generation ──────────────────────────────────
+
+    def _account(self) -> dict:
+        with self._lock:
+            if self._entities is None:
+                self._entities = self._generate()
+            return self._entities
+
+    def _generate(self) -> dict:
+        rng = np.random.default_rng(self.seed)
+        n_c = max(1, round(CAMPAIGNS_PER_SCALE * self.scale))
+        n_g = n_c * AD_GROUPS_PER_CAMPAIGN
+        n_k = n_g * KEYWORDS_PER_AD_GROUP
+        n_a = n_g * ADS_PER_AD_GROUP
+        n_t = n_g * SEARCH_TERMS_PER_AD_GROUP
+        seeds = list(get_all_negatives())
+        vocab = np.array(DOMAIN_WORDS + [f"w{i}" for i in range(2000 + int(200 * self.scale))], dtype=object)
+        weights = 1 / np.arange(1, len(vocab) + 1) ** 1.1
+        weights /= weights.sum()
+
+        g_campaign = np.repeat(np.arange(n_c), AD_GROUPS_PER_CAMPAIGN)
+        k_group = np.repeat(np.arange(n_g), KEYWORDS_PER_AD_GROUP)
+        a_group = np.repeat(np.arange(n_g), ADS_PER_AD_GROUP)
+        t_group = np.repeat(np.arange(n_g), SEARCH_TERMS_PER_AD_GROUP)
+
+        campaign = {
+            "resource": "campaign", "n": n_c, "campaign": np.arange(n_c), "ad_group": None,
+            "traffic": "keyword_view", "group": "campaign",
+            "columns": {
+                "campaign.id": np.arange(1, n_c + 1, dtype=np.int64) + 10_000_000,
+                "campaign.name": np.array([f"Campaign {i:05d}" for i in range(n_c)], dtype=object),
+                "campaign.status": self._enum("campaign.status", rng.choice(["ENABLED", "PAUSED"], n_c, p=[0.9, 0.1])),
+                "campaign.bidding_strategy_type": self._enum("campaign.bidding_strategy_type", rng.choice(
+                    ["MANUAL_CPC", "MAXIMIZE_CONVERSIONS", "TARGET_CPA"], n_c)),
+                "campaign_budget.amount_micros": (rng.integers(5, 200, n_c) * 1_000_000).astype(np.int64),
+            },
+        }
+        ad_group = {
+            "resource": "ad_group", "n": n_g, "campaign": g_campaign, "ad_group": np.arange(n_g),
+            "traffic": "keyword_view", "group": "ad_group",
+            "columns": {
+                "ad_group.id": np.arange(1, n_g + 1, dtype=np.int64) + 20_000_000,
+                "ad_group.name": np.array([f"Ad Group {i:06d}" for i in range(n_g)], dtype=object),
+                "ad_group.status": self._enum("ad_group.status", ["ENABLED"] * n_g),
+            },
+        }
+        keyword_columns = {
+            "ad_group_criterion.criterion_id": np.arange(1, n_k + 1, dtype=np.int64) + 30_000_000,
+            "ad_group_criterion.keyword.text": _phrases(rng, vocab, weights, n_k, 1, 3),
+            "ad_group_criterion.keyword.match_type": self._enum(
+                "ad_group_criterion.keyword.match_type", rng.choice(["EXACT", "PHRASE", "BROAD"], n_k, p=[0.3, 0.5, 0.2])),
+            "ad_group_criterion.status": self._enum(
+                "ad_group_criterion.status", rng.choice(["ENABLED", "PAUSED"], n_k, p=[0.85, 0.15])),
+            "ad_group_criterion.type": self._enum("ad_group_criterion.type", ["KEYWORD"] * n_k),
+            "ad_group_criterion.negative": np.zeros(n_k, dtype=bool),
+            "ad_group_criterion.quality_info.quality_score": rng.integers(1, 11, n_k).astype(np.int64),
+            "ad_group_criterion.effective_cpc_bid_micros": (rng.integers(20, 400, n_k) * 10_000).astype(np.int64),
+        }
+        keyword_view = {
+            "resource": "keyword_view", "n": n_k, "campaign": g_campaign[k_group], "ad_group": k_group,
+            "traffic": "keyword_view", "columns": keyword_columns,
+            "rates": _rates(rng, n_k, impressions=8.0, spread=1.2, ctr=(2, 30), zero_cvr=0.4, cvr=(1.5, 20)),
+        }
+
+        # Negatives attached to ad groups share the ad_group_criterion resource with keywords
+        n_neg_g = n_g * NEGATIVES_PER_AD_GROUP
+        neg_group = np.repeat(np.arange(n_g), NEGATIVES_PER_AD_GROUP)
+        negative_columns = {
+            "ad_group_criterion.criterion_id": np.arange(1, n_neg_g + 1, dtype=np.int64) + 40_000_000,
+            "ad_group_criterion.keyword.text": np.array(rng.choice(seeds, n_neg_g), dtype=object),
+            "ad_group_criterion.keyword.match_type": self._enum("ad_group_criterion.keyword.match_type", ["PHRASE"] * n_neg_g),
+            "ad_group_criterion.status": self._enum("ad_group_criterion.status", ["ENABLED"] * n_neg_g),
+            "ad_group_criterion.type": self._enum("ad_group_criterion.type", ["KEYWORD"] * n_neg_g),
+            "ad_group_criterion.negative": np.ones(n_neg_g, dtype=bool),
+            "ad_group_criterion.quality_info.quality_score": np.zeros(n_neg_g, dtype=np.int64),
+            "ad_group_criterion.effective_cpc_bid_micros": np.zeros(n_neg_g, dtype=np.int64),
+        }
+        criterion_group = np.concatenate([k_group, neg_group])
+        ad_group_criterion = {
+            "resource": "ad_group_criterion", "n": n_k + n_neg_g,
+            "campaign": g_campaign[criterion_group], "ad_group": criterion_group,
+            "columns": {k: np.concatenate([keyword_columns[k], negative_columns[k]]) for k in keyword_columns},
+        }
+
+        ad_group_ad = {
+            "resource": "ad_group_ad", "n": n_a, "campaign": g_campaign[a_group], "ad_group": a_group,
+            "traffic": "ad_group_ad",
+            "columns": {
+                "ad_group_ad.ad.id": np.arange(1, n_a + 1, dtype=np.int64) + 50_000_000,
+                "ad_group_ad.status": self._enum("ad_group_ad.status", ["ENABLED"] * n_a),
+                "ad_group_ad.ad.responsive_search_ad.headlines": _assets(rng, vocab, weights, n_a, 3),
+                "ad_group_ad.ad.responsive_search_ad.descriptions": _assets(rng, vocab, weights, n_a, 2),
+            },
+            "rates": _rates(rng, n_a, impressions=40.0, spread=1.0, ctr=(3, 40), zero_cvr=0.1, cvr=(1.5, 25)),
+        }
+
+        terms = _phrases(rng, vocab, weights, n_t, 2, 4)
+        seeded = rng.random(n_t) < 0.05
+        picks = rng.choice(seeds, int(seeded.sum()))
+        extra = rng.choice(vocab[:len(DOMAIN_WORDS)], int(seeded.sum()))
+        terms[seeded] = [f"{p} {w}" for p, w in zip(picks, extra)]
+        search_term_view = {
+            "resource": "search_term_view", "n": n_t, "campaign": g_campaign[t_group], "ad_group": t_group,
+            "traffic": "search_term_view",
+            "columns": {
+                "search_term_view.search_term": terms,
+                "search_term_view.status": self._enum("search_term_view.status", ["NONE"] * n_t),
+            },
+            "rates": _rates(rng, n_t, impressions=3.0, spread=1.5, ctr=(2, 25), zero_cvr=0.5, cvr=(1.5, 15)),
+        }
+
+        n_neg_c = n_c * NEGATIVES_PER_CAMPAIGN
+        campaign_criterion = {
+            "resource": "campaign_criterion", "n": n_neg_c, "campaign": np.repeat(np.arange(n_c), NEGATIVES_PER_CAMPAIGN),
+            "ad_group": None,
+            "columns": {
+                "campaign_criterion.keyword.text": np.array(rng.choice(seeds, n_neg_c), dtype=object),
+                "campaign_criterion.keyword.match_type": self._enum("campaign_criterion.keyword.match_type", ["PHRASE"] * n_neg_c),
+                "campaign_criterion.type": self._enum("campaign_criterion.type", ["KEYWORD"] * n_neg_c),
+                "campaign_criterion.negative": np.ones(n_neg_c, dtype=bool),
+                "campaign_criterion.status": self._enum("campaign_criterion.status", ["ENABLED"] * n_neg_c),
+            },
+        }
+        n_shared = min(SHARED_NEGATIVES, len(seeds))
+        shared_criterion = {
+            "resource": "shared_criterion", "n": n_shared, "campaign": None, "ad_group": None,
+            "columns": {
+                "shared_criterion.keyword.text": np.array(seeds[:n_shared], dtype=object),
+                "shared_criterion.keyword.match_type": self._enum("shared_criterion.keyword.match_type", ["PHRASE"] * n_shared),
+                "shared_criterion.type": self._enum("shared_criterion.type", ["KEYWORD"] * n_shared),
+                "shared_set.name": np.array(["Account negatives"] * n_shared, dtype=object),
+                "shared_set.type": self._enum("shared_set.type", ["NEGATIVE_KEYWORDS"] * n_shared),
+                "shared_set.status": self._enum("shared_set.status", ["ENABLED"] * n_shared),
+            },
+        }
+        customer = {
+            "resource": "customer", "n": 1, "campaign": None, "ad_group": None,
+            "traffic": "keyword_view", "group": "customer",
+            "columns": {"customer.id": np.array([1_234_567_890], dtype=np.int64)},
+        }
+
+        # Every row of the traffic table rolls up into the single customer row
+        keyword_view["customer"] = np.zeros(n_k, dtype=np.int64)
+
+        # Serving and policy status (drawn last so the entities above stay as they were)
+        campaign["columns"]["campaign.serving_status"] = self._enum("campaign.serving_status", rng.choice(
+            ["SERVING", "ENDED", "PENDING", "SUSPENDED"], n_c, p=[0.94, 0.02, 0.02, 0.02]))
+        ad_group_ad["columns"]["ad_group_ad.policy_summary.approval_status"] = self._enum(
+            "ad_group_ad.policy_summary.approval_status", rng.choice(
+                ["APPROVED", "APPROVED_LIMITED", "AREA_OF_INTEREST_ONLY", "DISAPPROVED"], n_a,
+                p=[0.9, 0.05, 0.02, 0.03]))
+
+        # Location targets for most campaigns, next to the negative keywords
+        geo = np.flatnonzero(rng.random(n_c) < 0.9)
+        geo_columns = {
+            "campaign_criterion.keyword.text": np.array([""] * len(geo), dtype=object),
+            "campaign_criterion.keyword.match_type": self._enum(
+                "campaign_criterion.keyword.match_type", ["UNSPECIFIED"] * len(geo)),
+            "campaign_criterion.type": self._enum("campaign_criterion.type", ["LOCATION"] * len(geo)),
+            "campaign_criterion.negative": np.zeros(len(geo), dtype=bool),
+            "campaign_criterion.status": self._enum("campaign_criterion.status", ["ENABLED"] * len(geo)),
+        }
+        campaign_criterion["n"] += len(geo)
+        campaign_criterion["campaign"] = np.concatenate([campaign_criterion["campaign"], geo])
+        campaign_criterion["columns"] = {
+            k: np.concatenate([v, geo_columns[k]]) for k, v in campaign_criterion["columns"].items()
+        }
+        conversion_action = {
+            "resource": "conversion_action", "n": 2, "campaign": None, "ad_group": None,
+            "columns": {
+                "conversion_action.id": np.array([60_000_001, 60_000_002], dtype=np.int64),
+                "conversion_action.name": np.array(["Volunteer sign-up", "Donation"], dtype=object),
+                "conversion_action.status": self._enum("conversion_action.status", ["ENABLED", "ENABLED"]),
+            },
+        }
+        return {t["resource"]: t for t in (
+            customer, campaign, ad_group, keyword_view, ad_group_criterion, ad_group_ad, search_term_view,
+            campaign_criterion, shared_criterion, conversion_action,
+        )}
+
+
+# ─── Helpers ─────────────────────────────────────────────────
+
+def _rates(rng, n: int, impressions: float, spread: float, ctr: tuple, zero_cvr: float, cvr: tuple) -> dict:
+    """Per-entity daily impressions, CTR, conversion rate, CPC and conversion value."""
+    conversion_rate = rng.beta(*cvr, n)
+    conversion_rate[rng.random(n) < zero_cvr] = 0.0
+    return {
+        "impressions": rng.lognormal(np.log(impressions), spread, n),
+        "ctr": rng.beta(*ctr, n),
+        "cvr": conversion_rate,
+        "cpc_micros": rng.lognormal(np.log(1_200_000), 0.4, n),
+        "value": rng.lognormal(np.log(20), 0.5, n),
+    }
+
+
+def _phrases(rng, vocab: np.ndarray, weights: np.ndarray, n: int, min_words: int, max_words: int) -> np.ndarray:
+    """n phrases of min_words..max_words Zipf-distributed words."""
+    words = vocab[rng.choice(len(vocab), size=(n, max_words), p=weights)]
+    lengths = rng.integers(min_words, max_words + 1, n)
+    return np.array([" ".join(w[:k]) for w, k in zip(words.tolist(), lengths.tolist())], dtype=object)
+
+
+def _assets(rng, vocab: np.ndarray, weights: np.ndarray, n: int, per_ad: int) -> np.ndarray:
+    """Ad text assets: per_ad lists of {"text": ...} per ad."""
+    texts = _phrases(rng, vocab, weights, n * per_ad, 2, 5).reshape(n, per_ad)
+    out = np.empty(n, dtype=object)
+    out[:] = [[{"text": t.title()} for t in row] for row in texts.tolist()]
+    return out
+
+
+def _take(table: dict, idx: np.ndarray) -> dict:
+    """Rows `idx` of a table (entity keys and columns alike)."""
+    out = {**table, "n": len(idx), "columns": {k: v[idx] for k, v in table["columns"].items()}}
+    for key in ("campaign", "ad_group", "customer"):
+        if table.get(key) is not None:
+            out[key] = table[key][idx]
+    return out
+
+
+def _parse_literal(text: str):
+    if text.startswith("("):
+        return [_parse_literal(v.strip()) for v in text[1:-1].split(",") if v.strip()]
+    if text.startswith("'"):
+        return text[1:-1].replace("\\'", "'")
+    if text.upper() in ("TRUE", "FALSE"):
+        return text.upper() == "TRUE"
+    return float(text)
+
+
+def _compare(column: np.ndarray, op: str, value) -> np.ndarray:
+    if op == "IN":
+        return np.isin(column, value)
+    if op == "NOT IN":
+        return ~np.isin(column, value)
+    return {
+        "=": np.equal, "!=": np.not_equal, ">": np.greater,
+        ">=": np.greater_equal, "<": np.less, "<=": np.less_equal,
+    }[op](column, value)
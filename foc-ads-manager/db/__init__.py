@@ -6,18 +6,41 @@ Every change made by the agent is recorded here for audit and rollback.
 import sqlite3
 import os
 import json
-from datetime import datetime
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+from db import pool
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "action_log.db")
 
+ACTION_COLUMNS = (
+    "action_type", "target_type", "target_id", "target_name", "campaign", "ad_group",
+    "old_value", "new_value", "reason", "approved_by",
+)
+
 
 def get_conn() -> sqlite3.Connection:
-    """Get a connection to the action log database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    _ensure_tables(conn)
-    return conn
+    """
+    Get this thread's connection to the action log database.
+    Connections are pooled per thread and the schema is created once per
+    process (see db/pool.py); do not close the returned connection.
+    """
+    return pool.get_connection(DB_PATH, _ensure_tables)
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Group several writes into one commit:
+
+        with transaction():
+            log_action(...)
+            mark_rolled_back(...)
+    """
+    with pool.transaction(get_conn()) as conn:
+        yield conn
 
 
 def _ensure_tables(conn: sqlite3.Connection):
@@ -58,6 +81,163 @@ def _ensure_tables(conn: sqlite3.Connection):
             content         TEXT    NOT NULL
         );
     """)
+    _migrate(conn)
+
+
+# ─── Migrations ─────────────────────────────────────────────
+# Applied in order on first connection; PRAGMA user_version records how many
+# have run. Append new steps — never edit or reorder existing ones.
+# Each step runs in a transaction, so use execute() rather than
+# executescript() (which commits first).
+
+def _migration_indexes(conn: sqlite3.Connection):
+    """Secondary indexes for the time-range queries below."""
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_actions_timestamp ON actions (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_actions_type_timestamp ON actions (action_type, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_actions_rolled_back_timestamp ON actions (rolled_back, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_reports_type_timestamp ON reports (report_type, timestamp)",
+    ):
+        conn.execute(statement)
+
+
+def _migration_compressed_reports(conn: sqlite3.Connection):
+    """Store report bodies zlib-compressed in content_zlib (content is left empty)."""
+    conn.execute("ALTER TABLE reports ADD COLUMN content_zlib BLOB")
+    rows = conn.execute("SELECT id, content FROM reports").fetchall()
+    conn.executemany(
+        "UPDATE reports SET content = '', content_zlib = ? WHERE id = ?",
+        [(_compress(r["content"]), r["id"]) for r in rows],
+    )
+
+
+def _migration_rollups(conn: sqlite3.Connection):
+    """Daily rollup tables that keep counts after old rows are pruned."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS action_daily (
+            date            TEXT    NOT NULL,
+            action_type     TEXT    NOT NULL,
+            count           INTEGER NOT NULL,
+            rolled_back     INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, action_type)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS alert_daily (
+            date            TEXT    NOT NULL,
+            level           TEXT    NOT NULL,
+            category        TEXT    NOT NULL,
+            count           INTEGER NOT NULL,
+            PRIMARY KEY (date, level, category)
+        )
+    """)
+
+
+def _migration_incremental_vacuum(conn: sqlite3.Connection):
+    """Let the retention job hand freed pages back to the filesystem."""
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def _migration_alert_state(conn: sqlite3.Connection):
+    """
+    Alert lifecycle columns (see db/alert_state.py). One row per open
+    condition, found through a unique index on the fingerprints of
+    unresolved alerts. Existing rows predate fingerprints and are closed.
+    """
+    for statement in (
+        "ALTER TABLE alerts ADD COLUMN fingerprint TEXT",
+        "ALTER TABLE alerts ADD COLUMN state TEXT NOT NULL DEFAULT 'open'",
+        "ALTER TABLE alerts ADD COLUMN last_seen TEXT",
+        "ALTER TABLE alerts ADD COLUMN occurrences INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE alerts ADD COLUMN resolved_at TEXT",
+        "UPDATE alerts SET state = 'resolved', last_seen = timestamp, resolved_at = timestamp",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_active_fingerprint
+           ON alerts (fingerprint) WHERE state != 'resolved'""",
+    ):
+        conn.execute(statement)
+
+
+def _migration_job_runs(conn: sqlite3.Connection):
+    """History of scheduled job runs (see scheduler.py)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            job             TEXT    NOT NULL,
+            trigger         TEXT    NOT NULL,
+            started_at      TEXT    NOT NULL,
+            seconds         REAL    NOT NULL,
+            status          TEXT    NOT NULL,
+            error           TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs (job, started_at)")
+
+
+def _migration_alert_notifications(conn: sqlite3.Connection):
+    """
+    Notification bookkeeping for alert transitions (see db/alert_state.py):
+    when each row was last notified and at which level. Existing rows count
+    as already notified so upgrading does not resend them.
+    """
+    for statement in (
+        "ALTER TABLE alerts ADD COLUMN notified_at TEXT",
+        "ALTER TABLE alerts ADD COLUMN notified_level TEXT",
+        "UPDATE alerts SET notified_at = COALESCE(last_seen, timestamp), notified_level = level",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_unnotified ON alerts (id) WHERE notified_at IS NULL",
+    ):
+        conn.execute(statement)
+
+
+MIGRATIONS = [
+    _migration_indexes,
+    _migration_compressed_reports,
+    _migration_rollups,
+    _migration_incremental_vacuum,
+    _migration_alert_state,
+    _migration_job_runs,
+    _migration_alert_notifications,
+]
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Apply any migrations this database has not seen yet."""
+    while True:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(MIGRATIONS):
+            return
+        migration = MIGRATIONS[version]
+        if migration is _migration_incremental_vacuum:
+            migration(conn)  # VACUUM cannot run inside a transaction
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            continue
+        with pool.transaction(conn):
+            # Another process may have applied it while we waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] == version:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+
+
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def _sql_timestamp(value: datetime | str) -> str:
+    """
+    Format a timestamp the way SQLite's datetime('now') stores it
+    ('YYYY-MM-DD HH:MM:SS', UTC) so text comparisons line up. ISO strings
+    with a 'T' separator are accepted; aware datetimes are converted to UTC.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value.replace("T", " ")[:19]
+
+
+def _days_ago(days: int) -> str:
+    return _sql_timestamp(datetime.now(timezone.utc) - timedelta(days=days))
 
 
 def log_action(
@@ -90,45 +270,101 @@ def log_action(
     Returns:
         Row id of the logged action.
     """
-    conn = get_conn()
-    cursor = conn.execute(
-        """INSERT INTO actions
-           (action_type, target_type, target_id, target_name, campaign, ad_group,
-            old_value, new_value, reason, approved_by)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-        (action_type, target_type, target_id, target_name, campaign, ad_group,
-         old_value, new_value, reason, approved_by),
-    )
-    conn.commit()
-    action_id = cursor.lastrowid
-    conn.close()
-    return action_id
+    with transaction() as conn:
+        cursor = conn.execute(
+            """INSERT INTO actions
+               (action_type, target_type, target_id, target_name, campaign, ad_group,
+                old_value, new_value, reason, approved_by)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (action_type, target_type, target_id, target_name, campaign, ad_group,
+             old_value, new_value, reason, approved_by),
+        )
+    return cursor.lastrowid
+
+
+def log_actions(actions: list[dict]) -> list[int]:
+    """
+    Record a batch of actions in a single transaction.
+
+    Args:
+        actions: Dicts with log_action()'s keyword arguments.
+
+    Returns:
+        Row ids of the logged actions, in order.
+    """
+    defaults = {"old_value": None, "new_value": None, "reason": "", "campaign": "",
+                "ad_group": "", "target_id": "", "approved_by": "auto"}
+    ids = []
+    with transaction() as conn:
+        for action in actions:
+            values = {**defaults, **action}
+            cursor = conn.execute(
+                f"INSERT INTO actions ({', '.join(ACTION_COLUMNS)}) VALUES ({', '.join('?' for _ in ACTION_COLUMNS)})",
+                tuple(values[c] for c in ACTION_COLUMNS),
+            )
+            ids.append(cursor.lastrowid)
+    return ids
 
 
 def log_alert(level: str, category: str, message: str, campaign: str = "") -> int:
-    """Record an alert."""
-    conn = get_conn()
-    cursor = conn.execute(
-        "INSERT INTO alerts (level, category, campaign, message) VALUES (?, ?, ?, ?)",
-        (level, category, campaign, message),
-    )
-    conn.commit()
-    alert_id = cursor.lastrowid
-    conn.close()
-    return alert_id
+    """
+    Record an alert. Repeats of a condition that is still open update its
+    existing row instead of adding one (see db/alert_state.py).
+
+    Returns:
+        Row id of the alert's condition.
+    """
+    from db.alert_state import record_alerts
+    alert = {"level": level, "category": category, "campaign": campaign, "message": message}
+    record_alerts([alert])
+    return alert["id"]
+
+
+def log_alerts(alerts: list[dict], resolve_categories: set[str] | None = None) -> dict:
+    """
+    Record a batch of alerts in a single transaction, deduplicated against
+    the conditions already open (see db/alert_state.record_alerts).
+
+    Args:
+        alerts: Dicts with level, category, message and optional campaign.
+            Annotated in place with id, fingerprint, state and transition.
+        resolve_categories: Categories fully checked this run; their open
+            conditions that are no longer present are resolved.
+
+    Returns:
+        Transition counts and the resolved alerts.
+    """
+    from db.alert_state import record_alerts
+    return record_alerts(alerts, resolve_categories)
 
 
 def log_report(report_type: str, content: str, date_range: str = "") -> int:
-    """Save a generated report."""
+    """Save a generated report (stored compressed)."""
+    with transaction() as conn:
+        cursor = conn.execute(
+            "INSERT INTO reports (report_type, date_range, content, content_zlib) VALUES (?, ?, '', ?)",
+            (report_type, date_range, _compress(content)),
+        )
+    return cursor.lastrowid
+
+
+def get_recent_reports(report_type: str | None = None, limit: int = 10) -> list[dict]:
+    """Get recent reports with their decompressed content, newest first."""
     conn = get_conn()
-    cursor = conn.execute(
-        "INSERT INTO reports (report_type, date_range, content) VALUES (?, ?, ?)",
-        (report_type, date_range, content),
-    )
-    conn.commit()
-    report_id = cursor.lastrowid
-    conn.close()
-    return report_id
+    if report_type:
+        rows = conn.execute(
+            "SELECT * FROM reports WHERE report_type = ? ORDER BY timestamp DESC LIMIT ?", (report_type, limit)
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM reports ORDER BY timestamp DESC LIMIT ?", (limit,)).fetchall()
+    reports = []
+    for r in rows:
+        report = dict(r)
+        blob = report.pop("content_zlib")
+        if blob is not None:
+            report["content"] = zlib.decompress(blob).decode("utf-8")
+        reports.append(report)
+    return reports
 
 
 def get_recent_actions(limit: int = 50) -> list[dict]:
@@ -137,7 +373,6 @@ def get_recent_actions(limit: int = 50) -> list[dict]:
     rows = conn.execute(
         "SELECT * FROM actions ORDER BY timestamp DESC LIMIT ?", (limit,)
     ).fetchall()
-    conn.close()
     return [dict(r) for r in rows]
 
 
@@ -145,41 +380,135 @@ def get_action(action_id: int) -> dict | None:
     """Get a single action by ID."""
     conn = get_conn()
     row = conn.execute("SELECT * FROM actions WHERE id = ?", (action_id,)).fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
 def mark_rolled_back(action_id: int, rollback_action_id: int):
     """Mark an action as rolled back."""
-    conn = get_conn()
-    conn.execute(
-        "UPDATE actions SET rolled_back = 1 WHERE id = ?", (action_id,)
-    )
-    conn.execute(
-        "UPDATE actions SET rollback_of = ? WHERE id = ?", (action_id, rollback_action_id)
-    )
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE actions SET rolled_back = 1 WHERE id = ?", (action_id,)
+        )
+        conn.execute(
+            "UPDATE actions SET rollback_of = ? WHERE id = ?", (action_id, rollback_action_id)
+        )
 
 
-def get_actions_since(timestamp: str) -> list[dict]:
-    """Get all non-rolled-back actions since a timestamp."""
+def get_actions_since(timestamp: datetime | str) -> list[dict]:
+    """Get all non-rolled-back actions since a timestamp (UTC, ISO format or datetime)."""
     conn = get_conn()
     rows = conn.execute(
-        "SELECT * FROM actions WHERE timestamp >= ? AND rolled_back = 0 ORDER BY timestamp DESC",
-        (timestamp,),
+        "SELECT * FROM actions WHERE rolled_back = 0 AND timestamp >= ? ORDER BY timestamp DESC",
+        (_sql_timestamp(timestamp),),
     ).fetchall()
-    conn.close()
     return [dict(r) for r in rows]
 
 
 def get_action_summary(days: int = 7) -> dict:
-    """Summarize actions over the last N days."""
+    """Summarize actions over the last N days, including any already rolled up."""
     conn = get_conn()
-    cutoff = (datetime.now() - __import__('datetime').timedelta(days=days)).isoformat()
+    cutoff = _days_ago(days)
     rows = conn.execute(
-        "SELECT action_type, COUNT(*) as count FROM actions WHERE timestamp >= ? GROUP BY action_type",
-        (cutoff,),
+        """SELECT action_type, SUM(count) AS count FROM (
+               SELECT action_type, COUNT(*) AS count FROM actions
+               WHERE timestamp >= ? GROUP BY action_type
+               UNION ALL
+               SELECT action_type, count FROM action_daily WHERE date >= ?
+           ) GROUP BY action_type""",
+        (cutoff, cutoff[:10]),
     ).fetchall()
-    conn.close()
     return {r["action_type"]: r["count"] for r in rows}
+
+
+def log_job_run(job: str, trigger: str, started_at: datetime, seconds: float, status: str, error: str = "") -> int:
+    """Record one scheduled job run (status: ok / error / timeout)."""
+    with transaction() as conn:
+        cursor = conn.execute(
+            "INSERT INTO job_runs (job, trigger, started_at, seconds, status, error) VALUES (?, ?, ?, ?, ?, ?)",
+            (job, trigger, _sql_timestamp(started_at), seconds, status, error),
+        )
+    return cursor.lastrowid
+
+
+def get_last_job_run(job: str) -> dict | None:
+    """Most recent run of a job, whatever its outcome."""
+    row = get_conn().execute(
+        "SELECT * FROM job_runs WHERE job = ? ORDER BY started_at DESC LIMIT 1", (job,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def get_job_stats(days: int = 7) -> list[dict]:
+    """Per-job run counts, outcomes and latency over the last N days."""
+    rows = get_conn().execute(
+        """SELECT job, COUNT(*) AS runs,
+                  SUM(status = 'error') AS errors, SUM(status = 'timeout') AS timeouts,
+                  AVG(seconds) AS avg_seconds, MAX(seconds) AS max_seconds, MAX(started_at) AS last_run
+           FROM job_runs WHERE started_at >= ? GROUP BY job ORDER BY job""",
+        (_days_ago(days),),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+# ─── Retention ──────────────────────────────────────────────
+
+def run_retention(alert_days: int = 90, report_days: int = 180, action_days: int = 0) -> dict:
+    """
+    Prune old rows so the log stays small after years of scheduled runs.
+
+    Resolved alerts (and actions, if action_days > 0) older than the cutoff are
+    rolled up into per-day counts in alert_daily / action_daily before
+    being deleted; old reports and job runs are deleted outright. Freed pages are then
+    returned to the filesystem and the query planner statistics refreshed.
+
+    Args:
+        alert_days: Keep individual alerts this many days
+        report_days: Keep reports this many days
+        action_days: Keep individual actions this many days (0 = forever,
+                     since they are the rollback audit trail)
+
+    Returns:
+        {"alerts": n, "reports": n, "job_runs": n, "actions": n} rows deleted.
+    """
+    deleted = {"alerts": 0, "reports": 0, "job_runs": 0, "actions": 0}
+    with transaction() as conn:
+        # Only resolved conditions are pruned; open ones stay however old
+        cutoff = _days_ago(alert_days)[:10]
+        conn.execute(
+            """INSERT INTO alert_daily (date, level, category, count)
+               SELECT date(timestamp), level, category, SUM(occurrences) FROM alerts
+               WHERE state = 'resolved' AND resolved_at < ? GROUP BY date(timestamp), level, category
+               ON CONFLICT(date, level, category) DO UPDATE SET count = count + excluded.count""",
+            (cutoff,),
+        )
+        deleted["alerts"] = conn.execute(
+            "DELETE FROM alerts WHERE state = 'resolved' AND resolved_at < ?", (cutoff,)
+        ).rowcount
+
+        deleted["reports"] = conn.execute(
+            "DELETE FROM reports WHERE timestamp < ?", (_days_ago(report_days)[:10],)
+        ).rowcount
+        # Job history is kept as long as alerts; catch-up only needs the latest run
+        deleted["job_runs"] = conn.execute(
+            "DELETE FROM job_runs WHERE started_at < ?", (_days_ago(alert_days)[:10],)
+        ).rowcount
+
+        if action_days > 0:
+            cutoff = _days_ago(action_days)[:10]
+            # Keep any action still referenced by a rollback that survives
+            prunable = """timestamp < :cutoff AND id NOT IN (
+                SELECT rollback_of FROM actions WHERE rollback_of IS NOT NULL AND timestamp >= :cutoff)"""
+            conn.execute(
+                f"""INSERT INTO action_daily (date, action_type, count, rolled_back)
+                    SELECT date(timestamp), action_type, COUNT(*), SUM(rolled_back) FROM actions
+                    WHERE {prunable} GROUP BY date(timestamp), action_type
+                    ON CONFLICT(date, action_type) DO UPDATE SET
+                        count = count + excluded.count,
+                        rolled_back = rolled_back + excluded.rolled_back""",
+                {"cutoff": cutoff},
+            )
+            deleted["actions"] = conn.execute(f"DELETE FROM actions WHERE {prunable}", {"cutoff": cutoff}).rowcount
+
+    conn.executescript("PRAGMA incremental_vacuum")  # execute() would free only one page
+    conn.execute("PRAGMA optimize")
+    return deleted
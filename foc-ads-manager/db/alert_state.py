@@ -0,0 +1,195 @@
+"""
+Alert State — one row per alert condition instead of one per check run.
+
+Alerts are fingerprinted by category, campaign and an identity: the
+alert's "key" when the check supplies one (an ad id, a campaign id, a
+metric), otherwise its message with measured values — amounts,
+percentages, decimals and dates — masked out, so "CPA at $52.10" and
+"CPA at $55.80" are the same condition while "Ad 101" and "Ad 202" are not.
+Each fingerprint has at most one unresolved row (enforced by a unique
+partial index), which moves through:
+
+    open → acknowledged → resolved
+      ↑________________________|   (a resolved condition that recurs opens a new row)
+
+Only transitions are written as new rows or reported for notification:
+a condition that is still present bumps last_seen/occurrences, and an
+acknowledged one stays quiet unless its level escalates.
+
+Transitions (opened, escalated, resolved) clear notified_at, whichever job
+recorded them; claim_notifications() hands each one out exactly once, so a
+change recorded by the analysis cycle or the spend poll is still sent by
+the next notifier.
+"""
+
+import hashlib
+import re
+
+from db import get_conn, transaction
+
+
+LEVEL_RANK = {"INFO": 0, "WARNING": 1, "ERROR": 2, "CRITICAL": 3}
+
+# Measured values only; bare integers are usually identifiers (ad and campaign ids)
+_MEASURE_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}"                 # dates
+    r"|[$€£][+-]?\d[\d,]*(?:\.\d+)?"     # amounts
+    r"|[+-]?\d[\d,]*(?:\.\d+)?%"         # percentages
+    r"|[+-]?\d[\d,]*\.\d+"               # decimals (scores, ratios)
+)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, mask dates/amounts/percentages/decimals as '#', collapse whitespace."""
+    return _SPACE_RE.sub(" ", _MEASURE_RE.sub("#", message.lower())).strip()
+
+
+def fingerprint(category: str, campaign: str, message: str, key: str | None = None) -> str:
+    """Stable id for an alert condition; `key` identifies it in place of the message."""
+    identity = f"key:{key}" if key else normalize_message(message)
+    raw = "|".join((category or "", campaign or "", identity))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def record_alerts(alerts: list[dict], resolve_categories: set[str] | None = None) -> dict:
+    """
+    Merge a batch of current alerts into the alert state, in one transaction.
+
+    Each alert dict is annotated in place with "id", "fingerprint", "state"
+    and "transition":
+        opened      new condition (row inserted)
+        escalated   level went up; re-opened even if acknowledged
+        repeated    still open, already notified
+        suppressed  still present but acknowledged
+
+    Args:
+        alerts: Dicts with level, category, message and optional campaign
+            and key (a stable identity such as "ad:123", see fingerprint())
+        resolve_categories: Categories whose checks ran completely; their
+            unresolved conditions missing from `alerts` are marked resolved.
+            None resolves nothing (for one-off alerts).
+
+    Returns:
+        {"opened": n, "escalated": n, "repeated": n, "suppressed": n,
+         "resolved": [rows that were resolved]}
+    """
+    counts = {"opened": 0, "escalated": 0, "repeated": 0, "suppressed": 0}
+    resolved = []
+    seen: dict[str, dict] = {}
+
+    with transaction() as conn:
+        active = {
+            r["fingerprint"]: dict(r)
+            for r in conn.execute(
+                """SELECT id, fingerprint, level, category, campaign, message, state, timestamp
+                   FROM alerts WHERE state != 'resolved' AND fingerprint IS NOT NULL"""
+            )
+        }
+
+        for alert in alerts:
+            campaign = alert.get("campaign", "")
+            fp = fingerprint(alert["category"], campaign, alert["message"], alert.get("key"))
+            alert["fingerprint"] = fp
+
+            # The same condition twice in one batch is one occurrence
+            if fp in seen:
+                first = seen[fp]
+                alert.update(id=first["id"], state=first["state"], transition=first["transition"])
+                continue
+
+            row = active.get(fp)
+            if row is None:
+                cursor = conn.execute(
+                    """INSERT INTO alerts (level, category, campaign, message, fingerprint, state, last_seen)
+                       VALUES (?, ?, ?, ?, ?, 'open', datetime('now'))""",
+                    (alert["level"], alert["category"], campaign, alert["message"], fp),
+                )
+                alert.update(id=cursor.lastrowid, state="open", transition="opened")
+            else:
+                rank, row_rank = LEVEL_RANK.get(alert["level"], 0), LEVEL_RANK.get(row["level"], 0)
+                escalated = rank > row_rank
+                state = "open" if escalated else row["state"]
+                # The row keeps its highest level; a lower-level repeat keeps the message that goes with it
+                message = alert["message"] if rank >= row_rank else row["message"]
+                conn.execute(
+                    """UPDATE alerts SET level = ?, message = ?, state = ?, last_seen = datetime('now'),
+                                         occurrences = occurrences + 1,
+                                         acknowledged = CASE WHEN ? = 'open' THEN 0 ELSE acknowledged END,
+                                         notified_at = CASE WHEN ? THEN NULL ELSE notified_at END
+                       WHERE id = ?""",
+                    (alert["level"] if escalated else row["level"], message, state, state,
+                     escalated, row["id"]),
+                )
+                transition = "escalated" if escalated else ("suppressed" if state == "acknowledged" else "repeated")
+                alert.update(id=row["id"], state=state, transition=transition)
+
+            counts[alert["transition"]] += 1
+            seen[fp] = alert
+
+        if resolve_categories is not None:
+            gone = [row for fp, row in active.items() if fp not in seen and row["category"] in resolve_categories]
+            conn.executemany(
+                "UPDATE alerts SET state = 'resolved', resolved_at = datetime('now'), notified_at = NULL WHERE id = ?",
+                [(row["id"],) for row in gone],
+            )
+            resolved = [{**row, "state": "resolved", "transition": "resolved"} for row in gone]
+
+    return {**counts, "resolved": resolved}
+
+
+def claim_notifications() -> list[dict]:
+    """
+    Take every transition not yet notified and mark it notified, in one
+    transaction, so concurrent notifiers never send the same change twice.
+
+    Returns:
+        Alert rows, oldest first, each with "transition": opened, escalated
+        (notified before at a lower level) or resolved.
+    """
+    with transaction() as conn:
+        rows = [
+            dict(r)
+            for r in conn.execute(
+                """SELECT * FROM alerts WHERE notified_at IS NULL AND fingerprint IS NOT NULL ORDER BY id"""
+            )
+        ]
+        conn.executemany(
+            "UPDATE alerts SET notified_at = datetime('now'), notified_level = level WHERE id = ?",
+            [(r["id"],) for r in rows],
+        )
+    for r in rows:
+        if r["state"] == "resolved":
+            r["transition"] = "resolved"
+        else:
+            r["transition"] = "escalated" if r["notified_level"] else "opened"
+    return rows
+
+
+def release_notifications(alert_ids: list[int]):
+    """Mark claimed transitions as not notified again, e.g. after a failed send."""
+    with transaction() as conn:
+        conn.executemany("UPDATE alerts SET notified_at = NULL WHERE id = ?", [(i,) for i in alert_ids])
+
+
+def acknowledge_alert(alert_id: int) -> bool:
+    """
+    Acknowledge an open alert so repeats of it stop notifying.
+    Returns False if the alert is not open.
+    """
+    with transaction() as conn:
+        cursor = conn.execute(
+            "UPDATE alerts SET state = 'acknowledged', acknowledged = 1 WHERE id = ? AND state = 'open'",
+            (alert_id,),
+        )
+    return cursor.rowcount > 0
+
+
+def get_active_alerts() -> list[dict]:
+    """Unresolved alerts (open and acknowledged), most severe and most recent first."""
+    rows = get_conn().execute(
+        """SELECT * FROM alerts WHERE state != 'resolved' AND fingerprint IS NOT NULL
+           ORDER BY CASE level WHEN 'CRITICAL' THEN 0 WHEN 'ERROR' THEN 1 WHEN 'WARNING' THEN 2 ELSE 3 END,
+                    last_seen DESC"""
+    ).fetchall()
+    return [dict(r) for r in rows]
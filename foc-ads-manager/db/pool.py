@@ -0,0 +1,101 @@
+"""
+SQLite connection pool shared by the action log and the metrics warehouse.
+
+Each thread keeps one open connection per database file, so a logging call
+costs a statement instead of a connect + PRAGMA + schema script. The schema
+callback runs once per database per process. Connections are in autocommit
+mode; group writes with transaction() so they share one commit (and, in WAL
+mode, one fsync).
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+_local = threading.local()
+_lock = threading.Lock()
+_initialized: set[str] = set()
+# Bumped by close_all(); threads holding older connections reopen them
+_generation = 0
+
+
+def get_connection(path: str, init_schema: Callable[[sqlite3.Connection], None]) -> sqlite3.Connection:
+    """
+    Return this thread's connection to `path`, opening it on first use.
+
+    Args:
+        path: SQLite database file
+        init_schema: Creates tables/indexes; called once per path per process
+    """
+    conns = _thread_connections()
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+
+    with _lock:
+        if path not in _initialized:
+            init_schema(conn)
+            _initialized.add(path)
+    conns[path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Run a block inside one transaction: committed on success, rolled back
+    on error. Nested blocks on the same connection join the outer
+    transaction, so helpers that write can be batched by their caller.
+    """
+    depths = _thread_depths()
+    depth = depths.get(id(conn), 0)
+    if depth == 0:
+        conn.execute("BEGIN IMMEDIATE")
+    depths[id(conn)] = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        depths[id(conn)] = depth
+        if depth == 0:
+            conn.execute("ROLLBACK")
+        raise
+    depths[id(conn)] = depth
+    if depth == 0:
+        conn.execute("COMMIT")
+
+
+def close_all():
+    """
+    Close this thread's connections and make every other thread reopen
+    (and re-check the schema) on its next call. A thread's connections are
+    also closed when the thread exits.
+    """
+    global _generation
+    for conn in _thread_connections().values():
+        conn.close()
+    with _lock:
+        _generation += 1
+        _initialized.clear()
+
+
+def _thread_connections() -> dict[str, sqlite3.Connection]:
+    # A forked child must not reuse the parent's connections
+    owner = (os.getpid(), _generation)
+    if getattr(_local, "owner", None) != owner:
+        _local.owner = owner
+        _local.connections = {}
+        _local.depths = {}
+    return _local.connections
+
+
+def _thread_depths() -> dict[int, int]:
+    _thread_connections()
+    return _local.depths
@@ -0,0 +1,257 @@
+"""
+Metrics Warehouse — SQLite store of daily-segmented Google Ads metrics.
+Past days rarely change, so reports read them locally instead of re-pulling
+LAST_7_DAYS / LAST_30_DAYS from the API on every run.
+"""
+
+import sqlite3
+import os
+import json
+from datetime import datetime
+
+from db import pool
+
+WAREHOUSE_PATH = os.path.join(os.path.dirname(__file__), "metrics.db")
+
+# Columns stored per table, in insert order. Metrics are kept as raw
+# integers (micros) / floats exactly as the API reports them.
+TABLE_COLUMNS = {
+    "campaign_daily": (
+        "date", "campaign_id", "campaign", "status", "bidding_strategy", "budget_micros",
+        "impressions", "clicks", "conversions", "cost_micros", "conversion_value",
+    ),
+    "ad_group_daily": (
+        "date", "ad_group_id", "campaign", "ad_group", "status",
+        "impressions", "clicks", "conversions", "cost_micros",
+    ),
+    "keyword_daily": (
+        "date", "ad_group_id", "criterion_id", "campaign", "ad_group", "keyword", "match_type",
+        "impressions", "clicks", "conversions", "cost_micros",
+    ),
+    "search_term_daily": (
+        "date", "ad_group_id", "search_term", "campaign", "ad_group",
+        "impressions", "clicks", "conversions", "cost_micros",
+    ),
+}
+
+
+def get_conn() -> sqlite3.Connection:
+    """Get this thread's pooled connection to the metrics warehouse (see db/pool.py)."""
+    return pool.get_connection(WAREHOUSE_PATH, _ensure_tables)
+
+
+def _ensure_tables(conn: sqlite3.Connection):
+    """Create tables if they don't exist."""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS campaign_daily (
+            date                TEXT    NOT NULL,
+            campaign_id         INTEGER NOT NULL,
+            campaign            TEXT,
+            status              TEXT,
+            bidding_strategy    TEXT,
+            budget_micros       INTEGER DEFAULT 0,
+            impressions         INTEGER DEFAULT 0,
+            clicks              INTEGER DEFAULT 0,
+            conversions         REAL    DEFAULT 0,
+            cost_micros         INTEGER DEFAULT 0,
+            conversion_value    REAL    DEFAULT 0,
+            PRIMARY KEY (date, campaign_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS ad_group_daily (
+            date                TEXT    NOT NULL,
+            ad_group_id         INTEGER NOT NULL,
+            campaign            TEXT,
+            ad_group            TEXT,
+            status              TEXT,
+            impressions         INTEGER DEFAULT 0,
+            clicks              INTEGER DEFAULT 0,
+            conversions         REAL    DEFAULT 0,
+            cost_micros         INTEGER DEFAULT 0,
+            PRIMARY KEY (date, ad_group_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS keyword_daily (
+            date                TEXT    NOT NULL,
+            ad_group_id         INTEGER NOT NULL,
+            criterion_id        INTEGER NOT NULL,
+            campaign            TEXT,
+            ad_group            TEXT,
+            keyword             TEXT,
+            match_type          TEXT,
+            impressions         INTEGER DEFAULT 0,
+            clicks              INTEGER DEFAULT 0,
+            conversions         REAL    DEFAULT 0,
+            cost_micros         INTEGER DEFAULT 0,
+            PRIMARY KEY (date, ad_group_id, criterion_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS search_term_daily (
+            date                TEXT    NOT NULL,
+            ad_group_id         INTEGER NOT NULL,
+            search_term         TEXT    NOT NULL,
+            campaign            TEXT,
+            ad_group            TEXT,
+            impressions         INTEGER DEFAULT 0,
+            clicks              INTEGER DEFAULT 0,
+            conversions         REAL    DEFAULT 0,
+            cost_micros         INTEGER DEFAULT 0,
+            PRIMARY KEY (date, ad_group_id, search_term)
+        );
+
+        CREATE TABLE IF NOT EXISTS sync_state (
+            table_name          TEXT    PRIMARY KEY,
+            first_date          TEXT    NOT NULL,
+            watermark           TEXT    NOT NULL,
+            synced_at           TEXT    NOT NULL
+        );
+
+        -- Rolling baselines of the anomaly detector (skills/data_gathering/anomaly.py)
+        CREATE TABLE IF NOT EXISTS anomaly_state (
+            series              TEXT    PRIMARY KEY,
+            campaign_id         INTEGER NOT NULL,
+            campaign            TEXT,
+            metric              TEXT    NOT NULL,
+            points              INTEGER NOT NULL,
+            last_date           TEXT    NOT NULL,
+            level               REAL    NOT NULL,
+            variance            REAL    NOT NULL,
+            seasonal            TEXT    NOT NULL,
+            last_value          REAL,
+            last_expected       REAL,
+            last_score          REAL
+        );
+    """)
+
+
+def replace_days(table: str, start: str, end: str, rows) -> int:
+    """
+    Replace all rows of `table` dated start..end (inclusive) with `rows`.
+
+    Deleting the window first means rows that disappeared in a restatement
+    are dropped too. `rows` may be any iterable of tuples in TABLE_COLUMNS
+    order, including a live API stream: it is read to the end before the
+    write transaction opens, so the database is only locked for the
+    DELETE + INSERT, not for the download.
+
+    Returns:
+        Number of rows written.
+    """
+    columns = TABLE_COLUMNS[table]
+    placeholders = ", ".join("?" for _ in columns)
+    rows = list(rows)
+    with pool.transaction(get_conn()) as conn:
+        conn.execute(f"DELETE FROM {table} WHERE date BETWEEN ? AND ?", (start, end))
+        cursor = conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            rows,
+        )
+        count = cursor.rowcount
+    return count
+
+
+def get_sync_state(table: str) -> dict | None:
+    """Return first_date/watermark for a table, or None if never synced."""
+    conn = get_conn()
+    row = conn.execute("SELECT * FROM sync_state WHERE table_name = ?", (table,)).fetchone()
+    return dict(row) if row else None
+
+
+def set_sync_state(table: str, first_date: str, watermark: str):
+    """Record the synced date span for a table."""
+    with pool.transaction(get_conn()) as conn:
+        conn.execute(
+            """INSERT INTO sync_state (table_name, first_date, watermark, synced_at)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT(table_name) DO UPDATE SET
+                   first_date = MIN(first_date, excluded.first_date),
+                   watermark = excluded.watermark,
+                   synced_at = excluded.synced_at""",
+            (table, first_date, watermark, datetime.now().isoformat(timespec="seconds")),
+        )
+
+
+def covers(table: str, start: str, end: str) -> bool:
+    """True if the table holds synced data for every day in start..end."""
+    state = get_sync_state(table)
+    return bool(state) and state["first_date"] <= start and state["watermark"] >= end
+
+
+def get_campaign_totals(start: str, end: str) -> list[dict]:
+    """
+    Sum campaign metrics over start..end. Status, bidding strategy and
+    budget are taken from each campaign's most recent day in the window.
+    """
+    conn = get_conn()
+    rows = conn.execute(
+        """SELECT c.campaign_id, latest.campaign, latest.status, latest.bidding_strategy,
+                  latest.budget_micros,
+                  SUM(c.impressions) AS impressions, SUM(c.clicks) AS clicks,
+                  SUM(c.conversions) AS conversions, SUM(c.cost_micros) AS cost_micros,
+                  SUM(c.conversion_value) AS conversion_value
+           FROM campaign_daily c
+           JOIN campaign_daily latest
+             ON latest.campaign_id = c.campaign_id
+            AND latest.date = (SELECT MAX(date) FROM campaign_daily
+                               WHERE campaign_id = c.campaign_id AND date BETWEEN ? AND ?)
+           WHERE c.date BETWEEN ? AND ?
+           GROUP BY c.campaign_id
+           ORDER BY cost_micros DESC""",
+        (start, end, start, end),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_daily_totals(start: str, end: str) -> list[dict]:
+    """Sum account metrics per day over start..end, newest first."""
+    conn = get_conn()
+    rows = conn.execute(
+        """SELECT date, SUM(impressions) AS impressions, SUM(clicks) AS clicks,
+                  SUM(conversions) AS conversions, SUM(cost_micros) AS cost_micros
+           FROM campaign_daily
+           WHERE date BETWEEN ? AND ?
+           GROUP BY date
+           ORDER BY date DESC""",
+        (start, end),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_campaign_days(start: str, end: str) -> list[dict]:
+    """Per-campaign daily metrics over start..end, oldest day first."""
+    conn = get_conn()
+    rows = conn.execute(
+        """SELECT date, campaign_id, campaign, impressions, clicks, conversions, cost_micros
+           FROM campaign_daily WHERE date BETWEEN ? AND ?
+           ORDER BY date, campaign_id""",
+        (start, end),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def load_anomaly_state() -> dict[str, dict]:
+    """Every anomaly series' state, keyed by series id."""
+    states = {}
+    for r in get_conn().execute("SELECT * FROM anomaly_state"):
+        state = dict(r)
+        state["seasonal"] = json.loads(state["seasonal"])
+        states[state["series"]] = state
+    return states
+
+
+def save_anomaly_state(states) -> int:
+    """Insert or replace anomaly series states. Returns the number written."""
+    columns = (
+        "series", "campaign_id", "campaign", "metric", "points", "last_date", "level", "variance",
+        "seasonal", "last_value", "last_expected", "last_score",
+    )
+    rows = [
+        tuple(json.dumps(s["seasonal"]) if c == "seasonal" else s[c] for c in columns)
+        for s in states
+    ]
+    with pool.transaction(get_conn()) as conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO anomaly_state ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            rows,
+        )
+    return len(rows)
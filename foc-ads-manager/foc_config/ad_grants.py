@@ -27,6 +27,14 @@ MIN_CTR = 5.0
 MIN_AD_GROUPS_PER_CAMPAIGN = 2
 MIN_ADS_PER_AD_GROUP = 2
 
+# Keywords too generic to be allowed on their own
+GENERIC_TERMS = frozenset({"free", "download", "ebook", "news", "today", "best", "help", "stuff"})
+
+# Bidding strategies exempt from the CPC cap
+SMART_BIDDING_STRATEGIES = frozenset({
+    "MAXIMIZE_CONVERSIONS", "MAXIMIZE_CONVERSION_VALUE", "TARGET_CPA", "TARGET_ROAS",
+})
+
 
 def get_compliance_rules() -> dict:
     """Return all Ad Grants compliance rules."""
@@ -43,34 +51,57 @@ def get_compliance_rules() -> dict:
     }
 
 
-def check_keyword_compliance(keyword: str, bid: float, match_type: str = "EXACT") -> dict:
+def get_compliance_settings() -> dict:
+    """
+    Read the Ad Grants environment settings once.
+    Pass the result to check_keyword_compliance() when checking many keywords.
+    """
+    return {
+        "enabled": get_env_bool("AD_GRANTS_MODE", False),
+        "max_cpc": get_env_float("AD_GRANTS_MAX_CPC", MAX_CPC),
+        "min_ctr": get_env_float("AD_GRANTS_MIN_CTR", MIN_CTR),
+    }
+
+
+def check_keyword_compliance(keyword: str, bid: float, match_type: str = "EXACT",
+                             settings: dict | None = None) -> dict:
     """
     Check if a keyword meets Ad Grants requirements.
 
+    Args:
+        settings: get_compliance_settings() output (read from the environment
+                  if None)
+
     Returns:
-        dict with 'compliant' (bool) and 'issues' (list of strings).
+        dict with 'compliant' (bool), 'issues' (list of strings) and 'rules'
+        (the rule each issue broke: max_cpc, single_word or generic).
     """
-    if not get_env_bool("AD_GRANTS_MODE", False):
-        return {"compliant": True, "issues": []}
+    if settings is None:
+        settings = get_compliance_settings()
+    if not settings["enabled"]:
+        return {"compliant": True, "issues": [], "rules": []}
 
     issues = []
-    max_cpc = get_env_float("AD_GRANTS_MAX_CPC", MAX_CPC)
+    rules = []
+    max_cpc = settings["max_cpc"]
 
     # CPC cap check
     if bid > max_cpc:
         issues.append(f"Bid ${bid:.2f} exceeds Ad Grants max CPC ${max_cpc:.2f}")
+        rules.append("max_cpc")
 
     # Single-word keyword check
     words = keyword.strip().split()
     if len(words) == 1 and match_type != "EXACT":
         issues.append(f"Single-word keyword '{keyword}' not allowed in Ad Grants (except exact match branded)")
+        rules.append("single_word")
 
     # Overly generic check
-    generic_terms = {"free", "download", "ebook", "news", "today", "best", "help", "stuff"}
-    if keyword.lower() in generic_terms:
+    if keyword.lower() in GENERIC_TERMS:
         issues.append(f"Keyword '{keyword}' is too generic for Ad Grants")
+        rules.append("generic")
 
-    return {"compliant": len(issues) == 0, "issues": issues}
+    return {"compliant": len(issues) == 0, "issues": issues, "rules": rules}
 
 
 def check_ctr_compliance(account_ctr: float) -> dict:
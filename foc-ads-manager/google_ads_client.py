@@ -1,11 +1,21 @@
 """
 FOC Google Ads Agent — Shared API Client
-Handles authentication, GAQL queries, and common API operations.
+Handles authentication, GAQL queries, recorded-fixture replay, and common
+API operations.
 """
 
 import os
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from collections import OrderedDict
 from dotenv import load_dotenv
 from google.ads.googleads.client import GoogleAdsClient
+from google.oauth2.credentials import Credentials
 from google.ads.googleads.errors import GoogleAdsException
 
 load_dotenv()
@@ -28,11 +38,27 @@ def get_customer_id() -> str:
     return os.getenv("GOOGLE_ADS_CUSTOMER_ID", "").replace("-", "")
 
 
-def get_client() -> GoogleAdsClient:
-    """Create an authenticated GoogleAdsClient instance."""
-    config = get_config()
+# ─── Client registry ─────────────────────────────────────────
+# Building a GoogleAdsClient is expensive: it parses the config, creates
+# OAuth credentials and, for every get_service() call, a new gRPC channel.
+# Clients and their services are therefore built once per login customer
+# ID and shared by every skill in the process. gRPC channels and the
+# proto-plus service clients are thread-safe, so one warm client can serve
+# concurrent queries. Credentials are built without an access token, so
+# the OAuth refresh happens lazily on the first request (and again after
+# expiry) instead of blocking client construction.
+
+OAUTH_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+_registry_lock = threading.Lock()
+_clients: dict[str, tuple[tuple, GoogleAdsClient]] = {}
+_services: dict[tuple[int, str], object] = {}
+_client_stats = {"clients_created": 0, "clients_reused": 0,
+                 "services_created": 0, "services_reused": 0}
 
-    # Check for required credentials
+
+def _check_credentials(config: dict):
+    """Exit with a readable message if any required credential is missing."""
     missing = []
     if not config.get("developer_token"):
         missing.append("GOOGLE_ADS_DEVELOPER_TOKEN")
@@ -54,32 +80,381 @@ def get_client() -> GoogleAdsClient:
             print("  to generate your refresh token.\n")
         raise SystemExit(1)
 
-    return GoogleAdsClient.load_from_dict(config)
 
-def run_query(client: GoogleAdsClient, customer_id: str, query: str) -> list[dict]:
+def get_client(login_customer_id: str | None = None) -> GoogleAdsClient:
+    """
+    Return a shared, authenticated GoogleAdsClient.
+
+    Clients are cached per login customer ID (defaults to
+    GOOGLE_ADS_LOGIN_CUSTOMER_ID). A cached client is rebuilt only if the
+    credentials in the environment have changed since it was created.
     """
-    Execute a GAQL query and return results as a list of dicts.
+    config = get_config()
+    if login_customer_id is not None:
+        config["login_customer_id"] = login_customer_id.replace("-", "")
+    transport = get_transport()
+    if transport == "replay":
+        # Fixtures stand in for the API, so credentials are optional
+        for k in ("developer_token", "client_id", "client_secret", "refresh_token"):
+            config[k] = config[k] or "replay"
+    key = config.get("login_customer_id") or ""
+    fingerprint = (transport,) + tuple(sorted((k, str(v)) for k, v in config.items()))
+
+    with _registry_lock:
+        cached = _clients.get(key)
+        if cached and cached[0] == fingerprint:
+            _client_stats["clients_reused"] += 1
+            return cached[1]
+
+        _check_credentials(config)
+        client = _build_client(config)
+        if cached:
+            _drop_services(cached[1])
+        _clients[key] = (fingerprint, client)
+        _client_stats["clients_created"] += 1
+        return client
+
+
+def _build_client(config: dict) -> GoogleAdsClient:
+    """Build a client whose OAuth token is fetched on first use."""
+    credentials = Credentials(
+        token=None,
+        refresh_token=config["refresh_token"],
+        client_id=config["client_id"],
+        client_secret=config["client_secret"],
+        token_uri=OAUTH_TOKEN_URI,
+    )
+    return GoogleAdsClient(
+        credentials=credentials,
+        developer_token=config["developer_token"],
+        login_customer_id=config.get("login_customer_id") or None,
+        use_proto_plus=config.get("use_proto_plus", True),
+    )
+
+
+def get_service(client: GoogleAdsClient, service_name: str):
+    """Return a cached service (and its gRPC channel) for a shared client."""
+    key = (id(client), service_name)
+    with _registry_lock:
+        service = _services.get(key)
+        if service is not None:
+            _client_stats["services_reused"] += 1
+            return service
+        service = _open_service(client, service_name)
+        _services[key] = service
+        _client_stats["services_created"] += 1
+        return service
+
+
+def use_service(client: GoogleAdsClient, service_name: str, service):
+    """Serve `service_name` for a shared client from a stand-in object (e.g. benchmarks/synthetic.py)."""
+    with _registry_lock:
+        _services[(id(client), service_name)] = service
+
+
+def _drop_services(client: GoogleAdsClient):
+    """Forget cached services belonging to a replaced client."""
+    for key in [k for k in _services if k[0] == id(client)]:
+        del _services[key]
+
+
+def get_client_stats() -> dict:
+    """Return counters showing how much client/channel setup was reused."""
+    with _registry_lock:
+        return dict(_client_stats)
+
+
+def reset_client_stats():
+    """Zero the reuse counters (e.g. at the start of an analysis cycle)."""
+    with _registry_lock:
+        for k in _client_stats:
+            _client_stats[k] = 0
+
+
+def close_clients():
+    """Drop all cached clients and services so the next call reconnects."""
+    with _registry_lock:
+        _clients.clear()
+        _services.clear()
+
+
+# ─── Record / replay ─────────────────────────────────────────
+# GOOGLE_ADS_TRANSPORT selects how services are served:
+#   live    call the API (default)
+#   record  call the API and save every completed GoogleAdsService query
+#   replay  serve saved queries only; no credentials or network needed
+# A fixture holds one (customer ID, normalized GAQL) query: each streamed
+# response serialized to protobuf bytes (base64) plus when it arrived, as
+# gzipped JSON under ADS_FIXTURE_DIR — plain data, so loading a fixture from
+# elsewhere cannot run code. REPLAY_LATENCY is "0" (serve as fast as possible),
+# "recorded" (arrive on the recorded schedule) or a number of seconds to
+# wait before each query's first response.
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+TRANSPORTS = ("live", "record", "replay")
+
+
+def get_transport() -> str:
+    """Return the configured transport: 'live', 'record' or 'replay'."""
+    transport = os.getenv("GOOGLE_ADS_TRANSPORT", "live").lower()
+    if transport not in TRANSPORTS:
+        raise ValueError(f"GOOGLE_ADS_TRANSPORT must be one of {TRANSPORTS}, got {transport!r}")
+    return transport
+
+
+def fixture_path(customer_id: str, query: str) -> str:
+    """Where the fixture for a query is recorded (named by a hash of the normalized GAQL)."""
+    digest = hashlib.sha256(normalize_query(query).encode()).hexdigest()[:24]
+    return os.path.join(os.getenv("ADS_FIXTURE_DIR", DEFAULT_FIXTURE_DIR), customer_id or "none", f"{digest}.json.gz")
+
+
+def _open_service(client: GoogleAdsClient, service_name: str):
+    transport = get_transport()
+    if transport == "replay":
+        return _ReplayService(client, service_name)
+    service = client.get_service(service_name)
+    if transport == "record" and service_name == "GoogleAdsService":
+        return _RecordingService(service)
+    return service
+
+
+class _RecordingService:
+    """GoogleAdsService wrapper that saves each fully consumed stream as a fixture."""
+
+    def __init__(self, service):
+        self._service = service
+
+    def __getattr__(self, name):
+        return getattr(self._service, name)
+
+    def search_stream(self, customer_id: str, query: str, **kwargs):
+        start = time.perf_counter()
+        responses, offsets = [], []
+        for response in self._service.search_stream(customer_id=customer_id, query=query, **kwargs):
+            responses.append(base64.b64encode(type(response).serialize(response)).decode("ascii"))
+            offsets.append(time.perf_counter() - start)
+            yield response
+        # Only reached when the stream completed; partial reads are not saved
+        _write_fixture(customer_id, query, {
+            "customer_id": customer_id,
+            "query": normalize_query(query),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "responses": responses,
+            "offsets": offsets,
+        })
+
+
+class _ReplayService:
+    """Serves recorded GoogleAdsService streams; every other call is refused."""
+
+    def __init__(self, client: GoogleAdsClient, service_name: str):
+        self._client = client
+        self._name = service_name
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def unavailable(*args, **kwargs):
+            raise RuntimeError(f"{self._name}.{name} is not available with GOOGLE_ADS_TRANSPORT=replay")
+        return unavailable
+
+    def search_stream(self, customer_id: str, query: str, **kwargs):
+        if self._name != "GoogleAdsService":
+            raise RuntimeError(f"{self._name} has no search_stream")
+        path = fixture_path(customer_id, query)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            raise LookupError(f"No recorded fixture for this query ({path}); "
+                              f"run once with GOOGLE_ADS_TRANSPORT=record:\n{normalize_query(query)}") from None
+        return self._replay(fixture)
+
+    def _replay(self, fixture: dict):
+        response_type = type(self._client.get_type("SearchGoogleAdsStreamResponse"))
+        latency = os.getenv("REPLAY_LATENCY", "0").lower()
+        if latency == "recorded":
+            schedule = fixture["offsets"]
+        else:
+            schedule = [float(latency)] * len(fixture["responses"])
+
+        start = time.perf_counter()
+        for payload, due in zip(fixture["responses"], schedule):
+            wait = due - (time.perf_counter() - start)
+            if wait > 0:
+                time.sleep(wait)
+            yield response_type.deserialize(base64.b64decode(payload))
+
+
+def _write_fixture(customer_id: str, query: str, fixture: dict):
+    path = fixture_path(customer_id, query)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(fixture, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"  ⚠️ Could not record fixture {path}: {e}")
+
+
+def _print_google_ads_error(ex: GoogleAdsException, label: str = "GoogleAds ERROR"):
+    """Print the request ID and error details of a failed API call."""
+    print(f"[{label}] Request ID: {ex.request_id}")
+    for error in ex.failure.errors:
+        print(f"  → {error.error_code}: {error.message}")
+
+
+# ─── Query result cache ──────────────────────────────────────
+# Within one analysis cycle several skills issue the same GAQL (search
+# terms, budgets, account summary). Completed results are memoized per
+# (customer ID, normalized GAQL) for QUERY_CACHE_TTL seconds, in an LRU
+# bounded by QUERY_CACHE_MAX_ENTRIES. Results larger than
+# QUERY_CACHE_MAX_ROWS are streamed through without being cached. Readers
+# of large reports (search terms, keywords, columnar tables) pass
+# use_cache=False so their rows are never buffered here at all.
+
+_cache_lock = threading.Lock()
+_query_cache: OrderedDict[tuple[str, str], tuple[float, list]] = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "uncacheable": 0}
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so formatting differences share a cache entry."""
+    return " ".join(query.split())
+
+
+def _cache_get(key: tuple[str, str]) -> list | None:
+    ttl = get_env_float("QUERY_CACHE_TTL", 900)
+    with _cache_lock:
+        entry = _query_cache.get(key)
+        if entry is None or time.monotonic() - entry[0] > ttl:
+            if entry is not None:
+                del _query_cache[key]
+            _cache_stats["misses"] += 1
+            return None
+        _query_cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+        return entry[1]
+
+
+def _cache_put(key: tuple[str, str], rows: list):
+    max_entries = get_env_int("QUERY_CACHE_MAX_ENTRIES", 64)
+    with _cache_lock:
+        _query_cache[key] = (time.monotonic(), rows)
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > max_entries:
+            _query_cache.popitem(last=False)
+            _cache_stats["evictions"] += 1
+
+
+def invalidate_query_cache(customer_id: str | None = None):
+    """Drop cached results for one customer, or for everyone if None."""
+    with _cache_lock:
+        if customer_id is None:
+            _query_cache.clear()
+            return
+        for key in [k for k in _query_cache if k[0] == customer_id]:
+            del _query_cache[key]
+
+
+def get_query_cache_stats() -> dict:
+    """Return cache hit/miss counters and the current number of entries."""
+    with _cache_lock:
+        return {**_cache_stats, "entries": len(_query_cache)}
+
+
+def reset_query_cache_stats():
+    """Zero the cache counters without dropping cached results."""
+    with _cache_lock:
+        for k in _cache_stats:
+            _cache_stats[k] = 0
+
+
+def stream_query(client: GoogleAdsClient, customer_id: str, query: str,
+                 batches: bool = False, use_cache: bool = True):
+    """
+    Execute a GAQL query with search_stream and yield results as they arrive.
+
+    A fresh cached result for the same query is replayed instead of calling
+    the API. Otherwise rows are streamed and, if the stream completes within
+    QUERY_CACHE_MAX_ROWS, memoized for later callers. Larger results are
+    never accumulated, so a consumer that processes each row and drops it
+    keeps memory flat regardless of the report size.
 
     Args:
         client: Authenticated GoogleAdsClient
         customer_id: Google Ads customer ID (no dashes)
         query: GAQL query string
+        batches: Yield each streamed response's row batch instead of single rows
+        use_cache: Read from and populate the query result cache
 
-    Returns:
-        List of row dicts with dotted attribute paths as keys.
+    Yields:
+        GoogleAdsRow objects (or lists of them when batches=True).
     """
-    ga_service = client.get_service("GoogleAdsService")
-    rows = []
+    key = (customer_id, normalize_query(query))
+    if use_cache:
+        cached = _cache_get(key)
+        if cached is not None:
+            if batches:
+                yield cached
+            else:
+                yield from cached
+            return
+
+    max_rows = get_env_int("QUERY_CACHE_MAX_ROWS", 50_000)
+    collected: list | None = [] if use_cache and get_env_float("QUERY_CACHE_TTL", 900) > 0 else None
+
+    ga_service = get_service(client, "GoogleAdsService")
     try:
-        response = ga_service.search(customer_id=customer_id, query=query)
-        for row in response:
-            rows.append(row)
+        stream = ga_service.search_stream(customer_id=customer_id, query=query)
+        for response in stream:
+            results = list(response.results) if batches or collected is not None else response.results
+            if collected is not None:
+                collected.extend(results)
+                if len(collected) > max_rows:
+                    collected = None
+                    with _cache_lock:
+                        _cache_stats["uncacheable"] += 1
+            if batches:
+                yield results
+            else:
+                yield from results
     except GoogleAdsException as ex:
-        print(f"[GoogleAds ERROR] Request ID: {ex.request_id}")
-        for error in ex.failure.errors:
-            print(f"  → {error.error_code}: {error.message}")
+        _print_google_ads_error(ex)
         raise
-    return rows
+
+    if collected is not None:
+        _cache_put(key, collected)
+
+
+def run_query(client: GoogleAdsClient, customer_id: str, query: str) -> list:
+    """
+    Execute a GAQL query and return all result rows as a list.
+
+    Prefer stream_query() for large reports that can be consumed row by row.
+
+    Args:
+        client: Authenticated GoogleAdsClient
+        customer_id: Google Ads customer ID (no dashes)
+        query: GAQL query string
+
+    Returns:
+        List of GoogleAdsRow objects.
+    """
+    return list(stream_query(client, customer_id, query))
+
+
+# Called with the customer ID after every successful mutate(), so layers
+# above this module (e.g. dataset snapshots) can drop what the change made stale
+_mutation_hooks: list = []
+
+
+def on_mutation(hook):
+    """Register hook(customer_id) to run after each successful mutate()."""
+    if hook not in _mutation_hooks:
+        _mutation_hooks.append(hook)
 
 
 def mutate(client: GoogleAdsClient, customer_id: str, operations: list, service_name: str = "GoogleAdsService"):
@@ -95,14 +470,15 @@ def mutate(client: GoogleAdsClient, customer_id: str, operations: list, service_
     Returns:
         MutateGoogleAdsResponse
     """
-    service = client.get_service(service_name)
+    service = get_service(client, service_name)
     try:
         response = service.mutate(customer_id=customer_id, mutate_operations=operations)
+        invalidate_query_cache(customer_id)
+        for hook in list(_mutation_hooks):
+            hook(customer_id)
         return response
     except GoogleAdsException as ex:
-        print(f"[GoogleAds MUTATE ERROR] Request ID: {ex.request_id}")
-        for error in ex.failure.errors:
-            print(f"  → {error.error_code}: {error.message}")
+        _print_google_ads_error(ex, "GoogleAds MUTATE ERROR")
         raise
 
 
@@ -11,14 +11,15 @@ Usage:
     python main.py --status        # Show account status
     python main.py --schedule      # Run on a schedule (daily/weekly)
     python main.py --recommend     # Show all recommendations
+    python main.py --sync          # Sync daily metrics into the local warehouse
+    python main.py --audit         # Audit the account for Ad Grants compliance
+    python main.py --jobs          # Show scheduled job run history
 """
 
 from __future__ import annotations
 import sys
 import os
 import argparse
-import schedule
-import time
 from datetime import datetime
 
 # Ensure project root is on the path
@@ -37,9 +38,15 @@ READ_ONLY_BANNER = """
 """
 
 
+def _counter_delta(before: dict, after: dict) -> dict:
+    """Change in each counter between two stats snapshots."""
+    return {k: after[k] - before.get(k, 0) for k in after}
+
+
 def run_analysis_cycle():
     """
     Full analysis cycle (read-only):
+    0. Fetch the datasets every step needs, once and concurrently
     1. Check spending/alerts
     2. Analyze search terms for negative keyword opportunities
     3. Identify keyword expansion opportunities
@@ -51,20 +58,40 @@ def run_analysis_cycle():
     print(f"  Analysis started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'═' * 55}\n")
 
+    from google_ads_client import get_client_stats, get_query_cache_stats
+    # The counters are shared with jobs running alongside this cycle, so
+    # report the change over the cycle instead of zeroing them
+    client_before, cache_before = get_client_stats(), get_query_cache_stats()
+
+    from skills.data_gathering.planner import datasets_for, fetch_datasets, format_plan_summary
+    from skills.reporting import alerts as alerts_skill, daily_summary
+    from skills.actions import negative_keywords, keyword_expansion, bid_optimizer, ad_copy_tester
+
+    # 0. Shared data
+    print("Step 0/6: Fetching shared data...")
+    data = fetch_datasets(datasets_for([
+        alerts_skill, negative_keywords, keyword_expansion, bid_optimizer, ad_copy_tester, daily_summary,
+    ]))
+    print(f"  ⚡ {format_plan_summary(data)}\n")
+
     # 1. Check alerts
     print("Step 1/6: Checking alerts...")
-    from skills.reporting.alerts import check_all_alerts
-    alerts = check_all_alerts()
+    alerts, resolved = alerts_skill.check_all_alerts(data)
     for a in alerts:
-        icon = {"CRITICAL": "🔴", "WARNING": "🟡", "INFO": "🔵"}.get(a["level"], "⚪")
-        print(f"  {icon} {a['message']}")
+        if a["transition"] == "suppressed":
+            continue
+        icon = {"CRITICAL": "🔴", "WARNING": "🟡", "INFO": "🔵", "ERROR": "⚫"}.get(a["level"], "⚪")
+        new = " 🆕" if a["transition"] in ("opened", "escalated") else ""
+        print(f"  {icon} {a['message']}{new}")
+    for r in resolved:
+        print(f"  ✅ Resolved: {r['message']}")
     if not alerts:
         print("  ✅ No alerts")
+    alerts_skill.notify_alert_changes()
 
     # 2. Negative keyword recommendations
     print("\nStep 2/6: Analyzing search terms for negatives...")
-    from skills.actions.negative_keywords import get_recommendations as get_neg_recs
-    neg_recs = get_neg_recs()
+    neg_recs = negative_keywords.get_recommendations(data.get("search_terms"))
     if neg_recs:
         total_waste = sum(r["cost"] for r in neg_recs)
         print(f"  ⚠️ {len(neg_recs)} terms wasting ${total_waste:.2f}")
@@ -72,11 +99,14 @@ def run_analysis_cycle():
             print(f"    → \"{r['search_term']}\" — {r['clicks']} clicks, $0 conversions")
     else:
         print("  ✅ No negative keyword recommendations")
+    seed_recs = negative_keywords.get_seed_recommendations(data.get("search_terms"), data.get("live_negatives"))
+    if seed_recs:
+        print(f"  🌱 {len(seed_recs)} seed-list phrases matching live traffic "
+              f"(${sum(r['cost'] for r in seed_recs):.2f}) — not yet negatives")
 
     # 3. Keyword expansion recommendations
     print("\nStep 3/6: Finding keyword expansion opportunities...")
-    from skills.actions.keyword_expansion import get_recommendations as get_exp_recs
-    exp_recs = get_exp_recs()
+    exp_recs = keyword_expansion.get_recommendations(data.get("search_terms"), data.get("keywords"))
     if exp_recs:
         print(f"  🚀 {len(exp_recs)} converting terms not yet added")
         for r in exp_recs[:3]:
@@ -86,8 +116,7 @@ def run_analysis_cycle():
 
     # 4. Bid recommendations
     print("\nStep 4/6: Analyzing bids vs CPA targets...")
-    from skills.actions.bid_optimizer import get_recommendations as get_bid_recs
-    bid_recs = get_bid_recs()
+    bid_recs = bid_optimizer.get_recommendations(keywords=data.get("keywords"))
     if bid_recs:
         increases = len([r for r in bid_recs if r["action"] == "INCREASE"])
         decreases = len([r for r in bid_recs if r["action"] == "DECREASE"])
@@ -98,17 +127,23 @@ def run_analysis_cycle():
 
     # 5. Ad copy analysis
     print("\nStep 5/6: Analyzing ad copy performance...")
-    from skills.actions.ad_copy_tester import get_recommendations as get_ad_recs
-    ad_results = get_ad_recs()
+    ad_results = ad_copy_tester.get_recommendations(ads=data.get("ad_performance"))
     print(f"  🏆 {len(ad_results['winners'])} top performers")
     print(f"  ⚠️ {len(ad_results['losers'])} underperformers")
+    print(f"  ⏳ {len(ad_results['inconclusive'])} still inconclusive")
     print(f"  📊 {len(ad_results['insufficient_data'])} need more data")
 
     # 6. Daily report
     print("\nStep 6/6: Generating daily report...")
-    from skills.reporting.daily_summary import generate_daily_summary, send_report
-    report = generate_daily_summary()
-    send_report(report)
+    report = daily_summary.generate_daily_summary(data)
+    daily_summary.send_report(report)
+
+    stats = _counter_delta(client_before, get_client_stats())
+    print(f"\n  ♻️ API connections: {stats['clients_created']} client(s) built, "
+          f"{stats['clients_reused']} reused; {stats['services_created']} channel(s) opened, "
+          f"{stats['services_reused']} reused")
+    cache = _counter_delta(cache_before, get_query_cache_stats())
+    print(f"  🗂️ Query cache: {cache['misses']} fetched, {cache['hits']} served from cache")
 
     print(f"\n{'═' * 55}")
     print("  🔒 Analysis complete — recommendations only, no changes made")
@@ -135,29 +170,101 @@ def show_recommendations():
 
 def run_daily_report():
     """Generate and send the daily summary report."""
-    from skills.reporting.daily_summary import generate_daily_summary, send_report
-    report = generate_daily_summary()
-    send_report(report)
+    from skills.data_gathering.planner import datasets_for, fetch_datasets, format_plan_summary
+    from skills.reporting import daily_summary
+    data = fetch_datasets(datasets_for([daily_summary]))
+    print(f"  ⚡ {format_plan_summary(data)}")
+    report = daily_summary.generate_daily_summary(data)
+    daily_summary.send_report(report)
 
 
 def run_weekly_report():
     """Generate and send the weekly deep dive report."""
-    from skills.reporting.weekly_deep_dive import generate_weekly_report
+    from skills.data_gathering.planner import datasets_for, fetch_datasets, format_plan_summary
+    from skills.reporting import weekly_deep_dive
     from skills.reporting.daily_summary import send_report
-    report = generate_weekly_report()
+    data = fetch_datasets(datasets_for([weekly_deep_dive]))
+    print(f"  ⚡ {format_plan_summary(data)}")
+    report = weekly_deep_dive.generate_weekly_report(data)
     send_report(report)
 
 
-def run_alerts():
-    """Check all alerts."""
-    from skills.reporting.alerts import check_all_alerts
-    alerts = check_all_alerts()
-    if alerts:
-        for a in alerts:
-            icon = {"CRITICAL": "🔴", "WARNING": "🟡", "INFO": "🔵", "ERROR": "⚫"}.get(a["level"], "⚪")
-            print(f"{icon} [{a['level']}] {a.get('campaign', '')}: {a['message']}")
+def run_ad_grants_audit():
+    """Audit the whole account against the Ad Grants rules."""
+    print(READ_ONLY_BANNER)
+    from skills.reporting.ad_grants_audit import format_report
+    print(format_report())
+
+
+def run_spend_check():
+    """
+    Poll today's spend and notify when the spend-cap alert opens or escalates
+    (along with any other alert change not yet notified).
+    Clearing it is left to the full alert checks, which also own the
+    blocked-action alerts from enforce_cap.
+    """
+    from skills.data_gathering.budget import check_spend_cap, get_spend_cap_alerts, poll_today_spend
+    from skills.reporting.alerts import notify_alert_changes
+    from db import log_alerts
+    poll = poll_today_spend()
+    cap = check_spend_cap()
+    rate = f", ${poll['rate_per_hour']:.2f}/h" if poll["rate_per_hour"] is not None else ""
+    print(f"  💰 Today's spend ${poll['spend']:.2f} ({poll['delta']:+.2f} since the previous poll{rate}) — {cap['status']}")
+    alerts = get_spend_cap_alerts(cap)
+    log_alerts(alerts)
+    notify_alert_changes()
+
+
+def run_hour_cube_update():
+    """Fold newly settled hourly data into the hour × weekday cube."""
+    from skills.data_gathering.hour_cube import update_hour_cube
+    info = update_hour_cube()
+    if info["start"]:
+        print(f"  🕒 Hour cube: {info['rows']} hourly rows ({info['start']} → {info['end']}), "
+              f"{info['campaigns']} campaigns")
     else:
+        print(f"  🕒 Hour cube already up to date through {info['end']}")
+
+
+def run_db_maintenance():
+    """Prune and roll up old alerts, reports and actions in the action log."""
+    from google_ads_client import get_env_int
+    from db import run_retention
+    deleted = run_retention(
+        alert_days=get_env_int("ALERT_RETENTION_DAYS", 90),
+        report_days=get_env_int("REPORT_RETENTION_DAYS", 180),
+        action_days=get_env_int("ACTION_RETENTION_DAYS", 0),
+    )
+    print(f"  🧹 Pruned {deleted['alerts']} alerts, {deleted['reports']} reports, {deleted['actions']} actions")
+
+
+def run_warehouse_sync():
+    """Incrementally sync daily metrics into the local warehouse."""
+    from skills.data_gathering.warehouse import sync_warehouse
+    synced = sync_warehouse()
+    for table, info in synced.items():
+        print(f"  🗄️ {table}: {info['rows']} rows ({info['start']} → {info['end']})")
+    if not synced:
+        print("  🗄️ Warehouse already up to date")
+
+
+def run_alerts():
+    """
+    Check all alerts; notify only about alerts that opened, escalated or
+    resolved since the last notification, including changes recorded by
+    other jobs.
+    """
+    from skills.data_gathering.planner import datasets_for, fetch_datasets
+    from skills.reporting import alerts as alerts_skill
+    from skills.reporting.alerts import check_all_alerts, format_check_timings, notify_alert_changes
+    # Spend is refetched past its 5-minute policy; ad/campaign status is always read live
+    alerts, _ = check_all_alerts(fetch_datasets(datasets_for([alerts_skill])))
+    sent = notify_alert_changes()
+    if not sent and alerts:
+        print(f"🔕 {len(alerts)} alert(s) still active, no changes since the last check")
+    elif not sent:
         print("✅ No alerts — all clear!")
+    print(f"⏱️ Checks: {format_check_timings()}")
 
 
 def show_status():
@@ -184,26 +291,60 @@ def show_status():
 
 
 def run_scheduled():
-    """Run the agent on a schedule (read-only)."""
+    """
+    Run the agent on a schedule (read-only).
+
+    Each job runs on its own thread (see scheduler.py), so a slow report
+    never delays the alert checks, and a hung job times out instead of
+    stalling the schedule.
+    """
+    from google_ads_client import get_env_bool, get_env_float, get_env_int
+    from scheduler import JobScheduler
     print(READ_ONLY_BANNER)
     print("🕐 FOC Ads Agent — Scheduled Mode (READ-ONLY)")
     print("   Daily analysis: 8:00 AM")
     print("   Daily report: 6:00 PM")
     print("   Weekly report: Monday 9:00 AM")
     print("   Alert checks: Every 2 hours")
+    print(f"   Spend cap checks: Every {get_env_int('SPEND_CHECK_MINUTES', 10)} minutes")
+    print("   Log maintenance: 3:00 AM")
+    print("   Hour × weekday cube: 6:00 AM")
+    if get_env_bool("USE_METRICS_WAREHOUSE", False):
+        print("   Warehouse sync: 7:30 AM")
     print("   Press Ctrl+C to stop\n")
 
-    schedule.every().day.at("08:00").do(run_analysis_cycle)
-    schedule.every().day.at("18:00").do(run_daily_report)
-    schedule.every().monday.at("09:00").do(run_weekly_report)
-    schedule.every(2).hours.do(run_alerts)
+    timeout = get_env_float("JOB_TIMEOUT", 1800.0)
+    jobs = JobScheduler()
+    if get_env_bool("USE_METRICS_WAREHOUSE", False):
+        jobs.add("warehouse_sync", jobs.every().day.at("07:30"), run_warehouse_sync, timeout=timeout)
+
+    jobs.add("analysis", jobs.every().day.at("08:00"), run_analysis_cycle, timeout=timeout)
+    jobs.add("daily_report", jobs.every().day.at("18:00"), run_daily_report, timeout=timeout)
+    jobs.add("weekly_report", jobs.every().monday.at("09:00"), run_weekly_report, timeout=timeout)
+    jobs.add("alerts", jobs.every(2).hours, run_alerts, timeout=get_env_float("ALERT_JOB_TIMEOUT", 600.0),
+             overlap="coalesce", catch_up=False)
+    jobs.add("spend_check", jobs.every(get_env_int("SPEND_CHECK_MINUTES", 10)).minutes, run_spend_check,
+             timeout=get_env_float("ALERT_JOB_TIMEOUT", 600.0), catch_up=False)
+    jobs.add("hour_cube", jobs.every().day.at("06:00"), run_hour_cube_update, timeout=timeout)
+    jobs.add("db_maintenance", jobs.every().day.at("03:00"), run_db_maintenance, timeout=timeout)
+    jobs.add("job_stats", jobs.every().day.at("00:00"), lambda: print(jobs.format_stats()), catch_up=False)
 
     # Run immediately on start
-    run_alerts()
+    jobs.run_now("alerts", trigger="startup")
+    jobs.run_forever()
+
 
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+def show_job_history(days: int = 7):
+    """Show scheduled job runs and latency from the action log."""
+    from db import get_job_stats
+    stats = get_job_stats(days)
+    print(f"═══ SCHEDULED JOBS (Last {days} Days) ═══")
+    if not stats:
+        print("  No job runs recorded")
+    for s in stats:
+        failed = f", {s['errors']} errors, {s['timeouts']} timeouts" if s["errors"] or s["timeouts"] else ""
+        print(f"  {s['job']}: {s['runs']} runs, avg {s['avg_seconds']:.1f}s, max {s['max_seconds']:.1f}s"
+              f"{failed} — last {s['last_run']} UTC")
 
 
 def main():
@@ -214,6 +355,9 @@ def main():
     parser.add_argument("--alerts", action="store_true", help="Check alerts")
     parser.add_argument("--status", action="store_true", help="Show account status")
     parser.add_argument("--recommend", action="store_true", help="Show all recommendations")
+    parser.add_argument("--sync", action="store_true", help="Sync daily metrics into the local warehouse")
+    parser.add_argument("--audit", action="store_true", help="Audit the account for Ad Grants compliance")
+    parser.add_argument("--jobs", action="store_true", help="Show scheduled job run history")
 
     args = parser.parse_args()
 
@@ -229,6 +373,12 @@ def main():
         show_status()
     elif args.recommend:
         show_recommendations()
+    elif args.sync:
+        run_warehouse_sync()
+    elif args.audit:
+        run_ad_grants_audit()
+    elif args.jobs:
+        show_job_history()
     else:
         run_analysis_cycle()
 
@@ -0,0 +1,253 @@
+"""
+Job Scheduler — runs scheduled jobs without blocking each other.
+
+The `schedule` library still decides when a job is due; this module decides
+how it runs:
+
+- every run gets its own worker thread, so a slow report never delays the
+  next alert check
+- a job that comes due while its previous run is still going is skipped,
+  or coalesced into a single rerun as soon as that run finishes
+- a run that exceeds its timeout is recorded as a timeout; Python threads
+  cannot be killed, so the job stays blocked ("timed out") and its due runs
+  are skipped until the abandoned thread returns
+- on start, jobs whose last slot passed while the agent was down run once
+  to catch up, each on its own thread, oldest slot first
+- every run's start, latency and outcome is kept in memory and in the
+  action log's job_runs table
+
+    jobs = JobScheduler()
+    jobs.add("alerts", jobs.every(2).hours, run_alerts, timeout=600, overlap="coalesce")
+    jobs.run_forever()
+"""
+
+from __future__ import annotations
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from statistics import median
+from typing import Callable
+
+import schedule
+
+
+OVERLAP_POLICIES = ("skip", "coalesce")
+
+
+class JobScheduler:
+    """
+    Threaded runner for `schedule` jobs.
+
+    Args:
+        tick: Seconds between due/timeout checks on the main thread
+        history_size: Runs of each job kept in memory for latency stats
+    """
+
+    def __init__(self, tick: float = 1.0, history_size: int = 50):
+        self.tick = tick
+        self.history_size = history_size
+        self._schedule = schedule.Scheduler()
+        self._jobs: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def every(self, interval: int = 1) -> schedule.Job:
+        """Start a schedule definition, e.g. jobs.every().day.at("08:00")."""
+        return self._schedule.every(interval)
+
+    def add(self, name: str, when: schedule.Job, fn: Callable[[], object], timeout: float = 1800.0,
+            overlap: str = "skip", catch_up: bool = True):
+        """
+        Register a job.
+
+        Args:
+            name: Unique job name (used in logs and job_runs)
+            when: Unfinished schedule definition from every()
+            fn: The job; runs on its own thread
+            timeout: Seconds before a run is recorded as timed out
+            overlap: "skip" drops a due run while the job is still running;
+                     "coalesce" queues one rerun for when it finishes
+            catch_up: Run once on start if the last slot was missed
+        """
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"overlap must be one of {OVERLAP_POLICIES}, got {overlap!r}")
+        self._jobs[name] = {
+            "name": name,
+            "fn": fn,
+            "timeout": timeout,
+            "overlap": overlap,
+            "catch_up": catch_up,
+            "schedule": when.do(self._due, name),
+            "running": None,
+            "pending": False,
+            "skipped": 0,
+            "history": deque(maxlen=self.history_size),
+        }
+
+    # ─── Running ─────────────────────────────────────────────
+
+    def run_now(self, name: str, trigger: str = "manual") -> bool:
+        """Start a job immediately (same overlap rules). Returns False if it was not started."""
+        with self._lock:
+            job = self._jobs[name]
+            if job["running"] is not None:
+                if job["running"].get("timed_out"):
+                    job["skipped"] += 1
+                    print(f"  ⌛ {name} still blocked by a timed-out run — skipped this run")
+                    return False
+                return self._overlap(job)
+            run = self._begin(job, trigger)
+        threading.Thread(target=self._execute, args=(job, run), name=f"job-{name}", daemon=True).start()
+        return True
+
+    def catch_up(self) -> list[str]:
+        """
+        Start every catch-up job whose most recent slot passed without a
+        run, oldest slot first, each on its own thread through run_now().
+        Jobs that never ran are left to their schedule.
+        Returns the names of the jobs started.
+        """
+        from db import get_last_job_run
+
+        missed = []
+        for job in self._jobs.values():
+            if not job["catch_up"]:
+                continue
+            last = get_last_job_run(job["name"])
+            if last is None:
+                continue
+            entry = job["schedule"]
+            slot = entry.next_run - timedelta(**{entry.unit: entry.interval})
+            last_started = datetime.fromisoformat(last["started_at"]).replace(tzinfo=timezone.utc)
+            if last_started < slot.astimezone(timezone.utc):
+                missed.append((slot, job))
+
+        missed.sort(key=lambda item: item[0])
+        return [job["name"] for _, job in missed if self.run_now(job["name"], trigger="catch-up")]
+
+    def run_pending(self):
+        """Start due jobs and expire timed-out runs. Call this every tick."""
+        self._schedule.run_pending()
+        self._check_timeouts()
+
+    def run_forever(self):
+        """Catch up on missed slots, then run the schedule until interrupted."""
+        for name in self.catch_up():
+            print(f"  ⏮️ Catching up on missed {name} run")
+        while True:
+            self.run_pending()
+            time.sleep(self.tick)
+
+    def _due(self, name: str):
+        # Called by schedule on the main thread; must return immediately
+        self.run_now(name, trigger="schedule")
+
+    def _overlap(self, job: dict) -> bool:
+        if job["overlap"] == "coalesce":
+            job["pending"] = True
+            print(f"  ⏳ {job['name']} still running — will rerun when it finishes")
+        else:
+            job["skipped"] += 1
+            print(f"  ⏭️ {job['name']} still running — skipped this run")
+        return False
+
+    def _begin(self, job: dict, trigger: str) -> dict:
+        run = {"trigger": trigger, "started_at": datetime.now(timezone.utc), "start": time.perf_counter()}
+        job["running"] = run
+        return run
+
+    def _execute(self, job: dict, run: dict):
+        status, error = "ok", ""
+        try:
+            job["fn"]()
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        self._finish(job, run, status, error)
+
+    def _finish(self, job: dict, run: dict, status: str, error: str):
+        with self._lock:
+            job["running"] = None
+            if run.get("timed_out"):
+                # Already recorded as a timeout; the job is unblocked now its thread has returned
+                job["pending"] = False
+                print(f"  ⌛ {job['name']} finished {time.perf_counter() - run['start']:.0f}s after it started "
+                      f"(already timed out) — runs resume")
+                return
+            rerun = job["pending"]
+            job["pending"] = False
+        self._record(job, run, status, error)
+        if rerun:
+            self.run_now(job["name"], trigger="coalesced")
+
+    def _check_timeouts(self):
+        now = time.perf_counter()
+        expired = []
+        with self._lock:
+            for job in self._jobs.values():
+                run = job["running"]
+                if run is not None and not run.get("timed_out") and now - run["start"] > job["timeout"]:
+                    # Stays in job["running"] so no new run starts beside the abandoned thread
+                    run["timed_out"] = True
+                    job["pending"] = False
+                    expired.append((job, run))
+        for job, run in expired:
+            self._record(job, run, "timeout", f"exceeded {job['timeout']:.0f}s")
+
+    def _record(self, job: dict, run: dict, status: str, error: str):
+        seconds = time.perf_counter() - run["start"]
+        job["history"].append({
+            "trigger": run["trigger"],
+            "started_at": run["started_at"],
+            "seconds": seconds,
+            "status": status,
+            "error": error,
+        })
+        icon = {"ok": "✅", "error": "❌", "timeout": "⌛"}[status]
+        print(f"  {icon} Job {job['name']} ({run['trigger']}) {status} in {seconds:.1f}s"
+              + (f" — {error}" if error else ""))
+        try:
+            from db import log_job_run
+            log_job_run(job["name"], run["trigger"], run["started_at"], seconds, status, error)
+        except Exception as e:
+            print(f"  ⚠️ Could not record {job['name']} run: {e}")
+
+    # ─── Stats ───────────────────────────────────────────────
+
+    def latency_stats(self) -> dict[str, dict]:
+        """
+        Per-job stats from the in-memory history:
+        {name: {runs, running, timed_out, skipped, last_status, last_seconds, median_seconds,
+                max_seconds, next_run}}
+        """
+        stats = {}
+        with self._lock:
+            for name, job in self._jobs.items():
+                history = list(job["history"])
+                seconds = [h["seconds"] for h in history]
+                stats[name] = {
+                    "runs": len(history),
+                    "running": job["running"] is not None,
+                    "timed_out": job["running"] is not None and bool(job["running"].get("timed_out")),
+                    "skipped": job["skipped"],
+                    "last_status": history[-1]["status"] if history else None,
+                    "last_seconds": seconds[-1] if seconds else None,
+                    "median_seconds": median(seconds) if seconds else None,
+                    "max_seconds": max(seconds) if seconds else None,
+                    "next_run": job["schedule"].next_run,
+                }
+        return stats
+
+    def format_stats(self) -> str:
+        """One line per job: runs, latency and next run."""
+        lines = []
+        for name, s in self.latency_stats().items():
+            if s["runs"]:
+                latency = f"median {s['median_seconds']:.1f}s, max {s['max_seconds']:.1f}s, last {s['last_status']}"
+            else:
+                latency = "no runs yet"
+            state = " — timed out, still running" if s["timed_out"] else (" — running" if s["running"] else "")
+            extra = state + (f", {s['skipped']} skipped" if s["skipped"] else "")
+            lines.append(f"  {name}: {s['runs']} runs ({latency}){extra}; next {s['next_run']:%a %H:%M}")
+        return "\n".join(lines)
@@ -8,68 +8,127 @@ from __future__ import annotations
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
+from google_ads_client import get_env_float
 from skills.data_gathering.performance import get_ad_performance
+from skills.data_gathering.significance import compare_arms
+
+import numpy as np
 
 
 MIN_IMPRESSIONS = 200
 
+# Datasets this skill reads (see skills/data_gathering/planner.py)
+REQUIRED_DATASETS = ("ad_performance",)
+
 
-def get_recommendations(date_range: str = "LAST_30_DAYS") -> dict:
+def get_recommendations(date_range: str = "LAST_30_DAYS", ads: list[dict] | None = None) -> dict:
     """
     Analyze ad variants and recommend which to keep and which to pause.
     No changes are made — this is purely analytical.
-    """
-    ads = get_ad_performance(date_range)
 
-    by_group: dict[str, list[dict]] = {}
-    for ad in ads:
-        key = f"{ad['campaign']} / {ad['ad_group']}"
-        by_group.setdefault(key, []).append(ad)
+    Within each ad group, every ad with MIN_IMPRESSIONS+ impressions is
+    compared with the group's best ad (see significance.compare_arms) on CTR
+    and on conversion rate. An ad is a winner when it beats the rest of its
+    group on CTR with AD_TEST_CONFIDENCE probability (default 0.95) and a
+    loser when the best ad beats it with that probability. Everything else
+    is inconclusive, with the impressions still needed to tell.
+
+    Returns:
+        {"winners": [...], "losers": [...], "inconclusive": [...],
+         "insufficient_data": [...]}
+    """
+    if ads is None:
+        ads = get_ad_performance(date_range)
+    confidence = get_env_float("AD_TEST_CONFIDENCE", 0.95)
+
+    group_codes: dict[str, int] = {}
+    labels = [f"{ad['campaign']} / {ad['ad_group']}" for ad in ads]
+    groups = np.fromiter((group_codes.setdefault(k, len(group_codes)) for k in labels), dtype=np.int64, count=len(ads))
+    impressions = np.fromiter((ad["impressions"] for ad in ads), dtype=np.float64, count=len(ads))
+    clicks = np.fromiter((ad["clicks"] for ad in ads), dtype=np.float64, count=len(ads))
+    conversions = np.fromiter((ad["conversions"] for ad in ads), dtype=np.float64, count=len(ads))
+
+    # Only ad groups running 2+ variants are tests; of those, only ads with
+    # enough impressions are compared, and only where 2+ of them qualify
+    in_test = np.bincount(groups, minlength=len(group_codes))[groups] >= 2
+    testable = in_test & (impressions >= MIN_IMPRESSIONS)
+    testable &= np.bincount(groups[testable], minlength=len(group_codes))[groups] >= 2
+
+    insufficient = [
+        {**ads[i], "group": labels[i],
+         "note": f"Only {ads[i]['impressions']} impressions (need {MIN_IMPRESSIONS})"}
+        for i in np.flatnonzero(in_test & (impressions < MIN_IMPRESSIONS))
+    ]
+
+    idx = np.flatnonzero(testable)
+    g = groups[idx]
+    ctr_test = compare_arms(g, clicks[idx], impressions[idx], confidence)
+    conv_test = compare_arms(g, conversions[idx], clicks[idx], confidence)
+
+    # Mean CTR of the compared ads in each group, for context in the report
+    ctr = ctr_test["rate"] * 100
+    group_ctr = np.bincount(g, weights=ctr, minlength=len(group_codes))
+    group_size = np.bincount(g, minlength=len(group_codes))
+    avg_ctr = np.zeros(len(group_codes))
+    np.divide(group_ctr, group_size, out=avg_ctr, where=group_size > 0)
+    avg_ctr = avg_ctr[g]
+    ctr_vs_avg = np.zeros(len(idx))
+    np.divide((ctr - avg_ctr) * 100, avg_ctr, out=ctr_vs_avg, where=avg_ctr > 0)
+
+    prob = ctr_test["prob_beat_best"]
+    is_winner = ctr_test["is_best"] & (prob >= confidence)
+    is_loser = ~ctr_test["is_best"] & (prob <= 1 - confidence)
 
     winners = []
     losers = []
-    insufficient = []
-
-    for group_key, group_ads in by_group.items():
-        if len(group_ads) < 2:
-            continue
-
-        testable = [a for a in group_ads if a["impressions"] >= MIN_IMPRESSIONS]
-        not_ready = [a for a in group_ads if a["impressions"] < MIN_IMPRESSIONS]
-
-        for a in not_ready:
-            insufficient.append({**a, "group": group_key,
-                "note": f"Only {a['impressions']} impressions (need {MIN_IMPRESSIONS})"})
-
-        if len(testable) < 2:
-            continue
-
-        avg_ctr = sum(a["ctr"] for a in testable) / len(testable)
-
-        for ad in testable:
-            ctr_vs_avg = ((ad["ctr"] - avg_ctr) / avg_ctr * 100) if avg_ctr > 0 else 0
-            conv_rate = (ad["conversions"] / ad["clicks"] * 100) if ad["clicks"] > 0 else 0
-
-            ad_info = {**ad, "group": group_key, "conversion_rate": round(conv_rate, 2),
-                       "ctr_vs_avg": round(ctr_vs_avg, 1)}
-
-            if ctr_vs_avg < -30:
-                headlines = ", ".join(ad.get("headlines", [])[:3])
-                ad_info["reason"] = f"CTR {ad['ctr']:.1f}% is {abs(ctr_vs_avg):.0f}% below average {avg_ctr:.1f}%"
-                ad_info["recommendation"] = f"Consider pausing this ad in \"{ad['ad_group']}\""
-                losers.append(ad_info)
-            elif ctr_vs_avg > 20:
-                ad_info["reason"] = f"CTR {ad['ctr']:.1f}% is {ctr_vs_avg:.0f}% above average {avg_ctr:.1f}%"
-                ad_info["recommendation"] = "Top performer — keep running"
-                winners.append(ad_info)
+    inconclusive = []
+
+    for j, i in enumerate(idx):
+        ad = ads[i]
+        conv_prob = conv_test["prob_beat_best"][j]
+        ad_info = {
+            **ad,
+            "group": labels[i],
+            "conversion_rate": round(conv_test["rate"][j] * 100, 2),
+            "ctr_vs_avg": round(float(ctr_vs_avg[j]), 1),
+            "prob_beat_best": round(float(prob[j]), 4),
+            "conv_prob_beat_best": round(float(conv_prob), 4),
+            "p_value": round(float(ctr_test["p_value"][j]), 4),
+            "impressions_needed": _needed(ctr_test["trials_needed"][j]),
+            "clicks_needed": _needed(conv_test["trials_needed"][j]),
+        }
+
+        if is_loser[j]:
+            ad_info["reason"] = (f"CTR {ad['ctr']:.1f}% vs group average {avg_ctr[j]:.1f}% — "
+                                 f"{(1 - prob[j]) * 100:.1f}% probability the best ad outperforms it")
+            ad_info["recommendation"] = f"Consider pausing this ad in \"{ad['ad_group']}\""
+            losers.append(ad_info)
+        elif is_winner[j]:
+            ad_info["reason"] = (f"CTR {ad['ctr']:.1f}% vs group average {avg_ctr[j]:.1f}% — "
+                                 f"{prob[j] * 100:.1f}% probability it is the best ad")
+            ad_info["recommendation"] = "Top performer — keep running"
+            if conv_prob <= 1 - confidence:
+                ad_info["recommendation"] += " (but converts worse than the group leader — check landing page)"
+            winners.append(ad_info)
+        else:
+            needed = ad_info["impressions_needed"]
+            ad_info["reason"] = (f"{prob[j] * 100:.0f}% probability to beat the best ad — not yet significant"
+                                 + (f"; ~{needed:,} more impressions needed" if needed is not None else ""))
+            inconclusive.append(ad_info)
 
     return {
-        "winners": sorted(winners, key=lambda x: x["ctr_vs_avg"], reverse=True),
-        "losers": sorted(losers, key=lambda x: x["ctr_vs_avg"]),
+        "winners": sorted(winners, key=lambda x: (x["prob_beat_best"], x["ctr_vs_avg"]), reverse=True),
+        "losers": sorted(losers, key=lambda x: (x["prob_beat_best"], x["ctr_vs_avg"])),
+        "inconclusive": sorted(inconclusive, key=lambda x: x["impressions_needed"] if x["impressions_needed"] is not None else float("inf")),
         "insufficient_data": insufficient,
     }
 
 
+def _needed(value: float) -> int | None:
+    """Trials still needed as an int, or None when no finite sample resolves it."""
+    return int(value) if np.isfinite(value) else None
+
+
 def format_report(results: dict | None = None) -> str:
     """Format ad copy test results as a readable report."""
     if results is None:
@@ -81,7 +140,7 @@ def format_report(results: dict | None = None) -> str:
         lines.append(f"🏆 TOP PERFORMING ADS ({len(results['winners'])}):")
         for w in results["winners"][:5]:
             headlines = ", ".join(w.get("headlines", [])[:3])
-            lines.append(f"  • [{w['group']}] CTR: {w['ctr']:.1f}% (+{w['ctr_vs_avg']:.0f}% vs avg)")
+            lines.append(f"  • [{w['group']}] CTR: {w['ctr']:.1f}% (+{w['ctr_vs_avg']:.0f}% vs avg, {w['prob_beat_best']:.0%} likely best)")
             lines.append(f"    Headlines: {headlines}")
             lines.append(f"    {w['impressions']} impr, {w['conversions']:.0f} conv — {w['recommendation']}\n")
 
@@ -89,10 +148,18 @@ def format_report(results: dict | None = None) -> str:
         lines.append(f"⚠️ UNDERPERFORMING ADS ({len(results['losers'])}):")
         for l in results["losers"][:5]:
             headlines = ", ".join(l.get("headlines", [])[:3])
-            lines.append(f"  • [{l['group']}] CTR: {l['ctr']:.1f}% ({l['ctr_vs_avg']:.0f}% vs avg)")
+            lines.append(f"  • [{l['group']}] CTR: {l['ctr']:.1f}% ({l['ctr_vs_avg']:.0f}% vs avg, {1 - l['prob_beat_best']:.0%} likely worse than best)")
             lines.append(f"    Headlines: {headlines}")
             lines.append(f"    → {l['recommendation']}\n")
 
+    inconclusive = results.get("inconclusive", [])
+    if inconclusive:
+        lines.append(f"⏳ {len(inconclusive)} ads still being tested — no significant difference yet")
+        for r in inconclusive[:3]:
+            if r["impressions_needed"] is not None:
+                lines.append(f"  • [{r['group']}] ~{r['impressions_needed']:,} more impressions to decide")
+        lines.append("")
+
     if results["insufficient_data"]:
         lines.append(f"📊 {len(results['insufficient_data'])} ads need more impressions before analysis\n")
 
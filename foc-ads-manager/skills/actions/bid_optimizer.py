@@ -9,18 +9,104 @@ import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from google_ads_client import get_env_float, get_env_bool, get_env_int
-from skills.data_gathering.search_terms import get_keywords
+from skills.data_gathering.query_builder import predicate
+from skills.data_gathering.columnar import ColumnarReport, fetch_table
 
+import numpy as np
 
-def get_recommendations(target_cpa: float | None = None) -> list[dict]:
+
+# Datasets this skill reads (see skills/data_gathering/planner.py)
+REQUIRED_DATASETS = ("keywords",)
+
+# Keywords below this many clicks are not evaluated
+MIN_CLICKS_FOR_BID_CHANGE = 20
+# Keywords with this many clicks and no conversions are recommended for pausing
+MIN_CLICKS_FOR_PAUSE = 50
+MIN_BID = 0.10
+
+# Only the columns the optimizer reads
+BID_TABLE_SPEC = {
+    "keyword": ("ad_group_criterion.keyword.text", "str"),
+    "match_type": ("ad_group_criterion.keyword.match_type", "str"),
+    "campaign": ("campaign.name", "str"),
+    "ad_group": ("ad_group.name", "str"),
+    "bid_micros": ("ad_group_criterion.effective_cpc_bid_micros", "micros"),
+    "clicks": ("metrics.clicks", "int"),
+    "conversions": ("metrics.conversions", "float"),
+    "cost_micros": ("metrics.cost_micros", "micros"),
+}
+
+ACTIONS = ["NONE", "PAUSE", "INCREASE", "DECREASE"]
+PRIORITIES = ["", "MEDIUM", "HIGH"]
+
+
+def compute_bid_table(keywords: ColumnarReport, target_cpa: float, max_cpc: float) -> ColumnarReport:
+    """
+    Evaluate every keyword at once with array operations.
+
+    Returns a compact table with one row per recommendation, sorted by
+    |change_pct| descending. Columns: row (index into `keywords`), action and
+    priority (dictionary-encoded), new_bid, change_pct, cpa.
+    """
+    clicks = keywords["clicks"]
+    conversions = keywords["conversions"]
+    bid = keywords["bid_micros"] / 1_000_000
+    cpa = keywords.cpa_micros() / 1_000_000
+
+    eligible = clicks >= MIN_CLICKS_FOR_BID_CHANGE
+    pause = eligible & (conversions == 0) & (clicks >= MIN_CLICKS_FOR_PAUSE)
+    rated = eligible & ~pause & (conversions >= 2)
+    increase = rated & (cpa < target_cpa * 0.7)
+    decrease = rated & (cpa > target_cpa * 1.5)
+
+    # target / cpa, with a zero CPA treated as "infinitely good"
+    ratio = np.full(len(keywords), np.inf)
+    np.divide(target_cpa, cpa, out=ratio, where=cpa > 0)
+
+    new_bid = np.zeros(len(keywords))
+    new_bid[increase] = np.round(np.minimum(bid[increase] * np.minimum(1.3, ratio[increase]), max_cpc), 2)
+    new_bid[decrease] = np.round(np.maximum(bid[decrease] * np.maximum(0.7, ratio[decrease]), MIN_BID), 2)
+
+    change_pct = np.zeros(len(keywords))
+    changed = increase | decrease
+    np.divide((new_bid - bid) * 100, bid, out=change_pct, where=changed & (bid > 0))
+    change_pct = np.round(change_pct, 1)
+    change_pct[pause] = -100
+
+    action = np.zeros(len(keywords), dtype=np.int32)
+    action[pause] = ACTIONS.index("PAUSE")
+    action[increase] = ACTIONS.index("INCREASE")
+    action[decrease] = ACTIONS.index("DECREASE")
+
+    priority = np.zeros(len(keywords), dtype=np.int32)
+    priority[increase | decrease] = PRIORITIES.index("MEDIUM")
+    priority[pause | (decrease & (cpa > target_cpa * 2))] = PRIORITIES.index("HIGH")
+
+    rows = np.flatnonzero(action)
+    rows = rows[np.argsort(-np.abs(change_pct[rows]), kind="stable")]
+    return ColumnarReport({
+        "row": rows,
+        "action": action[rows],
+        "priority": priority[rows],
+        "new_bid": new_bid[rows],
+        "change_pct": change_pct[rows],
+        "cpa": cpa[rows],
+    }, {"action": ACTIONS, "priority": PRIORITIES})
+
+
+def get_recommendations(target_cpa: float | None = None,
+                        keywords: list[dict] | ColumnarReport | None = None) -> list[dict]:
     """
     Analyze all keywords and recommend bid adjustments.
     No changes are made — this is purely analytical.
 
     Logic:
-        - If keyword CPA < target → recommend INCREASE bid
+        - If keyword CPA < target * 0.7 → recommend INCREASE bid
         - If keyword CPA > target * 1.5 → recommend DECREASE bid
         - If 50+ clicks and 0 conversions → recommend PAUSE
+
+    The rules are evaluated over the whole keyword set by compute_bid_table();
+    dicts are built only for the keywords that get a recommendation.
     """
     if target_cpa is None:
         target_cpa = get_env_float("TARGET_CPA", 25.0)
@@ -28,84 +114,65 @@ def get_recommendations(target_cpa: float | None = None) -> list[dict]:
     ad_grants = get_env_bool("AD_GRANTS_MODE", False)
     max_cpc = get_env_float("AD_GRANTS_MAX_CPC", 2.0) if ad_grants else 50.0
 
-    keywords = get_keywords()
-    recommendations = []
+    if keywords is None:
+        keywords = fetch_table("keyword_view", BID_TABLE_SPEC, where=[
+            predicate("ad_group_criterion.status", "!=", "REMOVED"),
+            predicate("metrics.clicks", ">=", MIN_CLICKS_FOR_BID_CHANGE),
+        ], date_range="LAST_30_DAYS")
+    elif not isinstance(keywords, ColumnarReport):
+        keywords = ColumnarReport.from_records(keywords, {name: kind for name, (_, kind) in BID_TABLE_SPEC.items()})
+
+    results = compute_bid_table(keywords, target_cpa, max_cpc)
+    if not len(results):
+        return []
+
+    rows = results["row"]
+    names = {col: keywords.strings(col)[rows] for col in ("keyword", "match_type", "campaign", "ad_group")}
+    current_bids = keywords["bid_micros"][rows] / 1_000_000
+    clicks = keywords["clicks"][rows]
+    conversions = keywords["conversions"][rows]
+    costs = keywords["cost_micros"][rows] / 1_000_000
+    actions = results.strings("action")
+    priorities = results.strings("priority")
 
-    for kw in keywords:
-        if kw["clicks"] < 20:
-            continue
-
-        current_bid = kw["bid"]
-        cpa = kw["cost_per_conversion"]
-        conversions = kw["conversions"]
-
-        if conversions == 0 and kw["clicks"] >= 50:
-            recommendations.append({
-                "keyword": kw["keyword"],
-                "match_type": kw["match_type"],
-                "campaign": kw["campaign"],
-                "ad_group": kw["ad_group"],
-                "current_bid": current_bid,
-                "clicks": kw["clicks"],
-                "conversions": conversions,
-                "cpa": cpa,
-                "cost": kw["cost"],
-                "action": "PAUSE",
-                "new_bid": 0,
-                "change_pct": -100,
-                "reason": f"{kw['clicks']} clicks, 0 conversions — recommend pausing",
-                "recommendation": f"Pause keyword \"{kw['keyword']}\" — spending ${kw['cost']:.2f} with no conversions",
-                "priority": "HIGH",
-            })
-            continue
-
-        if conversions < 2:
-            continue
-
-        if cpa < target_cpa * 0.7:
-            increase_factor = min(1.3, target_cpa / cpa)
-            new_bid = round(min(current_bid * increase_factor, max_cpc), 2)
-            change_pct = round((new_bid - current_bid) / current_bid * 100, 1) if current_bid > 0 else 0
-            recommendations.append({
-                "keyword": kw["keyword"],
-                "match_type": kw["match_type"],
-                "campaign": kw["campaign"],
-                "ad_group": kw["ad_group"],
-                "current_bid": current_bid,
-                "clicks": kw["clicks"],
-                "conversions": conversions,
-                "cpa": cpa,
-                "cost": kw["cost"],
-                "action": "INCREASE",
-                "new_bid": new_bid,
-                "change_pct": change_pct,
-                "reason": f"CPA ${cpa:.2f} is {round((1 - cpa/target_cpa) * 100)}% below target ${target_cpa:.2f}",
-                "recommendation": f"Increase bid from ${current_bid:.2f} → ${new_bid:.2f} ({change_pct:+.0f}%)",
-                "priority": "MEDIUM",
-            })
-        elif cpa > target_cpa * 1.5:
-            decrease_factor = max(0.7, target_cpa / cpa)
-            new_bid = round(max(current_bid * decrease_factor, 0.10), 2)
-            change_pct = round((new_bid - current_bid) / current_bid * 100, 1) if current_bid > 0 else 0
-            recommendations.append({
-                "keyword": kw["keyword"],
-                "match_type": kw["match_type"],
-                "campaign": kw["campaign"],
-                "ad_group": kw["ad_group"],
-                "current_bid": current_bid,
-                "clicks": kw["clicks"],
-                "conversions": conversions,
-                "cpa": cpa,
-                "cost": kw["cost"],
-                "action": "DECREASE",
-                "new_bid": new_bid,
-                "change_pct": change_pct,
-                "reason": f"CPA ${cpa:.2f} is {round((cpa/target_cpa - 1) * 100)}% above target ${target_cpa:.2f}",
-                "recommendation": f"Decrease bid from ${current_bid:.2f} → ${new_bid:.2f} ({change_pct:+.0f}%)",
-                "priority": "HIGH" if cpa > target_cpa * 2 else "MEDIUM",
-            })
-
-    return sorted(recommendations, key=lambda x: abs(x.get("change_pct", 0)), reverse=True)
+    recommendations = []
+    for i in range(len(results)):
+        keyword = names["keyword"][i]
+        current_bid = float(current_bids[i])
+        new_bid = float(results["new_bid"][i])
+        change_pct = float(results["change_pct"][i])
+        cpa = float(results["cpa"][i])
+        cost = float(costs[i])
+        action = actions[i]
+
+        if action == "PAUSE":
+            reason = f"{clicks[i]} clicks, 0 conversions — recommend pausing"
+            recommendation = f"Pause keyword \"{keyword}\" — spending ${cost:.2f} with no conversions"
+        elif action == "INCREASE":
+            reason = f"CPA ${cpa:.2f} is {round((1 - cpa/target_cpa) * 100)}% below target ${target_cpa:.2f}"
+            recommendation = f"Increase bid from ${current_bid:.2f} → ${new_bid:.2f} ({change_pct:+.0f}%)"
+        else:
+            reason = f"CPA ${cpa:.2f} is {round((cpa/target_cpa - 1) * 100)}% above target ${target_cpa:.2f}"
+            recommendation = f"Decrease bid from ${current_bid:.2f} → ${new_bid:.2f} ({change_pct:+.0f}%)"
+
+        recommendations.append({
+            "keyword": keyword,
+            "match_type": names["match_type"][i],
+            "campaign": names["campaign"][i],
+            "ad_group": names["ad_group"][i],
+            "current_bid": current_bid,
+            "clicks": int(clicks[i]),
+            "conversions": float(conversions[i]),
+            "cpa": cpa,
+            "cost": cost,
+            "action": action,
+            "new_bid": new_bid if action != "PAUSE" else 0,
+            "change_pct": change_pct,
+            "reason": reason,
+            "recommendation": recommendation,
+            "priority": priorities[i],
+        })
+    return recommendations
 
 
 def format_report(recommendations: list[dict] | None = None) -> str:
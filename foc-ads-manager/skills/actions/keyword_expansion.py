@@ -12,13 +12,18 @@ from skills.data_gathering.search_terms import find_expansion_candidates
 from google_ads_client import get_env_float, get_env_bool
 
 
-def get_recommendations() -> list[dict]:
+# Datasets this skill reads (see skills/data_gathering/planner.py)
+REQUIRED_DATASETS = ("search_terms", "keywords")
+
+
+def get_recommendations(search_terms: list[dict] | None = None,
+                        keywords: list[dict] | None = None) -> list[dict]:
     """
     Get keyword expansion recommendations.
     Returns converting search terms not yet added as keywords, with suggested bids.
     No changes are made — this is purely analytical.
     """
-    candidates = find_expansion_candidates()
+    candidates = find_expansion_candidates(search_terms, keywords)
     ad_grants = get_env_bool("AD_GRANTS_MODE", False)
     max_cpc = get_env_float("AD_GRANTS_MAX_CPC", 2.0) if ad_grants else 50.0
 
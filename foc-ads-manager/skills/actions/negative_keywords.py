@@ -8,16 +8,20 @@ from __future__ import annotations
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from skills.data_gathering.search_terms import find_negative_candidates
+from skills.data_gathering.search_terms import find_negative_candidates, find_seed_matches
 
 
-def get_recommendations() -> list[dict]:
+# Datasets this skill reads (see skills/data_gathering/planner.py)
+REQUIRED_DATASETS = ("search_terms", "live_negatives")
+
+
+def get_recommendations(search_terms: list[dict] | None = None) -> list[dict]:
     """
     Get negative keyword recommendations.
     Returns a list of search terms wasting budget, with reasoning.
     No changes are made — this is purely analytical.
     """
-    candidates = find_negative_candidates()
+    candidates = find_negative_candidates(search_terms)
     recommendations = []
     for c in candidates:
         recommendations.append({
@@ -35,13 +39,50 @@ def get_recommendations() -> list[dict]:
     return recommendations
 
 
-def format_report(recommendations: list[dict] | None = None) -> str:
-    """Format negative keyword recommendations as a readable report."""
+def get_seed_recommendations(search_terms: list[dict] | None = None,
+                             live_negatives: list[dict] | None = None) -> list[dict]:
+    """
+    Seed-list phrases that search terms are spending on but that are not yet
+    live negatives in the account, most expensive first.
+    No changes are made — this is purely analytical.
+    """
+    results = find_seed_matches(search_terms, live_negatives)
+    recommendations = []
+    for p in results["phrases"]:
+        if p["live"] or p["cost"] <= 0:
+            continue
+        recommendations.append({
+            **p,
+            "reason": f"{p['terms']} search terms matching \"{p['phrase']}\" — {p['clicks']} clicks, ${p['cost']:.2f} spent",
+            "recommendation": f"Add seed phrase \"{p['phrase']}\" as a phrase-match negative keyword",
+            "priority": "HIGH" if p["cost"] > 20 else ("MEDIUM" if p["cost"] > 5 else "LOW"),
+        })
+    return recommendations
+
+
+def format_report(recommendations: list[dict] | None = None,
+                  seed_recommendations: list[dict] | None = None) -> str:
+    """
+    Format negative keyword recommendations as a readable report.
+    With no arguments, seed-list matches are included as well.
+    """
     if recommendations is None:
         recommendations = get_recommendations()
+        if seed_recommendations is None:
+            seed_recommendations = get_seed_recommendations()
+
+    seed_lines = []
+    if seed_recommendations:
+        seed_waste = sum(r["cost"] for r in seed_recommendations)
+        seed_lines = [
+            f"\n🌱 SEED LIST MATCHES ({len(seed_recommendations)} phrases, ${seed_waste:.2f} spent):",
+        ]
+        for r in seed_recommendations:
+            seed_lines.append(f"  • [{r['priority']}] \"{r['phrase']}\" — {r['terms']} terms, "
+                              f"{r['clicks']} clicks, ${r['cost']:.2f}")
 
     if not recommendations:
-        return "✅ No negative keyword recommendations — all search terms are performing acceptably."
+        return "\n".join(["✅ No negative keyword recommendations — all search terms are performing acceptably."] + seed_lines)
 
     total_waste = sum(r["cost"] for r in recommendations)
     lines = [
@@ -56,7 +97,7 @@ def format_report(recommendations: list[dict] | None = None) -> str:
         lines.append(f"     {r['clicks']} clicks, ${r['cost']:.2f} spent, 0 conversions")
         lines.append(f"     → {r['recommendation']}\n")
 
-    return "\n".join(lines)
+    return "\n".join(lines + seed_lines)
 
 
 # ─── CLI ─────────────────────────────────────────────────────
@@ -0,0 +1,98 @@
+"""
+Micros Aggregation
+Exact totals for Ads metrics. Money stays in integer micros through every
+grouping and sum, ratios (CTR, CPC, CPA, conversion rate, ROAS) are computed
+once from the totals, and micros become currency only in finish().
+
+Averaging per-row ratios (e.g. the mean of each campaign's average CPC)
+weights a 1-click campaign like a 1,000-click one; summing the parts and
+dividing once does not.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+MICROS = 1_000_000
+
+
+def to_currency(micros) -> float:
+    """Convert micros to currency units, rounded to cents (display only)."""
+    return round(micros / MICROS, 2)
+
+
+def record_micros(record: dict, name: str = "cost") -> int:
+    """A record's money field in micros: record["<name>_micros"], or currency record[name] converted."""
+    value = record.get(f"{name}_micros")
+    if value is None:
+        value = round((record.get(name) or 0) * MICROS)
+    return value
+
+
+# ─── Totals ──────────────────────────────────────────────────
+
+def new_totals() -> dict:
+    """Zeroed totals; counts and cost_micros are ints, conversions and their value are floats."""
+    return {"impressions": 0, "clicks": 0, "conversions": 0.0, "cost_micros": 0, "conversion_value": 0.0}
+
+
+def add_metrics(totals: dict, metrics) -> dict:
+    """Add a GoogleAdsRow's metrics (row.metrics) to totals in place. Unselected fields read as 0."""
+    totals["impressions"] += metrics.impressions
+    totals["clicks"] += metrics.clicks
+    totals["conversions"] += metrics.conversions
+    totals["cost_micros"] += metrics.cost_micros
+    totals["conversion_value"] += metrics.all_conversions_value
+    return totals
+
+
+def add_record(totals: dict, record: dict) -> dict:
+    """Add a performance dict (e.g. a get_campaign_performance() row) to totals in place."""
+    totals["impressions"] += record.get("impressions") or 0
+    totals["clicks"] += record.get("clicks") or 0
+    totals["conversions"] += record.get("conversions") or 0
+    totals["cost_micros"] += record_micros(record)
+    totals["conversion_value"] += record.get("conversion_value") or 0
+    return totals
+
+
+def finish(totals: dict) -> dict:
+    """
+    Display values for totals: the summed counts, cost in currency and the
+    ratios computed once from the sums.
+
+    Returns:
+        {impressions, clicks, conversions, cost, conversion_value,
+         ctr, avg_cpc, cpa, conversion_rate, roas}
+    """
+    impressions = totals["impressions"]
+    clicks = totals["clicks"]
+    conversions = totals["conversions"]
+    cost_micros = totals["cost_micros"]
+    value = totals["conversion_value"]
+    return {
+        "impressions": impressions,
+        "clicks": clicks,
+        "conversions": conversions,
+        "cost": to_currency(cost_micros),
+        "conversion_value": round(value, 2),
+        "ctr": round(clicks / impressions * 100, 2) if impressions else 0,
+        "avg_cpc": to_currency(cost_micros / clicks) if clicks else 0,
+        "cpa": to_currency(cost_micros / conversions) if conversions else 0,
+        "conversion_rate": round(conversions / clicks * 100, 2) if clicks else 0,
+        "roas": round(value * MICROS / cost_micros, 2) if cost_micros else 0,
+    }
+
+
+# ─── Columns ─────────────────────────────────────────────────
+
+def group_sum(codes: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """
+    Per-group sums of a column (e.g. a ColumnarReport's cost_micros by
+    search term code). Integer columns stay int64; np.bincount would sum
+    them as float64.
+    """
+    out = np.zeros(size, dtype=values.dtype if values.dtype.kind in "iu" else np.float64)
+    np.add.at(out, codes, values)
+    return out
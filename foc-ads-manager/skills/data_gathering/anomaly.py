@@ -0,0 +1,292 @@
+"""
+Anomaly Detector
+Streaming baselines for daily spend, CPA and CTR, per campaign and for the
+whole account, kept in the metrics warehouse (anomaly_state table).
+
+Each series is an additive level + day-of-week model updated one day at a
+time in O(1):
+
+    expected  = level + seasonal[weekday]
+    residual  = value - expected
+    score     = residual / sqrt(variance)          (a z-score)
+    level    += ALPHA * (value - seasonal[weekday] - level)
+    seasonal[weekday] += GAMMA * (value - level - seasonal[weekday])
+    variance  = (1 - BETA) * variance + BETA * residual²
+
+Residuals are clipped to the alert threshold before they update the
+baseline, so one anomalous day does not drag the model towards itself.
+Series score nothing until they have MIN_POINTS days of history.
+
+Only days after the newest processed date are fetched, so a routine run reads
+one new day (from the warehouse when it is enabled and covers it, otherwise
+from one small GAQL query) no matter how many series are watched. Days are
+folded in once they are ANOMALY_SETTLE_DAYS old (default 2), since the
+most recent ones are still being filled in and restated and are never
+revisited. A campaign-day without a row spent nothing, so every known
+series gets a zero spend point for it.
+"""
+
+from __future__ import annotations
+import sys, os
+import math
+from datetime import date, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from google_ads_client import get_client, get_customer_id, stream_query, get_env_bool, get_env_float, get_env_int
+from db import pool, warehouse
+
+
+ALPHA = 0.2   # level smoothing
+GAMMA = 0.3   # weekday smoothing (each weekday is seen once a week)
+BETA = 0.1    # variance smoothing
+MIN_POINTS = 14
+INITIAL_DAYS = 56
+
+# Metric → direction that is worth an alert ("up", "down" or "both")
+METRICS = {
+    "spend": "both",
+    "cpa": "up",
+    "ctr": "down",
+}
+
+# Minimum daily volume before a ratio metric is meaningful
+MIN_CONVERSIONS_FOR_CPA = 5
+MIN_IMPRESSIONS_FOR_CTR = 100
+
+CAMPAIGN_DAYS_QUERY = """
+    SELECT
+        segments.date,
+        campaign.id,
+        campaign.name,
+        metrics.impressions,
+        metrics.clicks,
+        metrics.conversions,
+        metrics.cost_micros
+    FROM campaign
+    WHERE segments.date BETWEEN '{start}' AND '{end}'
+        AND campaign.status != 'REMOVED'
+"""
+
+
+# ─── Model ───────────────────────────────────────────────────
+
+def new_series(series: str, campaign_id: int, campaign: str, metric: str) -> dict:
+    """Empty state for a series; the first point sets its level."""
+    return {
+        "series": series, "campaign_id": campaign_id, "campaign": campaign, "metric": metric,
+        "points": 0, "last_date": "", "level": 0.0, "variance": 0.0, "seasonal": [0.0] * 7,
+        "last_value": None, "last_expected": None, "last_score": None,
+    }
+
+
+def update_series(state: dict, day: str, value: float, threshold: float = 3.0) -> float | None:
+    """
+    Fold one day's value into a series state (in place).
+
+    Returns:
+        The day's z-score, or None while the series is still warming up.
+    """
+    weekday = date.fromisoformat(day).weekday()
+    seasonal = state["seasonal"]
+
+    if state["points"] == 0:
+        state["level"] = value
+        score = expected = None
+    else:
+        expected = state["level"] + seasonal[weekday]
+        residual = value - expected
+        # Floor the spread at 5% of the level so flat series don't score noise
+        spread = math.sqrt(max(state["variance"], (0.05 * abs(state["level"])) ** 2, 1e-12))
+        score = residual / spread if state["points"] >= MIN_POINTS else None
+
+        clipped = max(-threshold * spread, min(threshold * spread, residual)) if state["points"] >= MIN_POINTS \
+            else residual
+        observed = expected + clipped
+        state["level"] += ALPHA * (observed - seasonal[weekday] - state["level"])
+        seasonal[weekday] += GAMMA * (observed - state["level"] - seasonal[weekday])
+        state["variance"] = (1 - BETA) * state["variance"] + BETA * clipped ** 2
+
+    state["points"] += 1
+    state["last_date"] = day
+    state["last_value"] = value
+    state["last_expected"] = expected
+    state["last_score"] = score
+    return score
+
+
+def metric_values(day: dict) -> dict[str, float]:
+    """Metric values for one campaign-day (ratio metrics only with enough volume)."""
+    cost = day["cost_micros"] / 1_000_000
+    values = {"spend": cost}
+    if day["conversions"] >= MIN_CONVERSIONS_FOR_CPA:
+        values["cpa"] = cost / day["conversions"]
+    if day["impressions"] >= MIN_IMPRESSIONS_FOR_CTR:
+        values["ctr"] = day["clicks"] / day["impressions"] * 100
+    return values
+
+
+def is_anomalous(state: dict, threshold: float) -> bool:
+    """True if the series' last point scored beyond threshold in its alerting direction."""
+    score = state["last_score"]
+    if score is None:
+        return False
+    direction = METRICS[state["metric"]]
+    if direction == "up":
+        return score >= threshold
+    if direction == "down":
+        return score <= -threshold
+    return abs(score) >= threshold
+
+
+# ─── Updates ─────────────────────────────────────────────────
+
+def _fetch_campaign_days(start: str, end: str) -> list[dict]:
+    """Campaign-days from the warehouse if it covers the window, else from the API."""
+    if get_env_bool("USE_METRICS_WAREHOUSE", False) and warehouse.covers("campaign_daily", start, end):
+        return warehouse.get_campaign_days(start, end)
+
+    query = CAMPAIGN_DAYS_QUERY.format(start=start, end=end)
+    days = [
+        {
+            "date": row.segments.date,
+            "campaign_id": row.campaign.id,
+            "campaign": row.campaign.name,
+            "impressions": row.metrics.impressions,
+            "clicks": row.metrics.clicks,
+            "conversions": row.metrics.conversions,
+            "cost_micros": row.metrics.cost_micros,
+        }
+        for row in stream_query(get_client(), get_customer_id(), query, use_cache=False)
+    ]
+    days.sort(key=lambda d: (d["date"], d["campaign_id"]))
+    return days
+
+
+def _empty_day(day: str, campaign_id: int, campaign: str) -> dict:
+    return {
+        "date": day, "campaign_id": campaign_id, "campaign": campaign,
+        "impressions": 0, "clicks": 0, "conversions": 0.0, "cost_micros": 0,
+    }
+
+
+def _zero_filled(days: list[dict], dates: list[str], campaigns: dict[int, str]) -> list[dict]:
+    """
+    Add an all-zero row for every (campaign, date) without one: GAQL returns
+    no row for a day with no metrics, which is exactly a spend drop to zero.
+
+    Args:
+        campaigns: campaign_id → name of every campaign to fill (beyond those in `days`)
+    """
+    campaigns = {**campaigns, **{d["campaign_id"]: d["campaign"] for d in days}}
+    present = {(d["date"], d["campaign_id"]) for d in days}
+    missing = [
+        _empty_day(day, campaign_id, name)
+        for day in dates
+        for campaign_id, name in campaigns.items()
+        if (day, campaign_id) not in present
+    ]
+    return days + missing
+
+
+def _with_account_totals(days: list[dict], dates: list[str]) -> list[dict]:
+    """Add an account-wide row (campaign_id 0, "ALL") for each of `dates`."""
+    totals = {day: _empty_day(day, 0, "ALL") for day in dates}
+    for d in days:
+        t = totals[d["date"]]
+        for k in ("impressions", "clicks", "conversions", "cost_micros"):
+            t[k] += d[k]
+    return sorted(days + list(totals.values()), key=lambda d: (d["date"], d["campaign_id"]))
+
+
+def update_anomaly_state(today: date | None = None) -> dict:
+    """
+    Feed every settled day not yet seen (up to ANOMALY_SETTLE_DAYS before
+    today) into the series baselines.
+
+    Returns:
+        {"start", "end", "points": new points folded in, "series": series count}
+        ("start" is None when already up to date).
+    """
+    today = today or date.today()
+    end = today - timedelta(days=get_env_int("ANOMALY_SETTLE_DAYS", 2))
+    threshold = get_env_float("ANOMALY_Z_THRESHOLD", 3.0)
+
+    states = warehouse.load_anomaly_state()
+    if states:
+        # Sparse series (CPA needs a conversion) simply skip days without a value
+        start = max(date.fromisoformat(s["last_date"]) for s in states.values()) + timedelta(days=1)
+    else:
+        start = end - timedelta(days=INITIAL_DAYS - 1)
+    if start > end:
+        return {"start": None, "end": end.isoformat(), "points": 0, "series": len(states)}
+
+    dates = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    known = {
+        s["campaign_id"]: s["campaign"]
+        for s in states.values() if s["metric"] == "spend" and s["campaign_id"]
+    }
+    days = _zero_filled(_fetch_campaign_days(start.isoformat(), end.isoformat()), dates, known)
+    days = _with_account_totals(days, dates)
+
+    points = 0
+    with pool.transaction(warehouse.get_conn()):
+        # Re-read inside the transaction in case another job updated it meanwhile
+        states = warehouse.load_anomaly_state()
+        changed = {}
+        for day in days:
+            for metric, value in metric_values(day).items():
+                series = f"{day['campaign_id']}:{metric}"
+                state = states.get(series)
+                if state is None:
+                    state = states[series] = new_series(series, day["campaign_id"], day["campaign"], metric)
+                if day["date"] <= state["last_date"]:
+                    continue
+                state["campaign"] = day["campaign"]
+                update_series(state, day["date"], value, threshold)
+                changed[series] = state
+                points += 1
+        warehouse.save_anomaly_state(changed.values())
+
+    return {"start": start.isoformat(), "end": end.isoformat(), "points": points, "series": len(states)}
+
+
+def get_anomalies(today: date | None = None, threshold: float | None = None) -> list[dict]:
+    """
+    Series whose most recent settled day (ANOMALY_SETTLE_DAYS before today)
+    is anomalous, most extreme first.
+
+    Returns:
+        [{campaign, metric, date, value, expected, score}]
+    """
+    today = today or date.today()
+    if threshold is None:
+        threshold = get_env_float("ANOMALY_Z_THRESHOLD", 3.0)
+    latest = (today - timedelta(days=get_env_int("ANOMALY_SETTLE_DAYS", 2))).isoformat()
+
+    anomalies = [
+        {
+            "campaign": s["campaign"],
+            "metric": s["metric"],
+            "date": s["last_date"],
+            "value": s["last_value"],
+            "expected": s["last_expected"],
+            "score": round(s["last_score"], 1),
+        }
+        for s in warehouse.load_anomaly_state().values()
+        if s["last_date"] == latest and is_anomalous(s, threshold)
+    ]
+    anomalies.sort(key=lambda a: abs(a["score"]), reverse=True)
+    return anomalies
+
+
+# ─── CLI ─────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    print("\n═══ ANOMALY DETECTION ═══")
+    info = update_anomaly_state()
+    if info["start"]:
+        print(f"  Folded in {info['points']} points ({info['start']} → {info['end']}), {info['series']} series")
+    else:
+        print(f"  Already up to date through {info['end']} ({info['series']} series)")
+    for a in get_anomalies():
+        print(f"  {a['campaign']} {a['metric']}: {a['value']:.2f} vs {a['expected']:.2f} expected (z={a['score']:+.1f})")
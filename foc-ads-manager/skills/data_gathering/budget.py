@@ -5,10 +5,14 @@ Track daily/monthly spend against budget, calculate pacing, and alert anomalies.
 
 from __future__ import annotations
 import sys, os
-from datetime import datetime, timedelta
+import threading
+import time
+from concurrent import futures
+from datetime import datetime, date, timedelta
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from google_ads_client import get_client, get_customer_id, run_query, get_env_float
+from google_ads_client import get_client, get_customer_id, run_query, stream_query, get_env_float
+from skills.data_gathering.aggregate import MICROS, record_micros, to_currency
 
 
 BUDGET_QUERY = """
@@ -35,6 +39,13 @@ DAILY_SPEND_QUERY = """
     ORDER BY segments.date DESC
 """
 
+# Whole-account spend for today: one row, one metric
+TODAY_SPEND_QUERY = """
+    SELECT metrics.cost_micros
+    FROM customer
+    WHERE segments.date DURING TODAY
+"""
+
 
 def get_budget_status() -> list[dict]:
     """
@@ -49,11 +60,11 @@ def get_budget_status() -> list[dict]:
     # This month's spend
     rows_month = run_query(client, customer_id, BUDGET_QUERY.format(date_range="THIS_MONTH"))
 
-    # Aggregate monthly spend by campaign
-    monthly_spend: dict[str, float] = {}
+    # Aggregate monthly spend by campaign (exact micros)
+    monthly_micros: dict[str, int] = {}
     for row in rows_month:
         name = row.campaign.name
-        monthly_spend[name] = monthly_spend.get(name, 0) + row.metrics.cost_micros / 1_000_000
+        monthly_micros[name] = monthly_micros.get(name, 0) + row.metrics.cost_micros
 
     results = []
     for row in rows_today:
@@ -63,7 +74,7 @@ def get_budget_status() -> list[dict]:
 
         # Calculate monthly budget (daily * 30.4)
         monthly_budget = daily_budget * 30.4
-        month_spend = monthly_spend.get(campaign_name, 0)
+        month_spend = monthly_micros.get(campaign_name, 0) / MICROS
 
         # Pacing: what % of expected spend has been used
         today = datetime.now()
@@ -84,6 +95,7 @@ def get_budget_status() -> list[dict]:
             "campaign": campaign_name,
             "daily_budget": round(daily_budget, 2),
             "today_spend": round(today_spend, 2),
+            "today_spend_micros": row.metrics.cost_micros,
             "today_pct": round((today_spend / daily_budget * 100) if daily_budget > 0 else 0, 1),
             "monthly_budget": round(monthly_budget, 2),
             "month_spend": round(month_spend, 2),
@@ -102,25 +114,136 @@ def get_daily_spend_trend() -> list[dict]:
     customer_id = get_customer_id()
     rows = run_query(client, customer_id, DAILY_SPEND_QUERY)
 
-    by_date: dict[str, float] = {}
+    by_date: dict[str, int] = {}
     for row in rows:
         d = row.segments.date
-        by_date[d] = by_date.get(d, 0) + row.metrics.cost_micros / 1_000_000
+        by_date[d] = by_date.get(d, 0) + row.metrics.cost_micros
 
-    results = []
-    for d in sorted(by_date.keys(), reverse=True):
-        results.append({"date": d, "spend": round(by_date[d], 2)})
-    return results
+    return [{"date": d, "spend": to_currency(by_date[d])} for d in sorted(by_date, reverse=True)]
+
+
+# ─── Spend poller ────────────────────────────────────────────
+# Spend caps only need today's account total, so they poll TODAY_SPEND_QUERY
+# instead of the two per-campaign budget queries. The last poll is reused for
+# SPEND_POLL_TTL seconds (default 60): checking spend every few minutes costs
+# one tiny query, and gating hundreds of actions costs none.
+
+# Registry lock: guards the two dicts below and is never held during a query
+_spend_lock = threading.Lock()
+# customer ID → last poll
+_spend_polls: dict[str, dict] = {}
+# customer ID → the poll in flight, which concurrent callers wait on
+_spend_inflight: dict[str, futures.Future] = {}
+
+
+def poll_today_spend(max_age: float | None = None) -> dict:
+    """
+    Today's total account spend, polled at most once per TTL.
+
+    Concurrent callers for the same customer share a single poll; they wait
+    up to SPEND_POLL_TIMEOUT seconds (default 30) for it and then fall back
+    to the previous poll if there is one. Polls for different customers do
+    not wait on each other. Deltas are against the previous poll and reset
+    at midnight.
+
+    Args:
+        max_age: Reuse the last poll if younger than this many seconds
+                 (default SPEND_POLL_TTL); 0 forces a fresh poll
+
+    Returns:
+        {"spend": dollars, "cost_micros": int, "polled_at": epoch seconds,
+         "age": seconds since the poll, "delta": dollars since the previous
+         poll, "rate_per_hour": dollars/hour between polls (None on the
+         first poll of the day or under a minute apart), "cached": True if
+         this call made no query}
+
+    Raises:
+        TimeoutError: Another caller's poll took longer than
+            SPEND_POLL_TIMEOUT and there is no earlier poll to fall back on
+    """
+    if max_age is None:
+        max_age = get_env_float("SPEND_POLL_TTL", 60.0)
+    customer_id = get_customer_id()
+
+    with _spend_lock:
+        last = _spend_polls.get(customer_id)
+        now = time.time()
+        if last and now - last["polled_at"] < max_age and last["date"] == date.today():
+            return {**last, "age": now - last["polled_at"], "cached": True}
+        inflight = _spend_inflight.get(customer_id)
+        if inflight is None:
+            inflight = _spend_inflight[customer_id] = futures.Future()
+            owner = True
+        else:
+            owner = False
+
+    if not owner:
+        try:
+            poll = inflight.result(timeout=get_env_float("SPEND_POLL_TIMEOUT", 30.0))
+        except futures.TimeoutError:
+            if last is None:
+                raise TimeoutError(f"Spend poll for {customer_id} still running") from None
+            print(f"  ⚠️ Spend poll for {customer_id} is slow — using the previous poll")
+            poll = last
+        return {**poll, "age": time.time() - poll["polled_at"], "cached": True}
+
+    try:
+        poll = _fetch_today_spend(customer_id, last)
+    except BaseException as e:
+        with _spend_lock:
+            del _spend_inflight[customer_id]
+        inflight.set_exception(e)
+        raise
+    with _spend_lock:
+        _spend_polls[customer_id] = poll
+        del _spend_inflight[customer_id]
+    inflight.set_result(poll)
+    return {**poll, "age": 0.0, "cached": False}
+
+
+def _fetch_today_spend(customer_id: str, last: dict | None) -> dict:
+    """Query today's spend and compute the delta and rate against `last`."""
+    # Bypass the query cache: its TTL is far longer than a spend check's
+    cost_micros = sum(
+        row.metrics.cost_micros
+        for row in stream_query(get_client(), customer_id, TODAY_SPEND_QUERY, use_cache=False)
+    )
+    polled_at = time.time()
+    today = date.today()
+
+    if last and last["date"] == today:
+        delta_micros = cost_micros - last["cost_micros"]
+        hours = (polled_at - last["polled_at"]) / 3600
+        # Too short an interval says nothing about the rate
+        rate_per_hour = round(delta_micros / MICROS / hours, 2) if hours >= 1 / 60 else None
+    else:
+        delta_micros, rate_per_hour = cost_micros, None
 
+    return {
+        "spend": to_currency(cost_micros),
+        "cost_micros": cost_micros,
+        "date": today,
+        "polled_at": polled_at,
+        "delta": to_currency(delta_micros),
+        "rate_per_hour": rate_per_hour,
+    }
 
-def check_spend_cap() -> dict:
+
+def check_spend_cap(budgets: list[dict] | None = None) -> dict:
     """
     Check if total daily spend is approaching or exceeding the hard cap.
     Returns cap info and whether to halt bid increases.
+
+    Args:
+        budgets: get_budget_status() rows to total; if None, today's spend
+                 comes from the spend poller instead.
     """
     max_daily = get_env_float("MAX_DAILY_SPEND", 50.0)
-    budgets = get_budget_status()
-    total_today = sum(b["today_spend"] for b in budgets)
+    if budgets is None:
+        total_today = poll_today_spend()["spend"]
+    else:
+        # Sum micros, not the rows' rounded dollars
+        total_today = sum(record_micros(b, "today_spend") for b in budgets) / MICROS
 
     pct_of_cap = round((total_today / max_daily * 100) if max_daily > 0 else 0, 1)
     halt_increases = pct_of_cap >= 90
@@ -134,36 +257,50 @@ def check_spend_cap() -> dict:
     }
 
 
-def get_budget_alerts() -> list[dict]:
+def get_spend_cap_alerts(cap: dict | None = None) -> list[dict]:
+    """Account-level cap alert for check_spend_cap() output (polled if None)."""
+    if cap is None:
+        cap = check_spend_cap()
+    if not cap["halt_bid_increases"]:
+        return []
+    return [{
+        "level": "CRITICAL",
+        "category": "spend_cap",
+        "campaign": "ALL",
+        "key": "daily_cap",
+        "message": f"Daily spend at {cap['pct_of_cap']}% of ${cap['max_daily_spend']:.2f} cap — bid increases HALTED",
+    }]
+
+
+def get_budget_alerts(budgets: list[dict] | None = None) -> list[dict]:
     """
     Generate budget-related alerts.
     """
     alerts = []
-    budgets = get_budget_status()
-    cap = check_spend_cap()
+    if budgets is None:
+        budgets = get_budget_status()
 
     # Campaign-level alerts
     for b in budgets:
         if b["pacing_pct"] > 120:
             alerts.append({
                 "level": "WARNING",
+                "category": "budget_pacing",
                 "campaign": b["campaign"],
+                "key": "over_pacing",
                 "message": f"Over-pacing at {b['pacing_pct']}% — ${b['month_spend']:.2f} spent of ${b['monthly_budget']:.2f} expected",
             })
         elif b["pacing_pct"] < 60:
             alerts.append({
                 "level": "INFO",
+                "category": "budget_pacing",
                 "campaign": b["campaign"],
+                "key": "under_pacing",
                 "message": f"Under-pacing at {b['pacing_pct']}% — only ${b['month_spend']:.2f} of ${b['monthly_budget']:.2f} expected",
             })
 
-    # Account-level cap alert
-    if cap["halt_bid_increases"]:
-        alerts.append({
-            "level": "CRITICAL",
-            "campaign": "ALL",
-            "message": f"Daily spend at {cap['pct_of_cap']}% of ${cap['max_daily_spend']:.2f} cap — bid increases HALTED",
-        })
+    # Account-level cap alert, from the spend poller (fresher than budgets)
+    alerts.extend(get_spend_cap_alerts())
 
     return alerts
 
@@ -176,7 +313,8 @@ if __name__ == "__main__":
     print("\n═══ BUDGET STATUS ═══")
     budgets = get_budget_status()
     if budgets:
-        print(tabulate(budgets, headers="keys", floatfmt=".2f"))
+        display = [{k: v for k, v in b.items() if not k.endswith("_micros")} for b in budgets]
+        print(tabulate(display, headers="keys", floatfmt=".2f"))
 
     print("\n═══ SPEND CAP CHECK ═══")
     cap = check_spend_cap()
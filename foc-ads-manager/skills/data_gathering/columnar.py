@@ -0,0 +1,260 @@
+"""
+Columnar Reports
+Array-backed representation of large Ads reports. Metrics live in typed NumPy
+arrays (micros stay int64), string columns are dictionary-encoded so each
+distinct campaign / ad group / term is stored once, and derived metrics and
+filters are computed over whole columns. Convert to dicts only at the
+reporting edge with to_records().
+"""
+
+from __future__ import annotations
+from array import array
+from typing import Iterable
+
+import numpy as np
+
+from google_ads_client import get_client, get_customer_id, stream_query
+from skills.data_gathering.query_builder import build_query
+
+
+# Column kinds → (array typecode for building, NumPy dtype)
+_KINDS = {
+    "int": ("q", np.int64),
+    "micros": ("q", np.int64),
+    "float": ("d", np.float64),
+    "str": ("i", np.int32),
+}
+
+
+class ColumnarReport:
+    """
+    A report stored column by column.
+
+    Numeric columns are NumPy arrays. String columns are int32 codes into a
+    per-column vocabulary list; use strings() to decode them. Columns whose
+    name ends in "_micros" are converted to currency by to_records().
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray], vocab: dict[str, list[str]] | None = None):
+        self.columns = columns
+        self.vocab = vocab or {}
+        lengths = {len(c) for c in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {lengths}")
+        self._length = lengths.pop() if lengths else 0
+
+    # ─── Construction ────────────────────────────────────────
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, spec: dict[str, tuple[str, str]]) -> "ColumnarReport":
+        """
+        Build a report from GoogleAdsRows (typically a stream_query generator).
+
+        Args:
+            rows: Iterable of GoogleAdsRow
+            spec: {column: (gaql_field_path, kind)} with kind one of
+                  'int', 'micros', 'float', 'str'
+
+        Rows are appended to compact typed buffers as they arrive, so no
+        per-row dict or proto list is kept.
+        """
+        buffers = {name: array(_KINDS[kind][0]) for name, (_, kind) in spec.items()}
+        interned: dict[str, dict] = {name: {} for name, (_, kind) in spec.items() if kind == "str"}
+        paths = {name: [part.rstrip("_") for part in path.split(".")] for name, (path, _) in spec.items()}
+        enum_names: dict[str, dict[int, str]] = {}
+
+        # Fields are read from the raw protobuf message, which is much faster
+        # than proto-plus attribute access; enum numbers are mapped to names
+        # once per distinct value when the vocabulary is built.
+        for row in rows:
+            pb = type(row).pb(row)
+            if not enum_names and interned:
+                enum_names = {name: _enum_names(pb, paths[name]) for name in interned}
+            for name, (_, kind) in spec.items():
+                value = pb
+                for part in paths[name]:
+                    value = getattr(value, part)
+                if kind == "str":
+                    codes = interned[name]
+                    code = codes.get(value)
+                    if code is None:
+                        code = codes[value] = len(codes)
+                    buffers[name].append(code)
+                else:
+                    buffers[name].append(value)
+
+        # frombuffer shares memory with the build buffers (no copy)
+        columns = {
+            name: np.frombuffer(buffers[name], dtype=_KINDS[kind][1]) if len(buffers[name])
+            else np.empty(0, dtype=_KINDS[kind][1])
+            for name, (_, kind) in spec.items()
+        }
+        vocab = {
+            name: [enum_names[name].get(v, str(v)) for v in codes] if enum_names.get(name) else list(codes)
+            for name, codes in interned.items()
+        }
+        return cls(columns, vocab)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], kinds: dict[str, str]) -> "ColumnarReport":
+        """
+        Build a report from plain dicts (e.g. get_keywords() output).
+
+        Args:
+            records: Iterable of dicts
+            kinds: {column: kind}. A 'micros' column named "x_micros" is read
+                   from record["x_micros"], or from currency record["x"].
+        """
+        buffers = {name: array(_KINDS[kind][0]) for name, kind in kinds.items()}
+        interned: dict[str, dict] = {name: {} for name, kind in kinds.items() if kind == "str"}
+
+        for record in records:
+            for name, kind in kinds.items():
+                if kind == "str":
+                    value = record.get(name) or ""
+                    codes = interned[name]
+                    code = codes.get(value)
+                    if code is None:
+                        code = codes[value] = len(codes)
+                    buffers[name].append(code)
+                elif kind == "micros" and name not in record:
+                    buffers[name].append(round((record.get(name[:-len("_micros")]) or 0) * 1_000_000))
+                else:
+                    buffers[name].append(record.get(name) or 0)
+
+        columns = {
+            name: np.frombuffer(buffers[name], dtype=_KINDS[kind][1]) if len(buffers[name])
+            else np.empty(0, dtype=_KINDS[kind][1])
+            for name, kind in kinds.items()
+        }
+        return cls(columns, {name: list(codes) for name, codes in interned.items()})
+
+    # ─── Access ──────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Raw column array (codes for string columns)."""
+        return self.columns[name]
+
+    def strings(self, name: str) -> np.ndarray:
+        """Decode a string column into an object array."""
+        vocab = np.asarray(self.vocab[name], dtype=object)
+        return vocab[self.columns[name]] if len(vocab) else np.empty(0, dtype=object)
+
+    def code_of(self, name: str, value: str) -> int:
+        """Dictionary code of `value` in a string column (-1 if absent)."""
+        try:
+            return self.vocab[name].index(value)
+        except ValueError:
+            return -1
+
+    # ─── Derived metrics (vectorized) ────────────────────────
+
+    def ratio(self, numerator: str, denominator: str, scale: float = 1.0) -> np.ndarray:
+        """numerator / denominator * scale per row, 0 where the denominator is 0."""
+        num = self.columns[numerator].astype(np.float64)
+        den = self.columns[denominator].astype(np.float64)
+        out = np.zeros(self._length, dtype=np.float64)
+        np.divide(num, den, out=out, where=den != 0)
+        return out * scale
+
+    def ctr(self) -> np.ndarray:
+        """Click-through rate in percent."""
+        return self.ratio("clicks", "impressions", 100.0)
+
+    def conversion_rate(self) -> np.ndarray:
+        """Conversions per click in percent."""
+        return self.ratio("conversions", "clicks", 100.0)
+
+    def cpc_micros(self) -> np.ndarray:
+        """Average cost per click in micros."""
+        return self.ratio("cost_micros", "clicks")
+
+    def cpa_micros(self) -> np.ndarray:
+        """Cost per conversion in micros."""
+        return self.ratio("cost_micros", "conversions")
+
+    # ─── Filtering / ordering ────────────────────────────────
+
+    def where(self, mask: np.ndarray) -> "ColumnarReport":
+        """Rows where `mask` is True (vocabularies are shared, not copied)."""
+        return ColumnarReport({k: v[mask] for k, v in self.columns.items()}, self.vocab)
+
+    def take(self, indices: np.ndarray) -> "ColumnarReport":
+        """Rows at `indices`, in that order."""
+        return ColumnarReport({k: v[indices] for k, v in self.columns.items()}, self.vocab)
+
+    def top(self, n: int, key: np.ndarray | str) -> "ColumnarReport":
+        """The `n` rows with the largest `key` (a column name or array), highest first."""
+        values = self.columns[key] if isinstance(key, str) else key
+        if n < len(values):
+            idx = np.argpartition(-values, n)[:n]
+        else:
+            idx = np.arange(len(values))
+        idx = idx[np.argsort(-values[idx], kind="stable")]
+        return self.take(idx)
+
+    # ─── Reporting edge ──────────────────────────────────────
+
+    def to_records(self, derived: bool = True) -> list[dict]:
+        """
+        Convert to a list of dicts. "*_micros" columns become currency under
+        the name without the suffix; with derived=True, ctr, avg_cpc,
+        cost_per_conversion and conversion_rate are added where computable.
+        """
+        out_columns: dict[str, list] = {}
+        for name, values in self.columns.items():
+            if name in self.vocab:
+                out_columns[name] = self.strings(name).tolist()
+            elif name.endswith("_micros"):
+                out_columns[name[:-len("_micros")]] = (values / 1_000_000).tolist()
+            else:
+                out_columns[name] = values.tolist()
+
+        if derived:
+            have = self.columns.keys()
+            if {"clicks", "impressions"} <= have:
+                out_columns["ctr"] = np.round(self.ctr(), 2).tolist()
+            if {"cost_micros", "clicks"} <= have:
+                out_columns["avg_cpc"] = (self.cpc_micros() / 1_000_000).tolist()
+            if {"cost_micros", "conversions"} <= have:
+                out_columns["cost_per_conversion"] = (self.cpa_micros() / 1_000_000).tolist()
+            if {"conversions", "clicks"} <= have:
+                out_columns["conversion_rate"] = np.round(self.conversion_rate(), 2).tolist()
+
+        keys = list(out_columns)
+        return [dict(zip(keys, values)) for values in zip(*out_columns.values())]
+
+
+def _enum_names(pb, parts: list[str]) -> dict[int, str]:
+    """Map enum numbers to names for the field at `parts` ({} if not an enum)."""
+    descriptor = pb.DESCRIPTOR
+    field = None
+    for part in parts:
+        field = descriptor.fields_by_name[part]
+        descriptor = field.message_type
+    if field is None or field.enum_type is None:
+        return {}
+    return {v.number: v.name for v in field.enum_type.values}
+
+
+def fetch_table(resource: str, spec: dict[str, tuple[str, str]], where: Iterable[str] = (),
+                date_range: str | None = None) -> ColumnarReport:
+    """
+    Stream a GAQL report straight into a ColumnarReport.
+
+    Args:
+        resource: FROM resource
+        spec: {column: (gaql_field_path, kind)}; only these fields are selected
+        where: Extra WHERE predicates
+        date_range: Optional GAQL date literal
+
+    The stream bypasses the query cache: the typed arrays are the only copy
+    of the report, instead of up to QUERY_CACHE_MAX_ROWS cached protos too.
+    """
+    client = get_client()
+    customer_id = get_customer_id()
+    query = build_query(resource, [path for path, _ in spec.values()], where=where, date_range=date_range)
+    return ColumnarReport.from_rows(stream_query(client, customer_id, query, use_cache=False), spec)
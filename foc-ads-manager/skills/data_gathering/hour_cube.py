@@ -0,0 +1,304 @@
+"""
+Hour-of-Day × Day-of-Week Cube
+Backs ad schedule bid modifiers with data instead of the hard-coded peak
+hours in foc_config/ad_grants.AD_SCHEDULE.
+
+Hourly metrics are held in one dense NumPy array
+
+    cube[campaign, weekday, hour, metric]     metric: HOUR_CUBE_METRICS
+
+stored in db/hour_cube.npz. Updates are incremental: only settled days
+after the cube's watermark are pulled (segments.date × day_of_week × hour
+per campaign), and older data is exponentially down-weighted with a
+half-life of HOUR_CUBE_HALF_LIFE_DAYS, so the cube tracks recent behaviour
+without ever re-downloading months of hourly rows.
+
+Schedule modifiers are computed from the cube with whole-array operations:
+each cell's conversion rate, shrunk towards the campaign average by its
+click volume, relative to that average.
+"""
+
+from __future__ import annotations
+import sys, os
+from datetime import date, timedelta
+
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from google_ads_client import get_env_float, get_env_int
+from skills.data_gathering.columnar import fetch_table
+from skills.data_gathering.query_builder import predicate
+from foc_config.ad_grants import AD_SCHEDULE
+
+
+CUBE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "db", "hour_cube.npz")
+
+HOUR_CUBE_METRICS = ("impressions", "clicks", "conversions", "cost_micros")
+WEEKDAYS = ("MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY")
+
+# Days that may still be restated (late conversions) are left out
+SETTLE_DAYS = 3
+
+HOURLY_SPEC = {
+    "date": ("segments.date", "str"),
+    "day_of_week": ("segments.day_of_week", "int"),
+    "hour": ("segments.hour", "int"),
+    "campaign_id": ("campaign.id", "int"),
+    "campaign": ("campaign.name", "str"),
+    "impressions": ("metrics.impressions", "int"),
+    "clicks": ("metrics.clicks", "int"),
+    "conversions": ("metrics.conversions", "float"),
+    "cost_micros": ("metrics.cost_micros", "micros"),
+}
+
+# DayOfWeek enum numbers: MONDAY = 2 … SUNDAY = 8
+_DAY_OF_WEEK_OFFSET = 2
+
+# Modifier bounds and rounding for recommendations
+MIN_MODIFIER = 0.5
+MAX_MODIFIER = 1.5
+MODIFIER_STEP = 0.05
+# Clicks of "prior" pulling each cell towards the campaign's conversion rate
+PRIOR_CLICKS = 50
+
+
+# ─── Storage ─────────────────────────────────────────────────
+
+def empty_cube() -> dict:
+    """A cube with no campaigns and no watermark."""
+    return {
+        "cube": np.zeros((0, 7, 24, len(HOUR_CUBE_METRICS)), dtype=np.float64),
+        "campaign_ids": np.zeros(0, dtype=np.int64),
+        "campaigns": np.zeros(0, dtype=str),
+        "watermark": "",
+    }
+
+
+def load_cube(path: str = CUBE_PATH) -> dict:
+    """Load the stored cube, or an empty one if none has been built."""
+    if not os.path.exists(path):
+        return empty_cube()
+    with np.load(path, allow_pickle=False) as f:
+        return {
+            "cube": f["cube"],
+            "campaign_ids": f["campaign_ids"],
+            "campaigns": f["campaigns"],
+            "watermark": str(f["watermark"]),
+        }
+
+
+def save_cube(cube: dict, path: str = CUBE_PATH):
+    """Write the cube atomically (readers never see a partial file)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(
+            f, cube=cube["cube"], campaign_ids=cube["campaign_ids"],
+            campaigns=np.asarray(cube["campaigns"], dtype=str), watermark=np.asarray(cube["watermark"]),
+        )
+    os.replace(tmp, path)
+
+
+# ─── Incremental update ──────────────────────────────────────
+
+def fetch_hourly(start: str, end: str):
+    """Hourly campaign rows for start..end as a ColumnarReport."""
+    return fetch_table("campaign", HOURLY_SPEC, where=[
+        f"segments.date BETWEEN '{start}' AND '{end}'",
+        predicate("campaign.status", "!=", "REMOVED"),
+        predicate("metrics.impressions", ">", 0),
+    ])
+
+
+def fold_hourly(cube: dict, report, end: date, half_life: float) -> dict:
+    """
+    Add hourly rows to a cube in place, weighting each row by its age at
+    `end` (0.5 per half_life days). Campaigns not yet in the cube are added.
+    """
+    if not len(report):
+        return cube
+
+    # Map campaign ids to cube rows, growing the cube for new campaigns
+    ids = report["campaign_id"]
+    unseen = ~np.isin(ids, cube["campaign_ids"])
+    new_ids, first = np.unique(ids[unseen], return_index=True)
+    if len(new_ids):
+        new_names = report.strings("campaign")[unseen][first]
+        cube["cube"] = np.concatenate([cube["cube"], np.zeros((len(new_ids),) + cube["cube"].shape[1:])])
+        cube["campaign_ids"] = np.concatenate([cube["campaign_ids"], new_ids])
+        cube["campaigns"] = np.concatenate([np.asarray(cube["campaigns"], dtype=object), new_names])
+    order = np.argsort(cube["campaign_ids"])
+    rows = order[np.searchsorted(cube["campaign_ids"], ids, sorter=order)]
+
+    # Per-row age weight from the date vocabulary (one conversion per distinct date)
+    date_vocab = np.array([(end - date.fromisoformat(d)).days for d in report.vocab["date"]], dtype=np.float64)
+    weights = 0.5 ** (date_vocab[report["date"]] / half_life)
+
+    values = np.stack([report[m].astype(np.float64) for m in HOUR_CUBE_METRICS], axis=1) * weights[:, None]
+    weekday = report["day_of_week"] - _DAY_OF_WEEK_OFFSET
+    valid = (weekday >= 0) & (weekday < 7) & (report["hour"] >= 0) & (report["hour"] < 24)
+    np.add.at(cube["cube"], (rows[valid], weekday[valid], report["hour"][valid]), values[valid])
+    return cube
+
+
+def update_hour_cube(today: date | None = None, path: str = CUBE_PATH) -> dict:
+    """
+    Pull settled days after the cube's watermark and fold them in.
+
+    The first run backfills HOUR_CUBE_INITIAL_DAYS (default 90). Existing
+    data decays by the number of days the watermark moves.
+
+    Returns:
+        {"start", "end", "rows", "campaigns"} ("start" is None when up to date).
+    """
+    today = today or date.today()
+    end = today - timedelta(days=SETTLE_DAYS)
+    half_life = get_env_float("HOUR_CUBE_HALF_LIFE_DAYS", 60.0)
+
+    cube = load_cube(path)
+    if cube["watermark"]:
+        start = date.fromisoformat(cube["watermark"]) + timedelta(days=1)
+    else:
+        start = end - timedelta(days=get_env_int("HOUR_CUBE_INITIAL_DAYS", 90) - 1)
+    if start > end:
+        return {"start": None, "end": cube["watermark"], "rows": 0, "campaigns": len(cube["campaign_ids"])}
+
+    report = fetch_hourly(start.isoformat(), end.isoformat())
+    if cube["watermark"]:
+        cube["cube"] *= 0.5 ** ((end - date.fromisoformat(cube["watermark"])).days / half_life)
+    fold_hourly(cube, report, end, half_life)
+    cube["watermark"] = end.isoformat()
+    save_cube(cube, path)
+    return {"start": start.isoformat(), "end": end.isoformat(), "rows": len(report),
+            "campaigns": len(cube["campaign_ids"])}
+
+
+# ─── Recommendations ─────────────────────────────────────────
+
+def configured_modifiers(schedule: dict = AD_SCHEDULE) -> np.ndarray:
+    """The hard-coded AD_SCHEDULE as a (7, 24) modifier grid (hour ranges end-exclusive)."""
+    grid = np.ones((7, 24))
+    for days, part in ((slice(0, 5), schedule["weekday"]), (slice(5, 7), schedule["weekend"])):
+        grid[days, :] = part.get("bid_modifier_off", 1.0)
+        for start, end in part.get("moderate_hours", ()):
+            grid[days, start:end] = part.get("bid_modifier_moderate", 1.0)
+        for start, end in part.get("peak_hours", ()):
+            grid[days, start:end] = part.get("bid_modifier_peak", 1.0)
+    return grid
+
+
+def schedule_modifiers(cube: dict, campaign_id: int | None = None) -> dict:
+    """
+    Recommended bid modifier per weekday × hour.
+
+    Each cell's conversion rate is smoothed towards the overall rate with
+    PRIOR_CLICKS clicks of prior, divided by the overall rate, clipped to
+    MIN_MODIFIER..MAX_MODIFIER and rounded to MODIFIER_STEP. Cells with
+    little traffic therefore stay near 1.0.
+
+    Args:
+        cube: load_cube() output
+        campaign_id: One campaign, or None for the whole account
+
+    Returns:
+        {"modifiers": (7, 24) array, "clicks": (7, 24), "conversions": (7, 24),
+         "conversion_rate": overall conversions per click}
+    """
+    data = cube["cube"]
+    if campaign_id is None:
+        grid = data.sum(axis=0)
+    else:
+        matches = np.flatnonzero(cube["campaign_ids"] == campaign_id)
+        grid = data[matches[0]] if len(matches) else np.zeros(data.shape[1:])
+
+    clicks = grid[..., HOUR_CUBE_METRICS.index("clicks")]
+    conversions = grid[..., HOUR_CUBE_METRICS.index("conversions")]
+    total_clicks = clicks.sum()
+    overall = conversions.sum() / total_clicks if total_clicks > 0 else 0.0
+
+    if overall > 0:
+        smoothed = (conversions + PRIOR_CLICKS * overall) / (clicks + PRIOR_CLICKS)
+        raw = np.clip(smoothed / overall, MIN_MODIFIER, MAX_MODIFIER)
+        modifiers = np.round(raw / MODIFIER_STEP) * MODIFIER_STEP
+    else:
+        modifiers = np.ones_like(clicks)
+
+    return {"modifiers": modifiers, "clicks": clicks, "conversions": conversions, "conversion_rate": overall}
+
+
+def schedule_blocks(modifiers: np.ndarray, split_on: np.ndarray | None = None) -> list[dict]:
+    """
+    Collapse a (7, 24) grid into runs of equal modifier:
+    [{day, start_hour, end_hour, modifier}]. Runs also break wherever the
+    optional `split_on` grid changes.
+    """
+    blocks = []
+    for d in range(7):
+        row = modifiers[d]
+        # Hours where the modifier (or split_on) changes start a new block
+        changed = np.abs(np.diff(row)) > 1e-9
+        if split_on is not None:
+            changed |= np.abs(np.diff(split_on[d])) > 1e-9
+        starts = np.flatnonzero(np.r_[True, changed])
+        ends = np.r_[starts[1:], 24]
+        for s, e in zip(starts, ends):
+            blocks.append({"day": WEEKDAYS[d], "start_hour": int(s), "end_hour": int(e),
+                           "modifier": round(float(row[s]), 2)})
+    return blocks
+
+
+def recommend_schedule(cube: dict | None = None, campaign_id: int | None = None) -> dict:
+    """
+    Data-driven schedule next to the configured AD_SCHEDULE.
+
+    Returns:
+        {"watermark", "blocks": non-neutral blocks, "changes": blocks whose
+         recommended modifier differs from AD_SCHEDULE by ≥ 0.1 (with
+         "configured"), "modifiers": (7, 24) array}
+    """
+    if cube is None:
+        cube = load_cube()
+    result = schedule_modifiers(cube, campaign_id)
+    modifiers = result["modifiers"]
+    configured = configured_modifiers()
+
+    differs = np.abs(modifiers - configured) >= 0.1 - 1e-9
+    changes = []
+    for b in schedule_blocks(modifiers, split_on=configured + 10 * differs):
+        day = WEEKDAYS.index(b["day"])
+        if differs[day, b["start_hour"]]:
+            changes.append({**b, "configured": round(float(configured[day, b["start_hour"]]), 2)})
+    return {
+        "watermark": cube["watermark"],
+        "blocks": [b for b in schedule_blocks(modifiers) if b["modifier"] != 1.0],
+        "changes": changes,
+        "modifiers": modifiers,
+    }
+
+
+def format_schedule(recommendation: dict, max_rows: int = 14) -> list[str]:
+    """Report lines for recommend_schedule() output."""
+    if not recommendation["watermark"]:
+        return ["  No hourly data yet — the cube is built on the first update"]
+    lines = [f"  Based on hourly data through {recommendation['watermark']}"]
+    if not recommendation["changes"]:
+        lines.append("  ✅ AD_SCHEDULE matches the data")
+        return lines
+    for c in recommendation["changes"][:max_rows]:
+        lines.append(f"  {c['day'][:3]} {c['start_hour']:02d}:00–{c['end_hour']:02d}:00  "
+                     f"{c['configured']:.2f} → {c['modifier']:.2f}")
+    if len(recommendation["changes"]) > max_rows:
+        lines.append(f"  … and {len(recommendation['changes']) - max_rows} more")
+    return lines
+
+
+# ─── CLI ─────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    print("\n═══ HOUR × WEEKDAY CUBE ═══")
+    info = update_hour_cube()
+    if info["start"]:
+        print(f"  Folded in {info['rows']} hourly rows ({info['start']} → {info['end']}), {info['campaigns']} campaigns")
+    else:
+        print(f"  Already up to date through {info['end']}")
+    print("\n═══ RECOMMENDED AD SCHEDULE CHANGES ═══")
+    print("\n".join(format_schedule(recommend_schedule())))
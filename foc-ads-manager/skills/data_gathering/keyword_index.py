@@ -0,0 +1,135 @@
+"""
+Keyword Coverage Index
+Answers "is this search term already covered by a keyword, and by which one"
+with Google's match types and close variants taken into account, instead of
+comparing raw lowercase strings.
+
+Keywords are normalized to stemmed word tokens (plurals, possessives and
+-ing forms fold together) and indexed three ways:
+
+    EXACT   sorted-token signature → keyword (word order and close variants)
+    PHRASE  token automaton over stemmed phrases (in order, contiguous)
+    BROAD   inverted index token → broad keywords containing it; a keyword
+            covers the term once all of its distinct tokens are hit
+
+EXACT and PHRASE lookups cost a bounded number of dict probes per term;
+BROAD costs one probe per distinct term token plus the postings it hits,
+independent of how many keywords are indexed.
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from typing import Iterable
+
+from skills.data_gathering.phrase_matcher import PhraseMatcher, tokenize
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """
+    Light English stemmer for close-variant matching.
+    Folds possessives, plurals and -ing forms: "volunteers'" / "volunteering"
+    / "volunteer" all become "volunteer".
+    """
+    if token.endswith(("'s", "’s")):
+        token = token[:-2]
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("sses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    if len(token) > 6 and token.endswith("ing"):
+        return token[:-3]
+    return token
+
+
+def normalize(text: str) -> tuple[str, ...]:
+    """Stemmed word tokens of `text`."""
+    return tuple(stem(token) for token in tokenize(text))
+
+
+def signature(tokens: Iterable[str]) -> tuple[str, ...]:
+    """Order-insensitive key for a token sequence (distinct tokens, sorted)."""
+    return tuple(sorted(set(tokens)))
+
+
+class KeywordCoverageIndex:
+    """
+    Index of keywords by match type for coverage lookups.
+
+    Args:
+        keywords: dicts with "keyword" and "match_type" (EXACT / PHRASE /
+                  BROAD); any other fields are returned with the match
+    """
+
+    def __init__(self, keywords: Iterable[dict]):
+        self.keywords = list(keywords)
+        self._exact: dict[tuple[str, ...], int] = {}
+        self._broad_index: dict[str, list[int]] = {}
+        self._broad_size: dict[int, int] = {}
+        broad_seen: set[tuple[str, ...]] = set()
+        phrase_ids: list[int] = []
+        phrase_tokens: list[tuple[str, ...]] = []
+
+        for i, kw in enumerate(self.keywords):
+            tokens = normalize(kw["keyword"])
+            if not tokens:
+                continue
+            match_type = kw.get("match_type", "BROAD")
+            if match_type == "EXACT":
+                self._exact.setdefault(signature(tokens), i)
+            elif match_type == "PHRASE":
+                phrase_ids.append(i)
+                phrase_tokens.append(tokens)
+            else:
+                key = signature(tokens)
+                if key in broad_seen:
+                    continue
+                broad_seen.add(key)
+                self._broad_size[i] = len(key)
+                for token in key:
+                    self._broad_index.setdefault(token, []).append(i)
+
+        self._phrase_ids = phrase_ids
+        self._phrases = PhraseMatcher(phrase_tokens)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def covering(self, term: str) -> tuple[dict, str] | None:
+        """
+        The keyword that already covers `term`, and how.
+
+        Returns:
+            (keyword dict, match_type) for the strongest covering keyword
+            (EXACT before PHRASE before BROAD), or None if nothing covers it.
+        """
+        tokens = normalize(term)
+        if not tokens:
+            return None
+        key = signature(tokens)
+
+        i = self._exact.get(key)
+        if i is not None:
+            return self.keywords[i], "EXACT"
+
+        hits = self._phrases.find(tokens)
+        if hits:
+            return self.keywords[self._phrase_ids[min(hits)]], "PHRASE"
+
+        if self._broad_index:
+            counts: dict[int, int] = {}
+            for token in key:
+                for i in self._broad_index.get(token, ()):
+                    counts[i] = counts.get(i, 0) + 1
+            full = [i for i, n in counts.items() if n == self._broad_size[i]]
+            if full:
+                # Most specific keyword first, then the first one indexed
+                i = min(full, key=lambda i: (-self._broad_size[i], i))
+                return self.keywords[i], "BROAD"
+        return None
+
+    def is_covered(self, term: str) -> bool:
+        """True if any indexed keyword covers `term`."""
+        return self.covering(term) is not None
@@ -8,7 +8,10 @@ from __future__ import annotations
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from google_ads_client import get_client, get_customer_id, run_query
+from google_ads_client import get_client, get_customer_id, stream_query
+from skills.data_gathering.warehouse import daily_record, read_campaign_performance, read_daily_performance
+from skills.data_gathering.query_builder import build_query
+from skills.data_gathering.aggregate import add_metrics, add_record, finish, new_totals
 
 
 # ─── GAQL Queries ────────────────────────────────────────────
@@ -74,7 +77,6 @@ AD_PERF_QUERY = """
     WHERE segments.date DURING {date_range}
         AND ad_group_ad.status != 'REMOVED'
     ORDER BY metrics.impressions DESC
-    LIMIT 100
 """
 
 DAILY_PERF_QUERY = """
@@ -82,10 +84,7 @@ DAILY_PERF_QUERY = """
         segments.date,
         metrics.impressions,
         metrics.clicks,
-        metrics.ctr,
-        metrics.average_cpc,
         metrics.conversions,
-        metrics.cost_per_conversion,
         metrics.cost_micros
     FROM campaign
     WHERE segments.date DURING {date_range}
@@ -96,11 +95,15 @@ DAILY_PERF_QUERY = """
 # ─── Data Extraction ────────────────────────────────────────
 
 def get_campaign_performance(date_range: str = "LAST_30_DAYS") -> list[dict]:
-    """Pull campaign-level performance metrics."""
+    """Pull campaign-level performance metrics (from the warehouse when it covers the range)."""
+    stored = read_campaign_performance(date_range)
+    if stored is not None:
+        return stored
+
     client = get_client()
     customer_id = get_customer_id()
     query = CAMPAIGN_PERF_QUERY.format(date_range=date_range)
-    rows = run_query(client, customer_id, query)
+    rows = stream_query(client, customer_id, query)
 
     results = []
     for row in rows:
@@ -122,6 +125,7 @@ def get_campaign_performance(date_range: str = "LAST_30_DAYS") -> list[dict]:
             "cpa": row.metrics.cost_per_conversion / 1_000_000 if row.metrics.cost_per_conversion else 0,
             "conversion_rate": round(row.metrics.conversions_from_interactions_rate * 100, 2),
             "cost": cost,
+            "cost_micros": row.metrics.cost_micros,
             "conversion_value": conv_value,
             "roas": round(conv_value / cost, 2) if cost > 0 else 0,
         })
@@ -133,7 +137,7 @@ def get_ad_group_performance(date_range: str = "LAST_30_DAYS") -> list[dict]:
     client = get_client()
     customer_id = get_customer_id()
     query = AD_GROUP_PERF_QUERY.format(date_range=date_range)
-    rows = run_query(client, customer_id, query)
+    rows = stream_query(client, customer_id, query)
 
     results = []
     for row in rows:
@@ -159,7 +163,7 @@ def get_ad_performance(date_range: str = "LAST_30_DAYS") -> list[dict]:
     client = get_client()
     customer_id = get_customer_id()
     query = AD_PERF_QUERY.format(date_range=date_range)
-    rows = run_query(client, customer_id, query)
+    rows = stream_query(client, customer_id, query)
 
     results = []
     for row in rows:
@@ -193,72 +197,65 @@ def get_ad_performance(date_range: str = "LAST_30_DAYS") -> list[dict]:
 
 
 def get_daily_performance(date_range: str = "LAST_30_DAYS") -> list[dict]:
-    """Pull daily aggregate metrics for trend analysis."""
+    """Pull daily aggregate metrics for trend analysis (from the warehouse when it covers the range)."""
+    stored = read_daily_performance(date_range)
+    if stored is not None:
+        return stored
+
     client = get_client()
     customer_id = get_customer_id()
     query = DAILY_PERF_QUERY.format(date_range=date_range)
-    rows = run_query(client, customer_id, query)
+    rows = stream_query(client, customer_id, query)
 
-    # Aggregate by date
+    # Sum exact micros per date; CPC and CPA come from the day's totals,
+    # not an average of each campaign's average
     by_date: dict[str, dict] = {}
     for row in rows:
         d = row.segments.date
         if d not in by_date:
-            by_date[d] = {
-                "date": d,
-                "impressions": 0, "clicks": 0, "conversions": 0.0,
-                "cost_micros": 0, "cpc_total": 0.0, "cpc_count": 0,
-            }
-        entry = by_date[d]
-        entry["impressions"] += row.metrics.impressions
-        entry["clicks"] += row.metrics.clicks
-        entry["conversions"] += row.metrics.conversions
-        entry["cost_micros"] += row.metrics.cost_micros
-        if row.metrics.average_cpc:
-            entry["cpc_total"] += row.metrics.average_cpc
-            entry["cpc_count"] += 1
-
-    results = []
-    for d in sorted(by_date.keys(), reverse=True):
-        e = by_date[d]
-        cost = e["cost_micros"] / 1_000_000
-        results.append({
-            "date": e["date"],
-            "impressions": e["impressions"],
-            "clicks": e["clicks"],
-            "ctr": round((e["clicks"] / e["impressions"] * 100) if e["impressions"] > 0 else 0, 2),
-            "avg_cpc": round((e["cpc_total"] / e["cpc_count"] / 1_000_000) if e["cpc_count"] > 0 else 0, 2),
-            "conversions": e["conversions"],
-            "cpa": round(cost / e["conversions"], 2) if e["conversions"] > 0 else 0,
-            "cost": round(cost, 2),
-        })
-    return results
+            by_date[d] = new_totals()
+        add_metrics(by_date[d], row.metrics)
+    return [daily_record(d, by_date[d]) for d in sorted(by_date, reverse=True)]
 
 
 # ─── Summary ─────────────────────────────────────────────────
 
+def get_account_ctr(date_range: str = "LAST_30_DAYS") -> float:
+    """
+    Account-level CTR (%) from a two-column query on the customer resource.
+    Cheaper than get_account_summary when only CTR is needed (Ad Grants checks).
+    """
+    client = get_client()
+    customer_id = get_customer_id()
+    query = build_query("customer", ["metrics.impressions", "metrics.clicks"], date_range=date_range)
+
+    impressions = clicks = 0
+    for row in stream_query(client, customer_id, query):
+        impressions += row.metrics.impressions
+        clicks += row.metrics.clicks
+    return round((clicks / impressions * 100) if impressions > 0 else 0, 2)
+
+
 def get_account_summary(date_range: str = "LAST_30_DAYS") -> dict:
     """Generate a high-level account summary."""
     campaigns = get_campaign_performance(date_range)
-
-    total_impressions = sum(c["impressions"] for c in campaigns)
-    total_clicks = sum(c["clicks"] for c in campaigns)
-    total_conversions = sum(c["conversions"] for c in campaigns)
-    total_cost = sum(c["cost"] for c in campaigns)
-    total_value = sum(c["conversion_value"] for c in campaigns)
+    totals = new_totals()
+    for c in campaigns:
+        add_record(totals, c)
+    f = finish(totals)
 
     return {
         "active_campaigns": len([c for c in campaigns if c["status"] == "ENABLED"]),
-        "total_impressions": total_impressions,
-        "total_clicks": total_clicks,
-        "overall_ctr": round((total_clicks / total_impressions * 100) if total_impressions > 0 else 0, 2),
-        "total_conversions": total_conversions,
-        "total_cost": round(total_cost, 2),
-        "overall_cpa": round(total_cost / total_conversions, 2) if total_conversions > 0 else 0,
-        "overall_cpc": round(total_cost / total_clicks, 2) if total_clicks > 0 else 0,
-        "overall_conversion_rate": round((total_conversions / total_clicks * 100) if total_clicks > 0 else 0, 2),
-        "total_conversion_value": round(total_value, 2),
-        "overall_roas": round(total_value / total_cost, 2) if total_cost > 0 else 0,
+        "total_impressions": f["impressions"],
+        "total_clicks": f["clicks"],
+        "overall_ctr": f["ctr"],
+        "total_conversions": f["conversions"],
+        "total_cost": f["cost"],
+        "overall_cpa": f["cpa"],
+        "overall_cpc": f["avg_cpc"],
+        "overall_conversion_rate": f["conversion_rate"],
+        "total_conversion_value": f["conversion_value"],
+        "overall_roas": f["roas"],
         "campaigns": campaigns,
     }
 
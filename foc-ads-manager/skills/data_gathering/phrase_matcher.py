@@ -0,0 +1,161 @@
+"""
+Phrase Matcher
+Match search terms against a whole negative keyword list in one pass.
+
+Phrases are matched on word tokens with an Aho-Corasick automaton built over
+a token trie, so scanning a term costs O(words in the term) no matter how
+many phrases are loaded. Exact and broad negatives are handled alongside with
+a dict lookup and an inverted token index, following Google's negative match
+semantics:
+
+    PHRASE  the words appear in order, next to each other
+    EXACT   the term is exactly the phrase
+    BROAD   every word of the phrase appears somewhere in the term
+
+Built matchers are cached and rebuilt only when the phrase list changes.
+"""
+
+from __future__ import annotations
+import re
+import threading
+from collections import deque
+from typing import Iterable
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:['’][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> tuple[str, ...]:
+    """Lowercase word tokens of `text`; punctuation is ignored."""
+    return tuple(_TOKEN_RE.findall(text.lower()))
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens.
+
+    Each node of the token trie is a dict of token → child node. Failure
+    links point at the longest proper suffix that is also a trie path, and
+    each node's output lists every phrase ending there (including via its
+    failure chain), so one left-to-right walk finds every phrase.
+    """
+
+    def __init__(self, phrases: Iterable[tuple[str, ...]]):
+        self.phrases: list[tuple[str, ...]] = []
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+
+        for tokens in phrases:
+            phrase_id = len(self.phrases)
+            self.phrases.append(tokens)
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                child = self._goto[node].get(token)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][token] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append(phrase_id)
+
+        # Breadth-first pass sets failure links; a node's failure target is
+        # always shallower, so its outputs are final by the time we get here
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child].extend(self._out[self._fail[child]])
+
+    def find(self, tokens: Iterable[str]) -> set[int]:
+        """Ids (indexes into self.phrases) of every phrase occurring in `tokens`."""
+        found: set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for token in tokens:
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class NegativeMatcher:
+    """
+    Matches search terms against negative keywords of any match type.
+
+    Args:
+        negatives: (text, match_type) pairs; match_type is EXACT, PHRASE or
+                   BROAD (anything else is treated as PHRASE)
+    """
+
+    def __init__(self, negatives: Iterable[tuple[str, str]]):
+        self.negatives = list(negatives)
+        self._exact: dict[tuple[str, ...], list[int]] = {}
+        self._broad_index: dict[str, list[int]] = {}
+        self._broad_size: dict[int, int] = {}
+        phrase_ids: list[int] = []
+        phrase_tokens: list[tuple[str, ...]] = []
+
+        for i, (text, match_type) in enumerate(self.negatives):
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            if match_type == "EXACT":
+                self._exact.setdefault(tokens, []).append(i)
+            elif match_type == "BROAD":
+                distinct = set(tokens)
+                self._broad_size[i] = len(distinct)
+                for token in distinct:
+                    self._broad_index.setdefault(token, []).append(i)
+            else:
+                phrase_ids.append(i)
+                phrase_tokens.append(tokens)
+
+        self._phrase_ids = phrase_ids
+        self._phrases = PhraseMatcher(phrase_tokens)
+
+    def match(self, term: str) -> list[int]:
+        """Indexes into self.negatives of every negative that blocks `term`."""
+        tokens = tokenize(term)
+        hits = [self._phrase_ids[p] for p in self._phrases.find(tokens)]
+        hits.extend(self._exact.get(tokens, ()))
+        if self._broad_index:
+            counts: dict[int, int] = {}
+            for token in set(tokens):
+                for i in self._broad_index.get(token, ()):
+                    counts[i] = counts.get(i, 0) + 1
+            hits.extend(i for i, n in counts.items() if n == self._broad_size[i])
+        return sorted(set(hits))
+
+
+# ─── Cached matcher ─────────────────────────────────────────
+
+_matcher_lock = threading.Lock()
+_matcher_key: tuple | None = None
+_matcher: NegativeMatcher | None = None
+
+
+def get_negative_matcher(negatives: Iterable[tuple[str, str]]) -> NegativeMatcher:
+    """
+    Return a NegativeMatcher for `negatives`, reusing the last one built if
+    the list is unchanged (same entries, same order).
+    """
+    global _matcher_key, _matcher
+    key = tuple(negatives)
+    with _matcher_lock:
+        if _matcher is None or key != _matcher_key:
+            _matcher = NegativeMatcher(key)
+            _matcher_key = key
+        return _matcher
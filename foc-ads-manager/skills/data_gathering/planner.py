@@ -0,0 +1,118 @@
+"""
+Data Planner
+Each skill declares the datasets it reads in a module-level REQUIRED_DATASETS
+tuple. The planner fetches the union of those datasets once, running the
+independent GAQL queries concurrently on a bounded thread pool, and hands the
+shared results to the analyzers.
+
+Datasets another job fetched recently are reused from the snapshot store
+(see skills/data_gathering/snapshots.py) instead of being queried again.
+"""
+
+from __future__ import annotations
+import sys, os
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from google_ads_client import get_env_int
+from skills.data_gathering.performance import get_account_summary, get_ad_performance, get_daily_performance
+from skills.data_gathering.budget import get_budget_status
+from skills.data_gathering.search_terms import get_search_terms, get_keywords, get_live_negatives
+from skills.data_gathering.snapshots import get_snapshot, put_snapshot
+
+
+# Dataset name → zero-argument fetcher
+DATASET_FETCHERS = {
+    "search_terms": lambda: get_search_terms("LAST_30_DAYS"),
+    "search_terms_7d": lambda: get_search_terms("LAST_7_DAYS"),
+    "keywords": get_keywords,
+    "live_negatives": get_live_negatives,
+    "ad_performance": lambda: get_ad_performance("LAST_30_DAYS"),
+    "budget_status": get_budget_status,
+    "account_summary_today": lambda: get_account_summary("TODAY"),
+    "account_summary_7d": lambda: get_account_summary("LAST_7_DAYS"),
+    "account_summary_30d": lambda: get_account_summary("LAST_30_DAYS"),
+    "daily_performance_7d": lambda: get_daily_performance("LAST_7_DAYS"),
+}
+
+
+def datasets_for(skills) -> list[str]:
+    """Return the union of REQUIRED_DATASETS declared by the given skill modules."""
+    names: list[str] = []
+    for skill in skills:
+        for name in getattr(skill, "REQUIRED_DATASETS", ()):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def _timed_fetch(name: str):
+    start = time.perf_counter()
+    value = DATASET_FETCHERS[name]()
+    put_snapshot(name, value)
+    return value, time.perf_counter() - start
+
+
+def fetch_datasets(names: list[str], max_workers: int | None = None, use_snapshots: bool = True) -> dict:
+    """
+    Fetch each named dataset once, concurrently, reusing fresh snapshots.
+
+    A dataset whose fetch fails is left out of the result (and reported in
+    "_errors") so the skill that needs it falls back to fetching on its own.
+
+    Args:
+        names: Dataset names from DATASET_FETCHERS
+        max_workers: Thread pool size (default PLANNER_MAX_WORKERS or 4)
+        use_snapshots: Reuse snapshots within their freshness policy
+                       (fetched datasets are stored either way)
+
+    Returns:
+        {name: data, ..., "_timings": {name: seconds}, "_errors": {name: message},
+         "_reused": {name: snapshot age in seconds}, "_wall_time": seconds}
+    """
+    if max_workers is None:
+        max_workers = get_env_int("PLANNER_MAX_WORKERS", 4)
+
+    data: dict = {}
+    timings: dict[str, float] = {}
+    errors: dict[str, str] = {}
+    reused: dict[str, float] = {}
+    start = time.perf_counter()
+
+    to_fetch = []
+    for name in names:
+        snapshot = get_snapshot(name) if use_snapshots else None
+        if snapshot is None:
+            to_fetch.append(name)
+        else:
+            data[name], reused[name] = snapshot
+
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="planner") as pool:
+            futures = {name: pool.submit(_timed_fetch, name) for name in to_fetch}
+            for name, future in futures.items():
+                try:
+                    data[name], timings[name] = future.result()
+                except Exception as e:
+                    errors[name] = str(e)
+
+    data["_timings"] = timings
+    data["_errors"] = errors
+    data["_reused"] = reused
+    data["_wall_time"] = time.perf_counter() - start
+    return data
+
+
+def format_plan_summary(data: dict) -> str:
+    """One-line summary of how long the shared fetch took vs running it serially."""
+    timings = data.get("_timings", {})
+    serial = sum(timings.values())
+    line = (f"{len(timings)} datasets in {data.get('_wall_time', 0):.1f}s "
+            f"(serial would be ~{serial:.1f}s)")
+    reused = data.get("_reused")
+    if reused:
+        line += f", {len(reused)} reused from snapshots ({', '.join(f'{n} {age / 60:.0f}m old' for n, age in reused.items())})"
+    if data.get("_errors"):
+        line += f" — {len(data['_errors'])} failed: {', '.join(data['_errors'])}"
+    return line
@@ -0,0 +1,115 @@
+"""
+GAQL Query Builder
+Build lean queries that select only the columns an analyzer reads and push
+its thresholds into the WHERE clause, so filtering happens on Google's side
+instead of after every row has been downloaded and decoded.
+"""
+
+from __future__ import annotations
+import enum
+from typing import Callable, Iterable
+
+
+# A column spec maps an output dict key to a GAQL field path, optionally with
+# a transform applied to the raw value: {"cost": ("metrics.cost_micros", micros)}
+ColumnSpec = dict[str, "str | tuple[str, Callable]"]
+
+
+def micros(value) -> float:
+    """Convert an API micros amount to currency units."""
+    return value / 1_000_000 if value else 0
+
+
+def percent(value) -> float:
+    """Convert an API ratio (e.g. metrics.ctr) to a rounded percentage."""
+    return round(value * 100, 2)
+
+
+def column_fields(columns: ColumnSpec) -> list[str]:
+    """Return the GAQL field paths referenced by a column spec, in order."""
+    fields = []
+    for spec in columns.values():
+        path = spec[0] if isinstance(spec, tuple) else spec
+        if path not in fields:
+            fields.append(path)
+    return fields
+
+
+def predicate(field: str, op: str, value) -> str:
+    """
+    Format a single WHERE predicate, quoting strings and lists as GAQL expects.
+
+    Example:
+        predicate("metrics.clicks", ">=", 50)  →  "metrics.clicks >= 50"
+        predicate("campaign.status", "IN", ["ENABLED", "PAUSED"])
+    """
+    if isinstance(value, (list, tuple, set)):
+        formatted = "(" + ", ".join(_literal(v) for v in value) + ")"
+    else:
+        formatted = _literal(value)
+    return f"{field} {op} {formatted}"
+
+
+def _literal(value) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "\\'") + "'"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+
+def build_query(
+    resource: str,
+    fields: Iterable[str],
+    where: Iterable[str] = (),
+    date_range: str | None = None,
+    order_by: str | None = None,
+    limit: int | None = None,
+) -> str:
+    """
+    Assemble a GAQL SELECT statement.
+
+    Args:
+        resource: FROM resource, e.g. 'search_term_view'
+        fields: Field paths to select
+        where: Predicates ANDed together (see predicate())
+        date_range: Optional GAQL date literal for segments.date DURING
+        order_by: Optional ORDER BY expression
+        limit: Optional row limit
+
+    Returns:
+        GAQL query string.
+    """
+    conditions = []
+    if date_range:
+        conditions.append(f"segments.date DURING {date_range}")
+    conditions.extend(where)
+
+    lines = ["SELECT", "    " + ",\n    ".join(fields), f"FROM {resource}"]
+    if conditions:
+        lines.append("WHERE " + "\n    AND ".join(conditions))
+    if order_by:
+        lines.append(f"ORDER BY {order_by}")
+    if limit is not None:
+        lines.append(f"LIMIT {int(limit)}")
+    return "\n".join(lines)
+
+
+def read_field(row, path: str):
+    """Read a dotted field from a GoogleAdsRow; enums are returned by name."""
+    value = row
+    for part in path.split("."):
+        value = getattr(value, part)
+    return value.name if isinstance(value, enum.Enum) else value
+
+
+def row_to_dict(row, columns: ColumnSpec) -> dict:
+    """Convert a GoogleAdsRow to a dict using a column spec."""
+    result = {}
+    for key, spec in columns.items():
+        if isinstance(spec, tuple):
+            path, transform = spec
+            result[key] = transform(read_field(row, path))
+        else:
+            result[key] = read_field(row, spec)
+    return result
@@ -5,9 +5,19 @@ Pull search query performance data, identify opportunities and waste.
 
 from __future__ import annotations
 import sys, os
+import heapq
+from typing import Iterable
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from google_ads_client import get_client, get_customer_id, run_query, get_env_int
+from google_ads_client import get_client, get_customer_id, stream_query, get_env_int
+from skills.data_gathering.query_builder import build_query, column_fields, predicate, row_to_dict, micros
+from skills.data_gathering.columnar import ColumnarReport, fetch_table
+from skills.data_gathering.aggregate import group_sum, record_micros, to_currency
+from skills.data_gathering.phrase_matcher import get_negative_matcher, tokenize
+from skills.data_gathering.keyword_index import KeywordCoverageIndex
+from foc_config.negative_seed import get_all_negatives
+
+import numpy as np
 
 
 # ─── GAQL Queries ────────────────────────────────────────────
@@ -29,7 +39,6 @@ SEARCH_TERM_QUERY = """
     WHERE segments.date DURING LAST_30_DAYS
         AND metrics.impressions > 0
     ORDER BY metrics.impressions DESC
-    LIMIT 500
 """
 
 KEYWORD_QUERY = """
@@ -52,84 +61,264 @@ KEYWORD_QUERY = """
     WHERE segments.date DURING LAST_30_DAYS
         AND ad_group_criterion.status != 'REMOVED'
     ORDER BY metrics.impressions DESC
-    LIMIT 500
 """
 
 
+# Lean column sets for analyzers that push their filters into GAQL
+
+NEGATIVE_CANDIDATE_COLUMNS = {
+    "search_term": "search_term_view.search_term",
+    "campaign": "campaign.name",
+    "ad_group": "ad_group.name",
+    "impressions": "metrics.impressions",
+    "clicks": "metrics.clicks",
+    "conversions": "metrics.conversions",
+    "cost": ("metrics.cost_micros", micros),
+    "cost_micros": "metrics.cost_micros",
+}
+
+EXPANSION_CANDIDATE_COLUMNS = {
+    "search_term": "search_term_view.search_term",
+    "campaign": "campaign.name",
+    "ad_group": "ad_group.name",
+    "clicks": "metrics.clicks",
+    "conversions": "metrics.conversions",
+    "avg_cpc": ("metrics.average_cpc", micros),
+    "cost_per_conversion": ("metrics.cost_per_conversion", micros),
+    "cost": ("metrics.cost_micros", micros),
+}
+
+KEYWORD_TEXT_COLUMNS = {
+    "keyword": "ad_group_criterion.keyword.text",
+    "match_type": "ad_group_criterion.keyword.match_type",
+}
+
+# Negative keywords at each level they can be attached: resource, columns, filters
+LIVE_NEGATIVE_SOURCES = {
+    "campaign": ("campaign_criterion", {
+        "keyword": "campaign_criterion.keyword.text",
+        "match_type": "campaign_criterion.keyword.match_type",
+        "scope": "campaign.name",
+    }, [
+        predicate("campaign_criterion.type", "=", "KEYWORD"),
+        predicate("campaign_criterion.negative", "=", True),
+        predicate("campaign_criterion.status", "!=", "REMOVED"),
+    ]),
+    "ad_group": ("ad_group_criterion", {
+        "keyword": "ad_group_criterion.keyword.text",
+        "match_type": "ad_group_criterion.keyword.match_type",
+        "scope": "ad_group.name",
+    }, [
+        predicate("ad_group_criterion.type", "=", "KEYWORD"),
+        predicate("ad_group_criterion.negative", "=", True),
+        predicate("ad_group_criterion.status", "!=", "REMOVED"),
+    ]),
+    "shared_set": ("shared_criterion", {
+        "keyword": "shared_criterion.keyword.text",
+        "match_type": "shared_criterion.keyword.match_type",
+        "scope": "shared_set.name",
+    }, [
+        predicate("shared_criterion.type", "=", "KEYWORD"),
+        predicate("shared_set.type", "=", "NEGATIVE_KEYWORDS"),
+        predicate("shared_set.status", "=", "ENABLED"),
+    ]),
+}
+
+
+# Column layouts for array-backed reports (see columnar.py)
+
+SEARCH_TERM_TABLE_SPEC = {
+    "search_term": ("search_term_view.search_term", "str"),
+    "status": ("search_term_view.status", "str"),
+    "campaign": ("campaign.name", "str"),
+    "ad_group": ("ad_group.name", "str"),
+    "impressions": ("metrics.impressions", "int"),
+    "clicks": ("metrics.clicks", "int"),
+    "conversions": ("metrics.conversions", "float"),
+    "cost_micros": ("metrics.cost_micros", "micros"),
+}
+
+KEYWORD_TABLE_SPEC = {
+    "keyword": ("ad_group_criterion.keyword.text", "str"),
+    "match_type": ("ad_group_criterion.keyword.match_type", "str"),
+    "status": ("ad_group_criterion.status", "str"),
+    "campaign": ("campaign.name", "str"),
+    "ad_group": ("ad_group.name", "str"),
+    "quality_score": ("ad_group_criterion.quality_info.quality_score", "int"),
+    "bid_micros": ("ad_group_criterion.effective_cpc_bid_micros", "micros"),
+    "impressions": ("metrics.impressions", "int"),
+    "clicks": ("metrics.clicks", "int"),
+    "conversions": ("metrics.conversions", "float"),
+    "cost_micros": ("metrics.cost_micros", "micros"),
+}
+
+
 # ─── Data Extraction ────────────────────────────────────────
 
-def get_search_terms(days: str = "LAST_30_DAYS") -> list[dict]:
+def _search_term_row(row) -> dict:
+    """Convert a search_term_view row into a plain dict."""
+    return {
+        "search_term": row.search_term_view.search_term,
+        "status": row.search_term_view.status.name,
+        "campaign": row.campaign.name,
+        "ad_group": row.ad_group.name,
+        "impressions": row.metrics.impressions,
+        "clicks": row.metrics.clicks,
+        "ctr": round(row.metrics.ctr * 100, 2),
+        "avg_cpc": row.metrics.average_cpc / 1_000_000,
+        "conversions": row.metrics.conversions,
+        "cost_per_conversion": row.metrics.cost_per_conversion / 1_000_000 if row.metrics.cost_per_conversion else 0,
+        "cost": row.metrics.cost_micros / 1_000_000,
+        "cost_micros": row.metrics.cost_micros,
+    }
+
+
+def _keyword_row(row) -> dict:
+    """Convert a keyword_view row into a plain dict."""
+    quality_score = row.ad_group_criterion.quality_info.quality_score
+    return {
+        "keyword": row.ad_group_criterion.keyword.text,
+        "match_type": row.ad_group_criterion.keyword.match_type.name,
+        "quality_score": quality_score if quality_score else None,
+        "status": row.ad_group_criterion.status.name,
+        "bid_micros": row.ad_group_criterion.effective_cpc_bid_micros,
+        "bid": row.ad_group_criterion.effective_cpc_bid_micros / 1_000_000,
+        "campaign": row.campaign.name,
+        "ad_group": row.ad_group.name,
+        "impressions": row.metrics.impressions,
+        "clicks": row.metrics.clicks,
+        "ctr": round(row.metrics.ctr * 100, 2),
+        "avg_cpc": row.metrics.average_cpc / 1_000_000,
+        "conversions": row.metrics.conversions,
+        "cost_per_conversion": row.metrics.cost_per_conversion / 1_000_000 if row.metrics.cost_per_conversion else 0,
+        "cost": row.metrics.cost_micros / 1_000_000,
+        "cost_micros": row.metrics.cost_micros,
+    }
+
+
+def iter_search_terms(days: str = "LAST_30_DAYS"):
     """
-    Pull search term performance report.
-    Returns list of dicts with search term, campaign, ad group, and metrics.
+    Stream the search term performance report one dict at a time.
+    Rows are converted as they arrive and bypass the query cache (which
+    would buffer up to QUERY_CACHE_MAX_ROWS protos), so memory stays flat
+    for large accounts.
     """
     client = get_client()
     customer_id = get_customer_id()
 
     query = SEARCH_TERM_QUERY.replace("LAST_30_DAYS", days) if days != "LAST_30_DAYS" else SEARCH_TERM_QUERY
-    rows = run_query(client, customer_id, query)
-
-    results = []
-    for row in rows:
-        results.append({
-            "search_term": row.search_term_view.search_term,
-            "status": row.search_term_view.status.name,
-            "campaign": row.campaign.name,
-            "ad_group": row.ad_group.name,
-            "impressions": row.metrics.impressions,
-            "clicks": row.metrics.clicks,
-            "ctr": round(row.metrics.ctr * 100, 2),
-            "avg_cpc": row.metrics.average_cpc / 1_000_000,
-            "conversions": row.metrics.conversions,
-            "cost_per_conversion": row.metrics.cost_per_conversion / 1_000_000 if row.metrics.cost_per_conversion else 0,
-            "cost": row.metrics.cost_micros / 1_000_000,
-        })
-    return results
-
-
-def get_keywords() -> list[dict]:
+    for row in stream_query(client, customer_id, query, use_cache=False):
+        yield _search_term_row(row)
+
+
+def iter_keywords():
+    """Stream keyword-level performance data one dict at a time (uncached, like iter_search_terms)."""
+    client = get_client()
+    customer_id = get_customer_id()
+    for row in stream_query(client, customer_id, KEYWORD_QUERY, use_cache=False):
+        yield _keyword_row(row)
+
+
+def get_search_terms(days: str = "LAST_30_DAYS", limit: int | None = None) -> list[dict]:
+    """
+    Pull search term performance report.
+    Returns list of dicts with search term, campaign, ad group, and metrics.
+    Every row is returned unless `limit` is set, in which case only the
+    top `limit` terms by impressions are kept (via a bounded heap).
+    """
+    if limit is not None:
+        return top_rows(iter_search_terms(days), limit)
+    return list(iter_search_terms(days))
+
+
+def get_keywords(limit: int | None = None) -> list[dict]:
     """
     Pull keyword-level performance data.
     Returns list of dicts with keyword text, match type, quality score, and metrics.
+    Every row is returned unless `limit` is set (top keywords by impressions).
+    """
+    if limit is not None:
+        return top_rows(iter_keywords(), limit)
+    return list(iter_keywords())
+
+
+def get_search_terms_table(days: str = "LAST_30_DAYS") -> ColumnarReport:
+    """
+    Pull the full search term report into a ColumnarReport.
+    Typed arrays and interned strings instead of one dict per row; call
+    .to_records() only when the rows are displayed.
+    """
+    return fetch_table("search_term_view", SEARCH_TERM_TABLE_SPEC,
+                       where=[predicate("metrics.impressions", ">", 0)], date_range=days)
+
+
+def get_keywords_table() -> ColumnarReport:
+    """Pull keyword-level performance into a ColumnarReport."""
+    return fetch_table("keyword_view", KEYWORD_TABLE_SPEC,
+                       where=[predicate("ad_group_criterion.status", "!=", "REMOVED")],
+                       date_range="LAST_30_DAYS")
+
+
+def get_live_negatives() -> list[dict]:
+    """
+    Pull every negative keyword in the account: campaign-level, ad group-level
+    and shared negative keyword lists.
+    Returns dicts with keyword, match_type, level and scope (the campaign,
+    ad group or list name).
+    """
+    negatives = []
+    for level, (resource, columns, where) in LIVE_NEGATIVE_SOURCES.items():
+        for row in iter_filtered(resource, columns, where):
+            negatives.append({**row, "level": level})
+    return negatives
+
+
+def iter_filtered(resource: str, columns: dict, where: list[str], date_range: str | None = None):
+    """
+    Stream rows of `resource` selecting only `columns` and filtered server-side
+    by `where`. Yields dicts keyed like the column spec. Rows bypass the
+    query cache so nothing beyond the current response is held.
     """
     client = get_client()
     customer_id = get_customer_id()
-    rows = run_query(client, customer_id, KEYWORD_QUERY)
-
-    results = []
-    for row in rows:
-        quality_score = row.ad_group_criterion.quality_info.quality_score
-        results.append({
-            "keyword": row.ad_group_criterion.keyword.text,
-            "match_type": row.ad_group_criterion.keyword.match_type.name,
-            "quality_score": quality_score if quality_score else None,
-            "status": row.ad_group_criterion.status.name,
-            "bid_micros": row.ad_group_criterion.effective_cpc_bid_micros,
-            "bid": row.ad_group_criterion.effective_cpc_bid_micros / 1_000_000,
-            "campaign": row.campaign.name,
-            "ad_group": row.ad_group.name,
-            "impressions": row.metrics.impressions,
-            "clicks": row.metrics.clicks,
-            "ctr": round(row.metrics.ctr * 100, 2),
-            "avg_cpc": row.metrics.average_cpc / 1_000_000,
-            "conversions": row.metrics.conversions,
-            "cost_per_conversion": row.metrics.cost_per_conversion / 1_000_000 if row.metrics.cost_per_conversion else 0,
-            "cost": row.metrics.cost_micros / 1_000_000,
-        })
-    return results
+    query = build_query(resource, column_fields(columns), where=where, date_range=date_range)
+    for row in stream_query(client, customer_id, query, use_cache=False):
+        yield row_to_dict(row, columns)
+
+
+def top_rows(rows: Iterable[dict], n: int, key: str = "impressions") -> list[dict]:
+    """
+    Return the `n` rows with the largest `key`, highest first.
+    Uses a size-n heap, so memory is O(n) however long the stream is —
+    provided `rows` is not buffered upstream (the iter_* readers here bypass
+    the query cache for that reason).
+    """
+    return heapq.nlargest(n, rows, key=lambda r: r[key])
 
 
 # ─── Analysis ────────────────────────────────────────────────
 
-def find_negative_candidates(search_terms: list[dict] | None = None) -> list[dict]:
+def find_negative_candidates(search_terms: Iterable[dict] | ColumnarReport | None = None) -> list[dict]:
     """
     Identify search terms that are wasting budget.
     Rule: 50+ clicks with 0 conversions → candidate for negative keyword.
+    Accepts any iterable of search term dicts or a ColumnarReport (filtered
+    with array operations). By default only the matching terms are fetched,
+    with the click/conversion thresholds pushed into GAQL.
     """
-    if search_terms is None:
-        search_terms = get_search_terms()
-
     min_clicks = get_env_int("MIN_CLICKS_FOR_NEGATIVE", 50)
+    if isinstance(search_terms, ColumnarReport):
+        table = search_terms.where((search_terms["clicks"] >= min_clicks) & (search_terms["conversions"] == 0))
+        table = table.top(len(table), "cost_micros")
+        return [
+            {**term, "reason": f"{term['clicks']} clicks, 0 conversions, ${term['cost']:.2f} wasted"}
+            for term in table.to_records()
+        ]
+    if search_terms is None:
+        search_terms = iter_filtered("search_term_view", NEGATIVE_CANDIDATE_COLUMNS, [
+            predicate("metrics.clicks", ">=", min_clicks),
+            predicate("metrics.conversions", "=", 0),
+        ], date_range="LAST_30_DAYS")
     candidates = []
     for term in search_terms:
         if term["clicks"] >= min_clicks and term["conversions"] == 0:
@@ -140,21 +329,128 @@ def find_negative_candidates(search_terms: list[dict] | None = None) -> list[dic
     return sorted(candidates, key=lambda x: x["cost"], reverse=True)
 
 
-def find_expansion_candidates(search_terms: list[dict] | None = None, keywords: list[dict] | None = None) -> list[dict]:
+def find_seed_matches(search_terms: Iterable[dict] | ColumnarReport | None = None,
+                      live_negatives: list[dict] | None = None) -> dict:
+    """
+    Scan the search term report against the negative seed list and the
+    account's live negatives in one pass.
+
+    Seed phrases are matched as phrase negatives. Every distinct term is
+    tokenized and run through the cached automaton once, so the scan is
+    linear in the report size however many negatives there are. A term that
+    matches several phrases counts toward each of them.
+
+    Args:
+        search_terms: Search term dicts or a ColumnarReport (default: the full
+                      report via get_search_terms_table())
+        live_negatives: get_live_negatives() output (fetched if None)
+
+    Returns:
+        {"phrases": per seed phrase {phrase, live, terms, clicks, impressions,
+                    cost}, sorted by cost,
+         "matches": search terms matching a seed phrase, with "matched" and
+                    "blocked" (also matches a live negative),
+         "scanned": number of search term rows}
+    """
+    if search_terms is None:
+        search_terms = get_search_terms_table()
+    if live_negatives is None:
+        live_negatives = get_live_negatives()
+
+    seeds = list(dict.fromkeys(get_all_negatives()))
+    live = [(n["keyword"], n["match_type"]) for n in live_negatives]
+    matcher = get_negative_matcher([(seed, "PHRASE") for seed in seeds] + live)
+    live_tokens = {tokenize(text) for text, _ in live}
+    n_seeds = len(seeds)
+
+    # Match each distinct term once; ids below n_seeds are seed phrases
+    def classify(term: str) -> tuple[list[int], bool]:
+        hits = matcher.match(term)
+        return [h for h in hits if h < n_seeds], any(h >= n_seeds for h in hits)
+
+    # terms, clicks, impressions, cost_micros, summed exactly in int64
+    totals = np.zeros((n_seeds, 4), dtype=np.int64)
+    matches = []
+
+    if isinstance(search_terms, ColumnarReport):
+        scanned = len(search_terms)
+        vocab = search_terms.vocab["search_term"]
+        codes = search_terms["search_term"]
+        per_code = [classify(term) for term in vocab]
+        pair_code = np.array([c for c, (seed_ids, _) in enumerate(per_code) for _ in seed_ids], dtype=np.int64)
+        pair_seed = np.array([s for seed_ids, _ in per_code for s in seed_ids], dtype=np.int64)
+
+        # Per-term sums, then fanned out to each matched seed phrase
+        columns = [np.ones(scanned, dtype=np.int64), search_terms["clicks"], search_terms["impressions"],
+                   search_terms["cost_micros"]]
+        for j, values in enumerate(columns):
+            per_term = group_sum(codes, values, len(vocab))
+            totals[:, j] = group_sum(pair_seed, per_term[pair_code], n_seeds)
+
+        matched_codes = np.zeros(len(vocab), dtype=bool)
+        matched_codes[pair_code] = True
+        rows = search_terms.where(matched_codes[codes])
+        for term, code in zip(rows.to_records(), rows["search_term"]):
+            seed_ids, blocked = per_code[code]
+            matches.append({**term, "matched": [seeds[s] for s in seed_ids], "blocked": blocked})
+    else:
+        scanned = 0
+        seen: dict[str, tuple[list[int], bool]] = {}
+        for term in search_terms:
+            scanned += 1
+            text = term["search_term"]
+            if text not in seen:
+                seen[text] = classify(text)
+            seed_ids, blocked = seen[text]
+            if not seed_ids:
+                continue
+            totals[seed_ids] += (1, term["clicks"], term["impressions"], record_micros(term))
+            matches.append({**term, "matched": [seeds[s] for s in seed_ids], "blocked": blocked})
+
+    phrases = [
+        {
+            "phrase": seed,
+            "live": tokenize(seed) in live_tokens,
+            "terms": int(totals[i, 0]),
+            "clicks": int(totals[i, 1]),
+            "impressions": int(totals[i, 2]),
+            "cost": to_currency(int(totals[i, 3])),
+        }
+        for i, seed in enumerate(seeds) if totals[i, 0]
+    ]
+    return {
+        "phrases": sorted(phrases, key=lambda p: p["cost"], reverse=True),
+        "matches": sorted(matches, key=lambda m: m["cost"], reverse=True),
+        "scanned": scanned,
+    }
+
+
+def find_expansion_candidates(search_terms: Iterable[dict] | None = None,
+                              keywords: Iterable[dict] | KeywordCoverageIndex | None = None) -> list[dict]:
     """
-    Find converting search terms not already added as exact/phrase match keywords.
+    Find converting search terms not already covered by a live keyword.
+    A term counts as covered when an existing keyword would match it under
+    its own match type, close variants included (see keyword_index.py).
+    Accepts any iterables of dicts or a prebuilt KeywordCoverageIndex. By
+    default only converting search terms and the texts of all live keywords
+    (including ones with no traffic) are fetched.
     """
     if search_terms is None:
-        search_terms = get_search_terms()
+        search_terms = iter_filtered("search_term_view", EXPANSION_CANDIDATE_COLUMNS, [
+            predicate("metrics.conversions", ">", 0),
+        ], date_range="LAST_30_DAYS")
     if keywords is None:
-        keywords = get_keywords()
+        keywords = iter_filtered("ad_group_criterion", KEYWORD_TEXT_COLUMNS, [
+            predicate("ad_group_criterion.type", "=", "KEYWORD"),
+            predicate("ad_group_criterion.negative", "=", False),
+            predicate("ad_group_criterion.status", "!=", "REMOVED"),
+        ])
 
-    # Build set of existing keyword texts (lowered)
-    existing = {kw["keyword"].lower() for kw in keywords}
+    index = keywords if isinstance(keywords, KeywordCoverageIndex) else KeywordCoverageIndex(keywords)
 
     candidates = []
     for term in search_terms:
-        if term["conversions"] > 0 and term["search_term"].lower() not in existing:
+        if term["conversions"] > 0 and not index.is_covered(term["search_term"]):
             candidates.append({
                 **term,
                 "suggested_bid": round(term["avg_cpc"], 2),
@@ -171,7 +467,7 @@ if __name__ == "__main__":
     print("\n═══ SEARCH TERM REPORT ═══")
     terms = get_search_terms()
     if terms:
-        print(tabulate(terms[:20], headers="keys", floatfmt=".2f"))
+        print(tabulate(top_rows(terms, 20), headers="keys", floatfmt=".2f"))
 
     print("\n═══ NEGATIVE KEYWORD CANDIDATES ═══")
     negatives = find_negative_candidates(terms)
@@ -0,0 +1,184 @@
+"""
+Dataset Snapshots
+Lets scheduled jobs reuse each other's fetched datasets instead of every
+job re-querying the same campaign, keyword and negative-keyword data.
+
+A snapshot is a dataset as the planner fetched it, stored as JSON in memory
+(shared by every job in the scheduler process) and on disk under
+SNAPSHOT_DIR (shared across processes, e.g. cron-style CLI runs). Each
+dataset has a freshness policy:
+
+    max_age   seconds a snapshot may be reused
+    same_day  only reuse it on the day it was taken (rolling date ranges
+              like LAST_30_DAYS shift at midnight)
+
+Datasets without a policy are never snapshotted. Fast-moving data gets a
+short max_age (today's spend), and serving status and disapprovals are read
+live by the alert checks rather than through the planner.
+
+Snapshots are keyed by customer ID and stored as JSON, so every reader gets
+its own copy and cannot change what the next job sees, and reading a file
+from the shared directory never runs code. Datasets are plain records
+(dicts, lists, strings and numbers); one that is not JSON-serializable is
+not snapshotted.
+"""
+
+from __future__ import annotations
+import sys, os
+import json
+import threading
+import time
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from google_ads_client import get_customer_id, get_env_bool, on_mutation
+
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "db", "snapshots")
+
+# Dataset name → freshness policy. The search term reports are left out:
+# they have no row limit, and a snapshot would hold a second full copy of
+# them in memory and on disk for every job
+SNAPSHOT_POLICIES = {
+    "ad_performance": {"max_age": 12 * 3600, "same_day": True},
+    "daily_performance_7d": {"max_age": 12 * 3600, "same_day": True},
+    "account_summary_7d": {"max_age": 12 * 3600, "same_day": True},
+    "account_summary_30d": {"max_age": 12 * 3600, "same_day": True},
+    "keywords": {"max_age": 6 * 3600, "same_day": False},
+    "live_negatives": {"max_age": 6 * 3600, "same_day": False},
+    # Today's spend moves all day
+    "account_summary_today": {"max_age": 300, "same_day": True},
+    "budget_status": {"max_age": 300, "same_day": True},
+}
+
+_lock = threading.Lock()
+# (customer ID, dataset) → (saved at, JSON-encoded value)
+_memory: dict[tuple[str, str], tuple[float, bytes]] = {}
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale": 0}
+
+
+def snapshots_enabled() -> bool:
+    return get_env_bool("USE_SNAPSHOTS", True)
+
+
+def _snapshot_path(customer_id: str, name: str) -> str:
+    return os.path.join(os.getenv("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR), customer_id, f"{name}.json")
+
+
+def _is_fresh(policy: dict, saved_at: float) -> bool:
+    if time.time() - saved_at > policy["max_age"]:
+        return False
+    return not policy["same_day"] or date.fromtimestamp(saved_at) == date.today()
+
+
+def get_snapshot(name: str) -> tuple[object, float] | None:
+    """
+    Return (value, age in seconds) of a fresh snapshot of `name`, checking
+    memory first and then disk, or None if there is no usable snapshot.
+    """
+    policy = SNAPSHOT_POLICIES.get(name)
+    if policy is None or not snapshots_enabled():
+        return None
+    key = (get_customer_id(), name)
+
+    with _lock:
+        entry = _memory.get(key)
+    if entry is not None and _is_fresh(policy, entry[0]):
+        source = "memory_hits"
+    else:
+        # Another process may have fetched it since
+        entry = _read_disk(*key)
+        source = "disk_hits"
+
+    with _lock:
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        if not _is_fresh(policy, entry[0]):
+            _stats["stale"] += 1
+            return None
+        _stats[source] += 1
+        _memory[key] = entry
+    return json.loads(entry[1]), time.time() - entry[0]
+
+
+def put_snapshot(name: str, value):
+    """Store a freshly fetched dataset in memory and on disk (if it has a policy)."""
+    if name not in SNAPSHOT_POLICIES or not snapshots_enabled():
+        return
+    key = (get_customer_id(), name)
+    try:
+        entry = (time.time(), json.dumps(value).encode("utf-8"))
+    except (TypeError, ValueError) as e:
+        print(f"  ⚠️ Could not snapshot {name}: {e}")
+        return
+    with _lock:
+        _memory[key] = entry
+    _write_disk(*key, entry)
+
+
+def invalidate_snapshots(name: str | None = None, customer_id: str | None = None):
+    """
+    Drop snapshots of one dataset, or all of them, from memory and disk.
+    Runs after every mutate() through the on_mutation hook below; call it
+    directly, alongside invalidate_query_cache(), after changes made
+    through service methods instead (e.g. rollbacks).
+
+    Args:
+        name: Dataset to drop; None drops every dataset
+        customer_id: Account whose snapshots to drop (default: the configured one)
+    """
+    names = [name] if name else list(SNAPSHOT_POLICIES)
+    customer_id = customer_id or get_customer_id()
+    with _lock:
+        for n in names:
+            _memory.pop((customer_id, n), None)
+    for n in names:
+        try:
+            os.remove(_snapshot_path(customer_id, n))
+        except FileNotFoundError:
+            pass
+
+
+def _invalidate_after_mutation(customer_id: str):
+    invalidate_snapshots(customer_id=customer_id)
+
+
+on_mutation(_invalidate_after_mutation)
+
+
+def get_snapshot_stats() -> dict:
+    """Return hit/miss counters and the number of snapshots held in memory."""
+    with _lock:
+        return {**_stats, "entries": len(_memory)}
+
+
+def reset_snapshot_stats():
+    """Zero the counters without dropping snapshots."""
+    with _lock:
+        for k in _stats:
+            _stats[k] = 0
+
+
+def _read_disk(customer_id: str, name: str) -> tuple[float, bytes] | None:
+    path = _snapshot_path(customer_id, name)
+    try:
+        with open(path, "rb") as f:
+            payload = f.read()
+        return os.path.getmtime(path), payload
+    except OSError:
+        return None
+
+
+def _write_disk(customer_id: str, name: str, entry: tuple[float, bytes]):
+    path = _snapshot_path(customer_id, name)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(entry[1])
+        os.utime(tmp, (entry[0], entry[0]))
+        # Atomic, so a reader in another process never sees half a file
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"  ⚠️ Could not save {name} snapshot: {e}")
@@ -0,0 +1,249 @@
+"""
+Metrics Warehouse Sync
+Incrementally copy daily-segmented campaign, ad group, keyword, and search
+term metrics into the local warehouse (db/metrics.db), and serve completed
+date ranges back to the reporting skills without touching the API.
+"""
+
+from __future__ import annotations
+import sys, os
+from datetime import date, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from google_ads_client import get_client, get_customer_id, stream_query, get_env_int, get_env_bool
+from db import warehouse
+from skills.data_gathering.aggregate import finish, new_totals
+
+
+# ─── GAQL Queries ────────────────────────────────────────────
+
+WAREHOUSE_QUERIES = {
+    "campaign_daily": """
+        SELECT
+            segments.date,
+            campaign.id,
+            campaign.name,
+            campaign.status,
+            campaign.bidding_strategy_type,
+            campaign_budget.amount_micros,
+            metrics.impressions,
+            metrics.clicks,
+            metrics.conversions,
+            metrics.cost_micros,
+            metrics.all_conversions_value
+        FROM campaign
+        WHERE segments.date BETWEEN '{start}' AND '{end}'
+            AND campaign.status != 'REMOVED'
+    """,
+    "ad_group_daily": """
+        SELECT
+            segments.date,
+            campaign.name,
+            ad_group.id,
+            ad_group.name,
+            ad_group.status,
+            metrics.impressions,
+            metrics.clicks,
+            metrics.conversions,
+            metrics.cost_micros
+        FROM ad_group
+        WHERE segments.date BETWEEN '{start}' AND '{end}'
+            AND ad_group.status != 'REMOVED'
+    """,
+    "keyword_daily": """
+        SELECT
+            segments.date,
+            campaign.name,
+            ad_group.id,
+            ad_group.name,
+            ad_group_criterion.criterion_id,
+            ad_group_criterion.keyword.text,
+            ad_group_criterion.keyword.match_type,
+            metrics.impressions,
+            metrics.clicks,
+            metrics.conversions,
+            metrics.cost_micros
+        FROM keyword_view
+        WHERE segments.date BETWEEN '{start}' AND '{end}'
+            AND ad_group_criterion.status != 'REMOVED'
+    """,
+    "search_term_daily": """
+        SELECT
+            segments.date,
+            campaign.name,
+            ad_group.id,
+            ad_group.name,
+            search_term_view.search_term,
+            metrics.impressions,
+            metrics.clicks,
+            metrics.conversions,
+            metrics.cost_micros
+        FROM search_term_view
+        WHERE segments.date BETWEEN '{start}' AND '{end}'
+            AND metrics.impressions > 0
+    """,
+}
+
+
+def _row_tuple(table: str, row) -> tuple:
+    """Flatten a GoogleAdsRow into the warehouse column order for `table`."""
+    m = row.metrics
+    if table == "campaign_daily":
+        return (row.segments.date, row.campaign.id, row.campaign.name, row.campaign.status.name,
+                row.campaign.bidding_strategy_type.name, row.campaign_budget.amount_micros,
+                m.impressions, m.clicks, m.conversions, m.cost_micros, m.all_conversions_value)
+    if table == "ad_group_daily":
+        return (row.segments.date, row.ad_group.id, row.campaign.name, row.ad_group.name,
+                row.ad_group.status.name, m.impressions, m.clicks, m.conversions, m.cost_micros)
+    if table == "keyword_daily":
+        kw = row.ad_group_criterion
+        return (row.segments.date, row.ad_group.id, kw.criterion_id, row.campaign.name, row.ad_group.name,
+                kw.keyword.text, kw.keyword.match_type.name,
+                m.impressions, m.clicks, m.conversions, m.cost_micros)
+    return (row.segments.date, row.ad_group.id, row.search_term_view.search_term, row.campaign.name,
+            row.ad_group.name, m.impressions, m.clicks, m.conversions, m.cost_micros)
+
+
+# ─── Sync ────────────────────────────────────────────────────
+
+def sync_warehouse(tables: list[str] | None = None, today: date | None = None) -> dict:
+    """
+    Bring the warehouse up to date through yesterday.
+
+    Each table is fetched only from its watermark minus a restatement window
+    (WAREHOUSE_RESTATEMENT_DAYS, default 3) so late conversions are picked
+    up. A table that was never synced backfills WAREHOUSE_INITIAL_DAYS
+    (default 90). Today is never stored because it is still changing.
+
+    Returns:
+        {table: {"start", "end", "rows"}} for every table that was synced.
+    """
+    today = today or date.today()
+    end = today - timedelta(days=1)
+    restatement = get_env_int("WAREHOUSE_RESTATEMENT_DAYS", 3)
+    initial_days = get_env_int("WAREHOUSE_INITIAL_DAYS", 90)
+
+    client = get_client()
+    customer_id = get_customer_id()
+    results = {}
+    for table in tables or list(WAREHOUSE_QUERIES):
+        state = warehouse.get_sync_state(table)
+        if state:
+            start = date.fromisoformat(state["watermark"]) - timedelta(days=restatement - 1)
+        else:
+            start = today - timedelta(days=initial_days)
+        if start > end:
+            continue
+
+        query = WAREHOUSE_QUERIES[table].format(start=start.isoformat(), end=end.isoformat())
+        # Plain tuples, fetched before replace_days() takes the write lock
+        rows = [_row_tuple(table, r) for r in stream_query(client, customer_id, query, use_cache=False)]
+        count = warehouse.replace_days(table, start.isoformat(), end.isoformat(), rows)
+        warehouse.set_sync_state(table, start.isoformat(), end.isoformat())
+        results[table] = {"start": start.isoformat(), "end": end.isoformat(), "rows": count}
+    return results
+
+
+# ─── Reads ───────────────────────────────────────────────────
+
+def resolve_date_range(date_range: str, today: date | None = None) -> tuple[str, str] | None:
+    """
+    Translate a GAQL date range into (start, end) ISO dates.
+    Returns None for ranges that include today, which the warehouse never holds.
+    """
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    if date_range == "YESTERDAY":
+        return yesterday.isoformat(), yesterday.isoformat()
+    if date_range.startswith("LAST_") and date_range.endswith("_DAYS"):
+        days = int(date_range[len("LAST_"):-len("_DAYS")])
+        return (today - timedelta(days=days)).isoformat(), yesterday.isoformat()
+    if date_range == "LAST_MONTH":
+        last_day = today.replace(day=1) - timedelta(days=1)
+        return last_day.replace(day=1).isoformat(), last_day.isoformat()
+    return None
+
+
+def _warehouse_window(table: str, date_range: str) -> tuple[str, str] | None:
+    """Return the (start, end) window if the warehouse can serve it."""
+    if not get_env_bool("USE_METRICS_WAREHOUSE", False):
+        return None
+    window = resolve_date_range(date_range)
+    if window and warehouse.covers(table, *window):
+        return window
+    return None
+
+
+def read_campaign_performance(date_range: str) -> list[dict] | None:
+    """
+    Campaign performance in the same shape as performance.get_campaign_performance,
+    or None if the warehouse is disabled or does not cover the range.
+    """
+    window = _warehouse_window("campaign_daily", date_range)
+    if window is None:
+        return None
+
+    results = []
+    for c in warehouse.get_campaign_totals(*window):
+        cost = c["cost_micros"] / 1_000_000
+        clicks = c["clicks"]
+        conversions = c["conversions"]
+        conv_value = c["conversion_value"] or 0
+        results.append({
+            "campaign_id": c["campaign_id"],
+            "campaign": c["campaign"],
+            "status": c["status"],
+            "bidding_strategy": c["bidding_strategy"],
+            "daily_budget": (c["budget_micros"] or 0) / 1_000_000,
+            "impressions": c["impressions"],
+            "clicks": clicks,
+            "ctr": round((clicks / c["impressions"] * 100) if c["impressions"] else 0, 2),
+            "avg_cpc": cost / clicks if clicks else 0,
+            "conversions": conversions,
+            "cpa": cost / conversions if conversions else 0,
+            "conversion_rate": round((conversions / clicks * 100) if clicks else 0, 2),
+            "cost": cost,
+            "cost_micros": c["cost_micros"],
+            "conversion_value": conv_value,
+            "roas": round(conv_value / cost, 2) if cost > 0 else 0,
+        })
+    return results
+
+
+def daily_record(day: str, totals: dict) -> dict:
+    """One performance.get_daily_performance() row from a day's totals (see aggregate.py)."""
+    f = finish(totals)
+    return {
+        "date": day,
+        "impressions": f["impressions"],
+        "clicks": f["clicks"],
+        "ctr": f["ctr"],
+        "avg_cpc": f["avg_cpc"],
+        "conversions": f["conversions"],
+        "cpa": f["cpa"],
+        "cost": f["cost"],
+    }
+
+
+def read_daily_performance(date_range: str) -> list[dict] | None:
+    """
+    Daily account totals in the same shape as performance.get_daily_performance,
+    or None if the warehouse is disabled or does not cover the range.
+    """
+    window = _warehouse_window("campaign_daily", date_range)
+    if window is None:
+        return None
+
+    return [daily_record(d["date"], {**new_totals(), **d}) for d in warehouse.get_daily_totals(*window)]
+
+
+# ─── CLI ─────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    print("\n═══ WAREHOUSE SYNC ═══")
+    synced = sync_warehouse()
+    if synced:
+        for table, info in synced.items():
+            print(f"  {table}: {info['rows']} rows ({info['start']} → {info['end']})")
+    else:
+        print("  Already up to date")
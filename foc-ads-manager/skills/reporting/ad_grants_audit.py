@@ -0,0 +1,199 @@
+"""
+Ad Grants Compliance Audit — READ-ONLY
+Checks the whole account against the Google Ad Grants rules in
+foc_config/ad_grants.py in one batch pass: keyword rules for every keyword,
+plus the structural rules (ad groups per campaign, ads per ad group, geo
+targeting, conversion tracking, account CTR).
+
+The account structure comes from a handful of lean GAQL queries run
+concurrently; everything else is counted locally.
+"""
+
+from __future__ import annotations
+import sys, os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from skills.data_gathering.query_builder import predicate, micros
+from skills.data_gathering.search_terms import iter_filtered
+from skills.data_gathering.performance import get_account_ctr
+from foc_config.ad_grants import (
+    get_compliance_settings, check_keyword_compliance, check_ctr_compliance,
+    MIN_AD_GROUPS_PER_CAMPAIGN, MIN_ADS_PER_AD_GROUP, SMART_BIDDING_STRATEGIES,
+)
+
+
+ENABLED_CAMPAIGN = predicate("campaign.status", "=", "ENABLED")
+ENABLED_AD_GROUP = predicate("ad_group.status", "=", "ENABLED")
+
+# Structure queries: name → (resource, columns, where)
+AUDIT_QUERIES = {
+    "campaigns": ("campaign", {
+        "campaign_id": "campaign.id",
+        "campaign": "campaign.name",
+        "bidding_strategy": "campaign.bidding_strategy_type",
+    }, [ENABLED_CAMPAIGN]),
+    "ad_groups": ("ad_group", {
+        "campaign_id": "campaign.id",
+        "ad_group_id": "ad_group.id",
+        "ad_group": "ad_group.name",
+    }, [ENABLED_CAMPAIGN, ENABLED_AD_GROUP]),
+    "ads": ("ad_group_ad", {
+        "ad_group_id": "ad_group.id",
+    }, [ENABLED_CAMPAIGN, ENABLED_AD_GROUP, predicate("ad_group_ad.status", "=", "ENABLED")]),
+    "geo_targets": ("campaign_criterion", {
+        "campaign_id": "campaign.id",
+    }, [
+        ENABLED_CAMPAIGN,
+        predicate("campaign_criterion.type", "IN", ["LOCATION", "PROXIMITY"]),
+        predicate("campaign_criterion.negative", "=", False),
+    ]),
+    "keywords": ("ad_group_criterion", {
+        "campaign_id": "campaign.id",
+        "campaign": "campaign.name",
+        "ad_group": "ad_group.name",
+        "keyword": "ad_group_criterion.keyword.text",
+        "match_type": "ad_group_criterion.keyword.match_type",
+        "bid": ("ad_group_criterion.effective_cpc_bid_micros", micros),
+    }, [
+        ENABLED_CAMPAIGN,
+        ENABLED_AD_GROUP,
+        predicate("ad_group_criterion.type", "=", "KEYWORD"),
+        predicate("ad_group_criterion.negative", "=", False),
+        predicate("ad_group_criterion.status", "=", "ENABLED"),
+    ]),
+    "conversion_actions": ("conversion_action", {
+        "conversion_action_id": "conversion_action.id",
+    }, [predicate("conversion_action.status", "=", "ENABLED")]),
+}
+
+
+def fetch_account_structure() -> dict[str, list[dict]]:
+    """Run every structure query concurrently and return {name: rows}."""
+    def fetch(name):
+        resource, columns, where = AUDIT_QUERIES[name]
+        return list(iter_filtered(resource, columns, where))
+
+    with ThreadPoolExecutor(max_workers=len(AUDIT_QUERIES), thread_name_prefix="audit") as pool:
+        futures = {name: pool.submit(fetch, name) for name in AUDIT_QUERIES}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def audit_account(structure: dict[str, list[dict]] | None = None, account_ctr: float | None = None) -> dict:
+    """
+    Audit the account against every Ad Grants rule.
+
+    Args:
+        structure: fetch_account_structure() output (fetched if None)
+        account_ctr: Last-30-day account CTR in percent (fetched if None)
+
+    Returns:
+        {"compliant": bool,
+         "issues": [{rule, level, campaign, ad_group, keyword, message}],
+         "summary": {rule: issue count},
+         "counts": {campaigns, ad_groups, ads, keywords}}
+    """
+    if structure is None:
+        structure = fetch_account_structure()
+    if account_ctr is None:
+        account_ctr = get_account_ctr("LAST_30_DAYS")
+    settings = {**get_compliance_settings(), "enabled": True}
+
+    campaigns = {c["campaign_id"]: c for c in structure["campaigns"]}
+    ad_groups = structure["ad_groups"]
+    ad_groups_per_campaign = Counter(g["campaign_id"] for g in ad_groups)
+    ads_per_ad_group = Counter(a["ad_group_id"] for a in structure["ads"])
+    geo_targeted = {g["campaign_id"] for g in structure["geo_targets"]}
+    smart_bidding = {cid for cid, c in campaigns.items() if c["bidding_strategy"] in SMART_BIDDING_STRATEGIES}
+
+    issues = []
+
+    def issue(rule, level, message, campaign="", ad_group="", keyword=""):
+        issues.append({"rule": rule, "level": level, "campaign": campaign,
+                       "ad_group": ad_group, "keyword": keyword, "message": message})
+
+    # Account-level rules
+    ctr = check_ctr_compliance(account_ctr)
+    if ctr["status"] != "SAFE":
+        issue("min_ctr", ctr["status"], ctr["message"], campaign="ALL")
+    if not structure["conversion_actions"]:
+        issue("conversion_tracking", "CRITICAL", "No enabled conversion actions — Ad Grants requires conversion tracking",
+              campaign="ALL")
+
+    # Campaign / ad group structure
+    for cid, c in campaigns.items():
+        n_groups = ad_groups_per_campaign.get(cid, 0)
+        if n_groups < MIN_AD_GROUPS_PER_CAMPAIGN:
+            issue("min_ad_groups", "WARNING",
+                  f"{n_groups} enabled ad group(s) — need at least {MIN_AD_GROUPS_PER_CAMPAIGN}", campaign=c["campaign"])
+        if cid not in geo_targeted:
+            issue("geo_targeting", "CRITICAL", "No location targeting set", campaign=c["campaign"])
+
+    for g in ad_groups:
+        n_ads = ads_per_ad_group.get(g["ad_group_id"], 0)
+        if n_ads < MIN_ADS_PER_AD_GROUP:
+            campaign = campaigns.get(g["campaign_id"], {}).get("campaign", "")
+            issue("min_ads", "WARNING", f"{n_ads} enabled ad(s) — need at least {MIN_ADS_PER_AD_GROUP}",
+                  campaign=campaign, ad_group=g["ad_group"])
+
+    # Keyword rules, with settings read once for the whole batch
+    for kw in structure["keywords"]:
+        # Smart bidding campaigns are exempt from the CPC cap
+        bid = 0.0 if kw["campaign_id"] in smart_bidding else kw["bid"]
+        result = check_keyword_compliance(kw["keyword"], bid, kw["match_type"], settings)
+        for rule, message in zip(result["rules"], result["issues"]):
+            issue(rule, "WARNING", message, campaign=kw["campaign"], ad_group=kw["ad_group"], keyword=kw["keyword"])
+
+    return {
+        "compliant": not any(i["level"] == "CRITICAL" for i in issues),
+        "issues": issues,
+        "summary": dict(Counter(i["rule"] for i in issues)),
+        "counts": {
+            "campaigns": len(campaigns),
+            "ad_groups": len(ad_groups),
+            "ads": len(structure["ads"]),
+            "keywords": len(structure["keywords"]),
+        },
+    }
+
+
+def format_report(audit: dict | None = None, max_per_rule: int = 5) -> str:
+    """Format an audit as a readable report, grouped by rule."""
+    if audit is None:
+        audit = audit_account()
+
+    counts = audit["counts"]
+    lines = [
+        "═══ AD GRANTS COMPLIANCE AUDIT ═══",
+        f"Checked {counts['campaigns']} campaigns, {counts['ad_groups']} ad groups, "
+        f"{counts['ads']} ads, {counts['keywords']} keywords\n",
+    ]
+
+    if not audit["issues"]:
+        lines.append("✅ Fully compliant — no issues found.")
+        return "\n".join(lines)
+
+    lines.append("🔴 NOT COMPLIANT — critical issues found\n" if not audit["compliant"]
+                 else "🟡 Compliant, with warnings\n")
+
+    by_rule: dict[str, list[dict]] = {}
+    for i in audit["issues"]:
+        by_rule.setdefault(i["rule"], []).append(i)
+
+    for rule, rule_issues in sorted(by_rule.items(), key=lambda kv: (kv[1][0]["level"] != "CRITICAL", -len(kv[1]))):
+        lines.append(f"{rule} ({len(rule_issues)}):")
+        for i in rule_issues[:max_per_rule]:
+            where = " / ".join(part for part in (i["campaign"], i["ad_group"], i["keyword"]) if part)
+            lines.append(f"  • [{i['level']}] {where}: {i['message']}")
+        if len(rule_issues) > max_per_rule:
+            lines.append(f"  … and {len(rule_issues) - max_per_rule} more")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+# ─── CLI ─────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    print(format_report())
@@ -1,16 +1,23 @@
 """
 Real-Time Alerts
-Monitor for anomalies: CPA spikes, budget exhaustion, campaign errors, disapproved ads.
+Monitor for anomalies: CPA spikes, budget exhaustion, campaign errors, disapproved ads,
+and unusual daily spend / CPA / CTR per campaign (skills/data_gathering/anomaly.py).
 """
 
 from __future__ import annotations
 import sys, os
+import time
+import queue
+import threading
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from google_ads_client import get_client, get_customer_id, run_query, get_env_float, get_env_bool
-from skills.data_gathering.performance import get_account_summary
+from skills.data_gathering.performance import get_account_summary, get_account_ctr
 from skills.data_gathering.budget import get_budget_alerts, check_spend_cap
-from db import log_alert
+from skills.data_gathering.anomaly import update_anomaly_state, get_anomalies
+from skills.reporting.daily_summary import send_report
+from db import log_alerts
+from db.alert_state import claim_notifications, release_notifications
 
 
 # ─── GAQL for disapproved ads ───────────────────────────────
@@ -28,6 +35,7 @@ DISAPPROVED_ADS_QUERY = """
 
 CAMPAIGN_ERRORS_QUERY = """
     SELECT
+        campaign.id,
         campaign.name,
         campaign.status,
         campaign.serving_status
@@ -37,146 +45,314 @@ CAMPAIGN_ERRORS_QUERY = """
 """
 
 
-def check_all_alerts() -> list[dict]:
+# Datasets this skill reads (see skills/data_gathering/planner.py)
+REQUIRED_DATASETS = ("budget_status", "account_summary_7d")
+
+
+# Alert categories each check can raise; a check that completes resolves
+# its categories' open alerts that it no longer reports
+CHECK_CATEGORIES = {
+    "budget": {"budget_pacing", "spend_cap"},
+    "cpa_spike": {"cpa_spike"},
+    "disapproved_ads": {"disapproved_ad"},
+    "campaign_errors": {"campaign_error"},
+    "ad_grants_ctr": {"ad_grants"},
+    "anomalies": {"anomaly"},
+}
+
+# Metric → (label, value format) for anomaly alerts
+ANOMALY_LABELS = {
+    "spend": ("Spend", "${:.2f}"),
+    "cpa": ("CPA", "${:.2f}"),
+    "ctr": ("CTR", "{:.2f}%"),
+}
+
+# Latency (seconds) and outcome of each check in the most recent run
+LAST_CHECK_TIMINGS: dict[str, dict] = {}
+
+
+def check_all_alerts(data: dict | None = None) -> tuple[list[dict], list[dict]]:
     """
-    Run all alert checks and return a list of triggered alerts.
-    Each alert has: level, category, campaign, message.
+    Run all alert checks concurrently and return the triggered alerts and
+    the alert rows this run resolved.
+    Each alert has: level, category, campaign, message, plus its state
+    from db/alert_state.py — "transition" is opened / escalated (notify)
+    or repeated / suppressed (already known). Transitions are sent by
+    notify_alert_changes(), whichever job recorded them.
+
+    Checks run on their own threads so the whole pass takes about one API
+    round trip. A check that raises or exceeds ALERT_CHECK_TIMEOUT seconds
+    (default 60) becomes an ERROR alert without affecting the others.
+    Alert state is updated in a single transaction.
+
+    Args:
+        data: Optional datasets prefetched by the planner; anything missing
+              is fetched by the individual check.
     """
-    alerts = []
+    data = data or {}
+    checks = {
+        "budget": lambda: get_budget_alerts(data.get("budget_status")),
+        "cpa_spike": lambda: _check_cpa_spikes(data.get("account_summary_7d")),
+        "disapproved_ads": _check_disapproved_ads,
+        "campaign_errors": _check_campaign_errors,
+    }
+    if get_env_bool("AD_GRANTS_MODE", False):
+        checks["ad_grants_ctr"] = lambda: _check_ad_grants_ctr(data.get("account_summary_30d"))
+    if get_env_bool("ANOMALY_DETECTION", True):
+        checks["anomalies"] = _check_anomalies
 
-    # 1. Budget alerts
-    alerts.extend(get_budget_alerts())
+    timeout = get_env_float("ALERT_CHECK_TIMEOUT", 60.0)
+    started = time.perf_counter()
+    outcomes = _run_checks(checks, timeout)
 
-    # 2. CPA spike detection
-    alerts.extend(_check_cpa_spikes())
+    alerts = []
+    completed: set[str] = {"system"}
+    LAST_CHECK_TIMINGS.clear()
+    for name in checks:
+        if name not in outcomes:
+            LAST_CHECK_TIMINGS[name] = {"seconds": time.perf_counter() - started, "status": "timeout"}
+            alerts.append({
+                "level": "ERROR",
+                "category": "system",
+                "campaign": "",
+                "key": f"check:{name}",
+                "message": f"Alert check '{name}' timed out after {timeout:g}s",
+            })
+            continue
+        check_alerts, error, seconds = outcomes[name]
+        if error is not None:
+            LAST_CHECK_TIMINGS[name] = {"seconds": seconds, "status": "error"}
+            alerts.append({
+                "level": "ERROR",
+                "category": "system",
+                "campaign": "",
+                "key": f"check:{name}",
+                "message": f"Alert check '{name}' failed: {error}",
+            })
+            continue
+        LAST_CHECK_TIMINGS[name] = {"seconds": seconds, "status": "ok"}
+        alerts.extend(check_alerts)
+        completed |= CHECK_CATEGORIES.get(name, set())
 
-    # 3. Disapproved ads
-    alerts.extend(_check_disapproved_ads())
+    # Only checks that completed may resolve their categories' alerts
+    result = log_alerts(alerts, resolve_categories=completed)
 
-    # 4. Campaign serving errors
-    alerts.extend(_check_campaign_errors())
+    return alerts, result["resolved"]
 
-    # 5. Ad Grants CTR warning
-    if get_env_bool("AD_GRANTS_MODE", False):
-        alerts.extend(_check_ad_grants_ctr())
 
-    # Log all alerts
-    for a in alerts:
-        log_alert(a["level"], a["category"], a["message"], a.get("campaign", ""))
+def notify_alert_changes() -> int:
+    """
+    Send every alert transition not yet notified (see
+    db/alert_state.claim_notifications). A failed send leaves them pending
+    for the next call.
 
-    return alerts
+    Returns:
+        Number of transitions sent.
+    """
+    rows = claim_notifications()
+    changes = format_transitions(rows)
+    if not changes:
+        return 0
+    try:
+        send_report(changes)
+    except Exception:
+        release_notifications([r["id"] for r in rows])
+        raise
+    return len(rows)
 
 
-def _check_cpa_spikes() -> list[dict]:
-    """Check if CPA has spiked above target."""
+def format_transitions(alerts: list[dict]) -> str:
+    """
+    Notification text for alerts that changed state (transition opened,
+    escalated or resolved). Returns "" when nothing changed.
+    """
+    resolved = [a for a in alerts if a.get("transition") == "resolved"]
+    changed = [a for a in alerts if a.get("transition") in ("opened", "escalated")]
+    if not changed and not resolved:
+        return ""
+
+    lines = ["═══ ALERT CHANGES ═══"]
+    for a in changed:
+        icon = {"CRITICAL": "🔴", "WARNING": "🟡", "INFO": "🔵", "ERROR": "⚫"}.get(a["level"], "⚪")
+        tag = "ESCALATED" if a["transition"] == "escalated" else "NEW"
+        lines.append(f"  {icon} [{tag}] #{a['id']} {a.get('campaign', '')}: {a['message']}")
+    for r in resolved:
+        lines.append(f"  ✅ [RESOLVED] #{r['id']} {r.get('campaign', '')}: {r['message']}")
+    return "\n".join(lines)
+
+
+def _run_checks(checks: dict, timeout: float) -> dict[str, tuple]:
+    """
+    Run each check on its own daemon thread and collect what finishes
+    within `timeout` seconds. A hung check is abandoned: being a daemon
+    thread, it cannot hold up interpreter exit.
+
+    Returns:
+        {name: (alerts, exception or None, seconds)} for the checks that finished
+    """
+    results: queue.Queue = queue.Queue()
+
+    def run(name, fn):
+        start = time.perf_counter()
+        try:
+            results.put((name, fn(), None, time.perf_counter() - start))
+        except Exception as e:
+            results.put((name, None, e, time.perf_counter() - start))
+
+    for name, fn in checks.items():
+        threading.Thread(target=run, args=(name, fn), name=f"alert-check-{name}", daemon=True).start()
+
+    outcomes = {}
+    deadline = time.monotonic() + timeout
+    while len(outcomes) < len(checks):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            name, check_alerts, error, seconds = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+        outcomes[name] = (check_alerts, error, seconds)
+    return outcomes
+
+
+def format_check_timings(timings: dict[str, dict] | None = None) -> str:
+    """Format per-check latency from the last run, slowest first."""
+    timings = LAST_CHECK_TIMINGS if timings is None else timings
+    parts = [
+        f"{name} {t['seconds']:.2f}s" + ("" if t["status"] == "ok" else f" ({t['status']})")
+        for name, t in sorted(timings.items(), key=lambda kv: kv[1]["seconds"], reverse=True)
+    ]
+    return ", ".join(parts)
+
+
+def _check_cpa_spikes(summary: dict | None = None) -> list[dict]:
+    """Check if CPA has spiked above target. Errors are reported by check_all_alerts."""
     alerts = []
     target_cpa = get_env_float("TARGET_CPA", 25.0)
 
-    try:
+    if summary is None:
         summary = get_account_summary("LAST_7_DAYS")
-        cpa = summary["overall_cpa"]
+    cpa = summary["overall_cpa"]
 
-        if cpa > target_cpa * 2:
-            alerts.append({
-                "level": "CRITICAL",
-                "category": "cpa_spike",
-                "campaign": "ALL",
-                "message": f"CPA at ${cpa:.2f} — 2x above target ${target_cpa:.2f}! Immediate review needed.",
-            })
-        elif cpa > target_cpa * 1.5:
+    if cpa > target_cpa * 2:
+        alerts.append({
+            "level": "CRITICAL",
+            "category": "cpa_spike",
+            "campaign": "ALL",
+            "key": "account_cpa",
+            "message": f"CPA at ${cpa:.2f} — 2x above target ${target_cpa:.2f}! Immediate review needed.",
+        })
+    elif cpa > target_cpa * 1.5:
+        alerts.append({
+            "level": "WARNING",
+            "category": "cpa_spike",
+            "campaign": "ALL",
+            "key": "account_cpa",
+            "message": f"CPA at ${cpa:.2f} — 50% above target ${target_cpa:.2f}.",
+        })
+
+    # Check per-campaign spikes
+    for camp in summary.get("campaigns", []):
+        if camp["conversions"] > 0 and camp["cpa"] > target_cpa * 2:
             alerts.append({
                 "level": "WARNING",
                 "category": "cpa_spike",
-                "campaign": "ALL",
-                "message": f"CPA at ${cpa:.2f} — 50% above target ${target_cpa:.2f}.",
+                "campaign": camp["campaign"],
+                "key": f"campaign:{camp.get('campaign_id', camp['campaign'])}",
+                "message": f"Campaign CPA at ${camp['cpa']:.2f} — review keywords and bids.",
             })
 
-        # Check per-campaign spikes
-        for camp in summary.get("campaigns", []):
-            if camp["conversions"] > 0 and camp["cpa"] > target_cpa * 2:
-                alerts.append({
-                    "level": "WARNING",
-                    "category": "cpa_spike",
-                    "campaign": camp["campaign"],
-                    "message": f"Campaign CPA at ${camp['cpa']:.2f} — review keywords and bids.",
-                })
-    except Exception as e:
+    return alerts
+
+
+def _check_anomalies() -> list[dict]:
+    """
+    Fold any new days into the streaming baselines and alert on the latest
+    settled day's anomalous series. Errors are reported by check_all_alerts.
+    """
+    threshold = get_env_float("ANOMALY_Z_THRESHOLD", 3.0)
+    update_anomaly_state()
+
+    alerts = []
+    for a in get_anomalies(threshold=threshold):
+        label, fmt = ANOMALY_LABELS[a["metric"]]
+        direction = "above" if a["score"] > 0 else "below"
         alerts.append({
-            "level": "ERROR",
-            "category": "system",
-            "message": f"Failed to check CPA: {e}",
+            "level": "CRITICAL" if abs(a["score"]) >= threshold + 2 else "WARNING",
+            "category": "anomaly",
+            "campaign": a["campaign"],
+            "key": f"{a['metric']}:{direction}",
+            "message": f"{label} {direction} normal on {a['date']}: {fmt.format(a['value'])} vs "
+                       f"{fmt.format(a['expected'])} expected (z={a['score']:+.1f})",
         })
-
     return alerts
 
 
 def _check_disapproved_ads() -> list[dict]:
-    """Check for disapproved ads."""
+    """Check for disapproved ads. Errors are reported by check_all_alerts."""
     alerts = []
-    try:
-        client = get_client()
-        customer_id = get_customer_id()
-        rows = run_query(client, customer_id, DISAPPROVED_ADS_QUERY)
+    client = get_client()
+    customer_id = get_customer_id()
+    rows = run_query(client, customer_id, DISAPPROVED_ADS_QUERY)
 
-        for row in rows:
-            alerts.append({
-                "level": "WARNING",
-                "category": "disapproved_ad",
-                "campaign": row.campaign.name,
-                "message": f"Ad {row.ad_group_ad.ad.id} in '{row.ad_group.name}' is {row.ad_group_ad.policy_summary.approval_status.name}",
-            })
-    except Exception:
-        pass  # Don't error on alert checks
+    for row in rows:
+        alerts.append({
+            "level": "WARNING",
+            "category": "disapproved_ad",
+            "campaign": row.campaign.name,
+            "key": f"ad:{row.ad_group_ad.ad.id}",
+            "message": f"Ad {row.ad_group_ad.ad.id} in '{row.ad_group.name}' is {row.ad_group_ad.policy_summary.approval_status.name}",
+        })
 
     return alerts
 
 
 def _check_campaign_errors() -> list[dict]:
-    """Check for campaigns not serving."""
+    """Check for campaigns not serving. Errors are reported by check_all_alerts."""
     alerts = []
-    try:
-        client = get_client()
-        customer_id = get_customer_id()
-        rows = run_query(client, customer_id, CAMPAIGN_ERRORS_QUERY)
+    client = get_client()
+    customer_id = get_customer_id()
+    rows = run_query(client, customer_id, CAMPAIGN_ERRORS_QUERY)
 
-        for row in rows:
-            alerts.append({
-                "level": "WARNING",
-                "category": "campaign_error",
-                "campaign": row.campaign.name,
-                "message": f"Campaign '{row.campaign.name}' is ENABLED but serving status is {row.campaign.serving_status.name}",
-            })
-    except Exception:
-        pass
+    for row in rows:
+        alerts.append({
+            "level": "WARNING",
+            "category": "campaign_error",
+            "campaign": row.campaign.name,
+            "key": f"campaign:{row.campaign.id}",
+            "message": f"Campaign '{row.campaign.name}' is ENABLED but serving status is {row.campaign.serving_status.name}",
+        })
 
     return alerts
 
 
-def _check_ad_grants_ctr() -> list[dict]:
-    """Check account CTR for Google Ad Grants compliance (must stay above 5%)."""
+def _check_ad_grants_ctr(summary: dict | None = None) -> list[dict]:
+    """
+    Check account CTR for Google Ad Grants compliance (must stay above 5%).
+    Errors are reported by check_all_alerts.
+    """
     alerts = []
     min_ctr = get_env_float("AD_GRANTS_MIN_CTR", 5.0)
 
-    try:
-        summary = get_account_summary("LAST_30_DAYS")
-        ctr = summary["overall_ctr"]
+    ctr = summary["overall_ctr"] if summary is not None else get_account_ctr("LAST_30_DAYS")
 
-        if ctr < min_ctr:
-            alerts.append({
-                "level": "CRITICAL",
-                "category": "ad_grants",
-                "campaign": "ALL",
-                "message": f"Account CTR at {ctr}% — BELOW {min_ctr}% Ad Grants minimum! Risk of account suspension.",
-            })
-        elif ctr < min_ctr + 1:
-            alerts.append({
-                "level": "WARNING",
-                "category": "ad_grants",
-                "campaign": "ALL",
-                "message": f"Account CTR at {ctr}% — approaching {min_ctr}% Ad Grants minimum. Consider pausing low-CTR keywords.",
-            })
-    except Exception:
-        pass
+    if ctr < min_ctr:
+        alerts.append({
+            "level": "CRITICAL",
+            "category": "ad_grants",
+            "campaign": "ALL",
+            "key": "account_ctr",
+            "message": f"Account CTR at {ctr}% — BELOW {min_ctr}% Ad Grants minimum! Risk of account suspension.",
+        })
+    elif ctr < min_ctr + 1:
+        alerts.append({
+            "level": "WARNING",
+            "category": "ad_grants",
+            "campaign": "ALL",
+            "key": "account_ctr",
+            "message": f"Account CTR at {ctr}% — approaching {min_ctr}% Ad Grants minimum. Consider pausing low-CTR keywords.",
+        })
 
     return alerts
 
@@ -185,10 +361,13 @@ def _check_ad_grants_ctr() -> list[dict]:
 
 if __name__ == "__main__":
     print("\n═══ ALERT CHECK ═══")
-    alerts = check_all_alerts()
+    alerts, resolved = check_all_alerts()
     if alerts:
         for a in alerts:
             icon = {"CRITICAL": "🔴", "WARNING": "🟡", "INFO": "🔵", "ERROR": "⚫"}.get(a["level"], "⚪")
-            print(f"  {icon} [{a['level']}] {a.get('campaign', '')}: {a['message']}")
+            print(f"  {icon} [{a['level']}] {a.get('campaign', '')}: {a['message']} ({a['transition']})")
     else:
         print("  ✅ No alerts — all clear!")
+    for r in resolved:
+        print(f"  ✅ Resolved: {r.get('campaign', '')}: {r['message']}")
+    print(f"  ⏱️ {format_check_timings()}")
@@ -14,14 +14,25 @@ from skills.data_gathering.search_terms import find_negative_candidates, find_ex
 from db import log_report, get_action_summary
 
 
-def generate_daily_summary() -> str:
+# Datasets this skill reads (see skills/data_gathering/planner.py)
+REQUIRED_DATASETS = ("account_summary_today", "budget_status", "search_terms", "keywords")
+
+
+def generate_daily_summary(data: dict | None = None) -> str:
     """
     Generate a daily summary report with key metrics.
+
+    Args:
+        data: Optional datasets prefetched by the planner; anything missing
+              is fetched here.
     """
+    data = data or {}
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
-    summary = get_account_summary("TODAY")
-    cap = check_spend_cap()
-    budgets = get_budget_status()
+    summary = data.get("account_summary_today") or get_account_summary("TODAY")
+    budgets = data.get("budget_status")
+    if budgets is None:
+        budgets = get_budget_status()
+    cap = check_spend_cap(budgets)
     action_summary = get_action_summary(days=1)
 
     lines = [
@@ -51,8 +62,8 @@ def generate_daily_summary() -> str:
             lines.append(f"  {b['campaign']}: ${b['today_spend']:.2f} / ${b['daily_budget']:.2f} — {b['pacing_status']}")
 
     # Recommendations
-    neg_candidates = find_negative_candidates()
-    exp_candidates = find_expansion_candidates()
+    neg_candidates = find_negative_candidates(data.get("search_terms"))
+    exp_candidates = find_expansion_candidates(data.get("search_terms"), data.get("keywords"))
 
     if neg_candidates or exp_candidates:
         lines.append("")
@@ -11,28 +11,45 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 from skills.data_gathering.performance import get_account_summary, get_daily_performance, get_ad_performance
 from skills.data_gathering.budget import get_budget_status, get_daily_spend_trend
 from skills.data_gathering.search_terms import (
-    get_search_terms, get_keywords,
+    get_search_terms, get_keywords, top_rows,
     find_negative_candidates, find_expansion_candidates,
 )
-from skills.actions.ad_copy_tester import get_ad_test_summary
-from skills.actions.bid_optimizer import analyze_bids
+from skills.actions.bid_optimizer import get_recommendations as get_bid_recommendations
+from skills.data_gathering.hour_cube import recommend_schedule, format_schedule
 from db import log_report, get_action_summary, get_recent_actions
 from google_ads_client import get_env_float
 
 
-def generate_weekly_report() -> str:
-    """Generate a comprehensive weekly deep-dive report."""
+# Datasets this skill reads (see skills/data_gathering/planner.py)
+REQUIRED_DATASETS = ("account_summary_7d", "daily_performance_7d", "search_terms_7d", "keywords", "budget_status")
+
+
+def generate_weekly_report(data: dict | None = None) -> str:
+    """
+    Generate a comprehensive weekly deep-dive report.
+
+    Args:
+        data: Optional datasets prefetched by the planner; anything missing
+              is fetched here.
+    """
+    data = data or {}
     now = datetime.now().strftime("%Y-%m-%d")
     target_cpa = get_env_float("TARGET_CPA", 25.0)
 
     # Gather data
-    summary = get_account_summary("LAST_7_DAYS")
-    daily = get_daily_performance("LAST_7_DAYS")
-    search_terms = get_search_terms("LAST_7_DAYS")
-    keywords = get_keywords()
+    summary = data.get("account_summary_7d") or get_account_summary("LAST_7_DAYS")
+    daily = data.get("daily_performance_7d")
+    if daily is None:
+        daily = get_daily_performance("LAST_7_DAYS")
+    search_terms = data.get("search_terms_7d")
+    if search_terms is None:
+        search_terms = get_search_terms("LAST_7_DAYS")
+    keywords = data.get("keywords")
+    if keywords is None:
+        keywords = get_keywords()
     negatives = find_negative_candidates(search_terms)
     expansions = find_expansion_candidates(search_terms, keywords)
-    bid_recs = analyze_bids(target_cpa)
+    bid_recs = get_bid_recommendations(target_cpa, keywords)
     actions = get_recent_actions(100)
     action_counts = get_action_summary(days=7)
 
@@ -82,8 +99,7 @@ def generate_weekly_report() -> str:
 
     if search_terms:
         # Top performing terms
-        converting = [t for t in search_terms if t["conversions"] > 0]
-        converting.sort(key=lambda x: x["conversions"], reverse=True)
+        converting = top_rows((t for t in search_terms if t["conversions"] > 0), 5, key="conversions")
         if converting:
             lines.append("  🏆 Top Converting Search Terms:")
             for t in converting[:5]:
@@ -134,12 +150,18 @@ def generate_weekly_report() -> str:
             lines.append(f"  {action_type}: {count}")
 
     # Budget pacing
-    budgets = get_budget_status()
+    budgets = data.get("budget_status")
+    if budgets is None:
+        budgets = get_budget_status()
     if budgets:
         lines.extend(["", "━━━ 9. BUDGET PACING ━━━"])
         for b in budgets:
             lines.append(f"  {b['campaign']}: ${b['month_spend']:.2f} / ${b['monthly_budget']:.2f} ({b['month_pct']:.0f}%) — {b['pacing_status']}")
 
+    # Ad schedule, from the hour × weekday cube (updated daily, no API call here)
+    lines.extend(["", "━━━ 10. AD SCHEDULE ━━━"])
+    lines.extend(format_schedule(recommend_schedule()))
+
     lines.extend(["", "═" * 55, "End of Weekly Report"])
 
     report = "\n".join(lines)
@@ -7,7 +7,8 @@ from __future__ import annotations
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from google_ads_client import get_client, get_customer_id
+from google_ads_client import get_client, get_customer_id, get_service, invalidate_query_cache
+from skills.data_gathering.snapshots import invalidate_snapshots
 from db import get_action, get_actions_since, log_action, mark_rolled_back
 
 
@@ -44,6 +45,9 @@ def rollback_action(action_id: int) -> dict:
             return {"status": "error", "error": f"Rollback not supported for action type '{action_type}'"}
 
         if result["status"] == "success":
+            invalidate_query_cache(get_customer_id())
+            invalidate_snapshots()
+
             # Log the rollback action
             rollback_id = log_action(
                 action_type=f"rollback_{action_type}",
@@ -110,7 +114,7 @@ def _rollback_bid(action: dict) -> dict:
         __import__('google.protobuf.field_mask_pb2', fromlist=['FieldMask']).FieldMask(paths=["cpc_bid_micros"]),
     )
 
-    service = client.get_service("AdGroupCriterionService")
+    service = get_service(client, "AdGroupCriterionService")
     service.mutate_ad_group_criteria(customer_id=customer_id, operations=[operation])
     return {"status": "success", "restored_bid": old_bid}
 
@@ -127,7 +131,7 @@ def _rollback_negative(action: dict) -> dict:
     operation = client.get_type("CampaignCriterionOperation")
     operation.remove = resource_name
 
-    service = client.get_service("CampaignCriterionService")
+    service = get_service(client, "CampaignCriterionService")
     service.mutate_campaign_criteria(customer_id=customer_id, operations=[operation])
     return {"status": "success", "removed": resource_name}
 
@@ -144,7 +148,7 @@ def _rollback_keyword(action: dict) -> dict:
     operation = client.get_type("AdGroupCriterionOperation")
     operation.remove = resource_name
 
-    service = client.get_service("AdGroupCriterionService")
+    service = get_service(client, "AdGroupCriterionService")
     service.mutate_ad_group_criteria(customer_id=customer_id, operations=[operation])
     return {"status": "success", "removed": resource_name}
 
@@ -168,7 +172,7 @@ def _rollback_pause_ad(action: dict) -> dict:
         __import__('google.protobuf.field_mask_pb2', fromlist=['FieldMask']).FieldMask(paths=["status"]),
     )
 
-    service = client.get_service("AdGroupAdService")
+    service = get_service(client, "AdGroupAdService")
     service.mutate_ad_group_ads(customer_id=customer_id, operations=[operation])
     return {"status": "success", "re_enabled": resource_name}
 
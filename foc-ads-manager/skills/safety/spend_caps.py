@@ -1,5 +1,9 @@
 """
 Spend Caps — Hard limits on daily spend the agent cannot exceed.
+
+Today's spend comes from the spend poller in skills/data_gathering/budget.py,
+so checking caps costs at most one small query per SPEND_POLL_TTL and gating
+a batch of actions is answered from memory.
 """
 
 from __future__ import annotations
@@ -7,25 +11,30 @@ import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from google_ads_client import get_env_float
-from skills.data_gathering.budget import get_budget_status
+from skills.data_gathering.budget import poll_today_spend
 from db import log_alert
 
 
-def check_caps() -> dict:
+def check_caps(max_age: float | None = None) -> dict:
     """
     Check all spend caps and return current status.
 
+    Args:
+        max_age: Oldest spend poll to reuse, in seconds (default SPEND_POLL_TTL)
+
     Returns dict with:
         - max_daily: configured max daily spend
         - total_today: actual spend today
+        - spend_delta: spend since the previous poll
+        - spend_rate_per_hour: spend rate between the last two polls (or None)
         - pct_used: percentage of cap used
         - can_increase_bids: whether bid increases are allowed
         - can_add_keywords: whether new keywords can be added
         - status: human-readable status string
     """
     max_daily = get_env_float("MAX_DAILY_SPEND", 50.0)
-    budgets = get_budget_status()
-    total_today = sum(b["today_spend"] for b in budgets)
+    poll = poll_today_spend(max_age)
+    total_today = poll["spend"]
     pct_used = round((total_today / max_daily * 100) if max_daily > 0 else 0, 1)
 
     # Tiered restrictions
@@ -44,6 +53,8 @@ def check_caps() -> dict:
     return {
         "max_daily": max_daily,
         "total_today": round(total_today, 2),
+        "spend_delta": poll["delta"],
+        "spend_rate_per_hour": poll["rate_per_hour"],
         "pct_used": pct_used,
         "can_increase_bids": can_increase_bids,
         "can_add_keywords": can_add_keywords,
@@ -54,6 +65,7 @@ def check_caps() -> dict:
 def enforce_cap(action_type: str) -> tuple[bool, str]:
     """
     Check if an action is allowed under current spend caps.
+    Answered from the last spend poll while it is within SPEND_POLL_TTL.
 
     Returns:
         (allowed, reason) tuple.